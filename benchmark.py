@@ -0,0 +1,219 @@
+import argparse
+import json
+import os
+import platform
+import sqlite3
+import statistics
+import subprocess
+import sys
+import time
+from datetime import date, datetime, timedelta
+from typing import Callable, Dict, List, Tuple
+
+from database import TaskManagerDB
+from querybuilder import (TagFilter, calendar_counts_sql, history_count_sql,
+                          history_search_sql, history_tasks_sql, kanban_counts_sql,
+                          kanban_page_sql, month_range)
+
+DEFAULT_REPEAT = 5
+# 与 historymodel / kanbanmodule 保持一致（这两个模块依赖 Qt，这里不直接导入）
+PAGE_SIZE = 200
+KANBAN_PAGE_SIZE = 100
+KANBAN_STATUSES = ["未开始", "进行中", "已完成", "已中断"]
+REGRESSION_RATIO = 1.2  # 比较时中位数变慢超过该倍数视为退化
+REGRESSION_MIN_MS = 1.0  # 且绝对差值超过该值（忽略亚毫秒级查询的抖动）
+
+Case = Tuple[str, Callable[[TaskManagerDB], object]]
+
+
+def _rows(db: TaskManagerDB, sql_and_params: Tuple[str, list], *extra) -> list:
+    sql, params = sql_and_params
+    return db.conn.execute(sql, params + list(extra)).fetchall()
+
+
+def _sample(db: TaskManagerDB) -> dict:
+    """从数据中挑选代表性的筛选值：最近有完成任务的月份、最常用的几个标签"""
+    month = db.conn.execute(
+        "SELECT MAX(substr(day, 1, 7)) FROM daily_rollup WHERE status = '已完成'"
+    ).fetchone()[0]
+    top_tags = [row[0] for row in db.conn.execute("""
+        SELECT tag_id FROM daily_tag_rollup
+        GROUP BY tag_id ORDER BY SUM(task_count) DESC LIMIT 3
+    """)]
+    total = db.conn.execute(*history_count_sql(None, None)).fetchone()[0]
+    # 看板“已完成”列中间位置的排序键，模拟滚动到很深处后的下一页
+    middle = db.conn.execute(
+        "SELECT due_date, task_id FROM tasks WHERE status = '已完成' "
+        "ORDER BY due_date, task_id LIMIT 1 OFFSET ?", (total // 2,)).fetchone()
+    # 历史页最后一页之前一行的排序键，即翻到最后一页时使用的锚点
+    last_offset = max(total - PAGE_SIZE, 0)
+    last_anchor = db.conn.execute(
+        "SELECT due_date, task_id FROM tasks WHERE status = '已完成' "
+        "ORDER BY due_date DESC, task_id DESC LIMIT 1 OFFSET ?",
+        (last_offset - 1,)).fetchone() if last_offset else None
+    return {"month": month, "tag_id": top_tags[0] if top_tags else None,
+            "top_tags": top_tags,
+            "last_anchor": list(last_anchor) if last_anchor else None,
+            "kanban_after": list(middle) if middle else None}
+
+
+def page_cases(sample: dict) -> List[Case]:
+    """各页面加载时执行的查询（与页面代码使用同一套 SQL/接口）"""
+    month, tag_id = sample["month"], sample["tag_id"]
+    # 多标签组合：最常用的标签且第二常用的标签，排除第三常用的标签
+    top_tags = sample["top_tags"]
+    tag_filter = TagFilter(all_of=tuple(top_tags[:2]), none_of=tuple(top_tags[2:3])) \
+        if top_tags else None
+    start, end = month_range(month) if month else (date.today().isoformat(),) * 2
+    window_end = date.fromisoformat(end) - timedelta(days=1)
+    window_start = window_end - timedelta(days=29)
+
+    return [
+        ("kanban.first_pages", lambda db: [
+            _rows(db, kanban_page_sql(status), KANBAN_PAGE_SIZE + 1)
+            for status in KANBAN_STATUSES]),
+        ("kanban.deep_page", lambda db: _rows(
+            db, kanban_page_sql("已完成", sample["kanban_after"]), KANBAN_PAGE_SIZE + 1)),
+        ("kanban.counts", lambda db: _rows(db, kanban_counts_sql())),
+        ("history.first_page", lambda db: _rows(
+            db, history_tasks_sql(None, None), PAGE_SIZE)),
+        ("history.last_page", lambda db: _rows(
+            db, history_tasks_sql(None, None, after=sample["last_anchor"]), PAGE_SIZE)),
+        ("history.month_page", lambda db: _rows(
+            db, history_tasks_sql(month, None), PAGE_SIZE)),
+        ("history.tag_page", lambda db: _rows(
+            db, history_tasks_sql(None, tag_id), PAGE_SIZE)),
+        ("history.month_tag_page", lambda db: _rows(
+            db, history_tasks_sql(month, tag_id), PAGE_SIZE)),
+        ("history.count", lambda db: _rows(db, history_count_sql(None, None))),
+        ("history.tag_count", lambda db: _rows(db, history_count_sql(None, tag_id))),
+        ("history.multi_tag_page", lambda db: _rows(
+            db, history_tasks_sql(None, tag_filter), PAGE_SIZE)),
+        ("history.multi_tag_count", lambda db: _rows(
+            db, history_count_sql(None, tag_filter))),
+        ("history.with_archive_page", lambda db: _rows(
+            db, history_tasks_sql(month, None, include_archive=True), PAGE_SIZE)),
+        ("history.search", lambda db: _rows(
+            db, history_search_sql("合作方123", None, None, fulltext=db.has_fulltext),
+            PAGE_SIZE, 0)),
+        ("history.months", lambda db: db.conn.execute(
+            "SELECT DISTINCT substr(day, 1, 7) FROM daily_rollup WHERE status = '已完成'"
+        ).fetchall()),
+        ("stats.total", lambda db: db.get_rollup_totals("已完成")),
+        ("stats.tag_total", lambda db: db.get_rollup_totals("已完成", tag_id=tag_id)),
+        ("stats.multi_tag_total", lambda db: db.get_rollup_totals(
+            "已完成", tag_id=tag_filter)),
+        ("stats.chart_30d", lambda db: db.get_daily_rollup(
+            "已完成", window_start, window_end)),
+        ("stats.tag_chart_30d", lambda db: db.get_daily_rollup(
+            "已完成", window_start, window_end, tag_id)),
+        ("stats.multi_tag_chart_30d", lambda db: db.get_daily_rollup(
+            "已完成", window_start, window_end, tag_filter)),
+        ("stats.dashboard", lambda db: db.get_rollup_summary(
+            "已完成", window_start, window_end)),
+        ("stats.tag_dashboard", lambda db: db.get_rollup_summary(
+            "已完成", window_start, window_end, tag_id)),
+        ("stats.multi_tag_dashboard", lambda db: db.get_rollup_summary(
+            "已完成", window_start, window_end, tag_filter)),
+        ("calendar.month_counts", lambda db: _rows(
+            db, calendar_counts_sql(start, window_end))),
+        ("tags.all", lambda db: db.get_all_tags()),
+    ]
+
+
+def time_case(db: TaskManagerDB, fn: Callable, repeat: int) -> dict:
+    """预热一次后重复执行，返回毫秒耗时统计"""
+    result = fn(db)
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn(db)
+        timings.append((time.perf_counter() - started) * 1000)
+    return {
+        "min_ms": round(min(timings), 3),
+        "median_ms": round(statistics.median(timings), 3),
+        "max_ms": round(max(timings), 3),
+        "rows": len(result) if hasattr(result, "__len__") else 1,
+    }
+
+
+def run_benchmarks(db_file: str, repeat: int = DEFAULT_REPEAT) -> dict:
+    """对一个数据库文件执行全部页面查询"""
+    db = TaskManagerDB(db_file, read_only=True)
+    try:
+        sample = _sample(db)
+        task_count = db.conn.execute("SELECT COUNT(*) FROM tasks").fetchone()[0]
+        queries = {}
+        for name, fn in page_cases(sample):
+            db.tags.invalidate()  # 标签查询计入冷缓存的开销
+            queries[name] = time_case(db, fn, repeat)
+        return {"task_count": task_count, "sample": sample, "queries": queries}
+    finally:
+        db.close()
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+            cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except OSError:
+        return ""
+
+
+def compare(baseline: dict, current: dict) -> List[str]:
+    """比较两次结果的中位数，返回明显变慢的查询"""
+    regressions = []
+    for db_name, result in current["databases"].items():
+        old = baseline["databases"].get(db_name)
+        if not old:
+            continue
+        for name, timing in result["queries"].items():
+            before = old["queries"].get(name)
+            if not before:
+                continue
+            slower = timing["median_ms"] - before["median_ms"]
+            if (timing["median_ms"] > before["median_ms"] * REGRESSION_RATIO
+                    and slower > REGRESSION_MIN_MS):
+                regressions.append(
+                    f"{db_name} {name}: {before['median_ms']:.2f}ms -> "
+                    f"{timing['median_ms']:.2f}ms")
+    return regressions
+
+
+if __name__ == "__main__":
+    # 用法: python benchmark.py bench_10k.db bench_100k.db [-o results.json] [--compare old.json]
+    parser = argparse.ArgumentParser(description="测量各页面查询在不同数据规模下的耗时")
+    parser.add_argument("databases", nargs="+", help="由 datagen.py 生成的数据库文件")
+    parser.add_argument("-r", "--repeat", type=int, default=DEFAULT_REPEAT)
+    parser.add_argument("-o", "--output", help="结果 JSON 文件（默认 bench_<commit>.json）")
+    parser.add_argument("--compare", help="与之前保存的结果 JSON 比较")
+    args = parser.parse_args()
+
+    commit = _git_commit()
+    report: Dict[str, object] = {
+        "commit": commit,
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "sqlite": sqlite3.sqlite_version,
+        "repeat": args.repeat,
+        "databases": {},
+    }
+    for db_file in args.databases:
+        result = run_benchmarks(db_file, args.repeat)
+        report["databases"][os.path.basename(db_file)] = result
+        print(f"{db_file} ({result['task_count']} 个任务)")
+        for name, timing in result["queries"].items():
+            print(f"  {name:<28}{timing['median_ms']:>10.2f} ms  ({timing['rows']} 行)")
+
+    output = args.output or f"bench_{commit or 'results'}.json"
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"结果已保存到 {output}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            regressions = compare(json.load(f), report)
+        for line in regressions:
+            print(f"变慢: {line}")
+        sys.exit(1 if regressions else 0)
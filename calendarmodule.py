@@ -1,13 +1,16 @@
 from PyQt5.QtWidgets import QCalendarWidget, QGraphicsDropShadowEffect
 from PyQt5.QtCore import QDate, Qt
 from PyQt5.QtGui import QPainter, QColor, QFont
-from sqlite3 import Error
-from database import TaskManagerDB
+from database import get_db
+from dataservice import get_data_service
+from querybuilder import calendar_counts_sql
+from taskstore import get_task_store
 
 class TaskCalendar(QCalendarWidget):
     def __init__(self, parent=None):
         super().__init__(parent)
-        self.db = TaskManagerDB()
+        self.db = get_db()
+        self.data_service = get_data_service()
         self.setGridVisible(True)
         self.setVerticalHeaderFormat(QCalendarWidget.NoVerticalHeader)
         self.setNavigationBarVisible(True)
@@ -20,6 +23,13 @@ class TaskCalendar(QCalendarWidget):
         self.clicked.connect(self.handle_date_click)
         self.currentPageChanged.connect(self.on_page_changed)
         
+        # 任务变化时直接调整当天计数
+        task_store = get_task_store()
+        task_store.taskAdded.connect(lambda task: self.adjust_count(task.due_date, 1))
+        task_store.taskChanged.connect(self.on_task_changed)
+        task_store.taskRemoved.connect(self.on_task_removed)
+        task_store.reset.connect(self.reload_month)
+        
         # 视觉效果
         self.setup_shadow_effect()
 
@@ -70,26 +80,50 @@ class TaskCalendar(QCalendarWidget):
         start_date = QDate(year, month, 1)
         end_date = start_date.addMonths(1).addDays(-1)
         
-        try:
-            cursor = self.db.conn.execute("""
-                SELECT DATE(due_date) AS task_date, COUNT(*) 
-                FROM tasks 
-                WHERE DATE(due_date) BETWEEN ? AND ?
-                GROUP BY DATE(due_date)
-            """, (start_date.toString("yyyy-MM-dd"),
-                  end_date.toString("yyyy-MM-dd")))
-            
-            self.task_counts = {
-                row[0]: row[1] 
-                for row in cursor.fetchall()
-            }
-        except Error as e:
-            print(f"加载日历数据失败: {e}")
+        query, params = calendar_counts_sql(start_date.toString("yyyy-MM-dd"),
+                                            end_date.toString("yyyy-MM-dd"))
+        # 快速翻月时只保留最后一次请求的结果
+        self.data_service.submit(
+            "calendar",
+            lambda db: dict(db.conn.execute(query, params).fetchall()),
+            self.apply_month_tasks,
+            lambda e: print(f"加载日历数据失败: {e}")
+        )
+
+    def apply_month_tasks(self, task_counts: dict):
+        """后台查询完成后刷新单元格"""
+        self.task_counts = task_counts
+        self.updateCells()
+
+    def adjust_count(self, due_date: str, delta: int):
+        """当前显示月份内某天的任务数加减 delta"""
+        day = QDate.fromString(str(due_date)[:10], "yyyy-MM-dd")
+        if day.year() != self.yearShown() or day.month() != self.monthShown():
+            return
+        key = day.toString("yyyy-MM-dd")
+        self.task_counts[key] = max(self.task_counts.get(key, 0) + delta, 0)
+        self.updateCell(day)
+
+    def on_task_changed(self, old, task):
+        """修改前的截止日期未知时（任务不在快照中）重新加载当月计数"""
+        if old is None:
+            self.reload_month()
+        elif old.due_date != task.due_date:
+            self.adjust_count(old.due_date, -1)
+            self.adjust_count(task.due_date, 1)
+
+    def on_task_removed(self, task_id, old):
+        if old is None:
+            self.reload_month()
+        else:
+            self.adjust_count(old.due_date, -1)
+
+    def reload_month(self):
+        self.load_month_tasks(self.yearShown(), self.monthShown())
 
     def on_page_changed(self, year: int, month: int):
         """月份切换时重新加载数据"""
         self.load_month_tasks(year, month)
-        self.updateCells()
 
     def handle_date_click(self, date: QDate):
         """处理日期点击事件"""
@@ -2,24 +2,36 @@ from PyQt5.QtWidgets import (
     QMainWindow, QWidget, QStackedWidget, 
     QPushButton, QVBoxLayout, QHBoxLayout, QLabel,
     QLineEdit, QTextEdit, QDateEdit, QComboBox, QListWidget,
-    QDoubleSpinBox, QFormLayout, QMessageBox, QListWidgetItem
+    QDoubleSpinBox, QFormLayout, QMessageBox, QListWidgetItem,
+    QFileDialog, QProgressDialog
 )
-from PyQt5.QtCore import QDate
+from PyQt5.QtCore import QDate, QObject, pyqtSignal
 from PyQt5.QtCore import Qt
 from PyQt5.QtWidgets import QScrollArea, QFrame
 from sqlite3 import Error
 from datetime import date
 
-from database import TaskManagerDB
+from database import get_db
+from dataservice import get_data_service
+from taskstore import get_task_store
+from writequeue import get_write_queue
+from importmodule import TaskImporter
 from calendarmodule import TaskCalendar
 from statisticsmodule import StatsDashboard
 from historydatamodule import TaskHistoryPage
 
+class _ImportProgress(QObject):
+    """导入在写线程中进行，经由该对象的信号把 (已导入, 已拒绝) 行数排队送回 GUI 线程"""
+    progressed = pyqtSignal(int, int)
+
+
 class CreateTaskModule(QWidget):    
     def __init__(self):
         super().__init__()
-        self.db = TaskManagerDB()
+        self.db = get_db()
         self.init_ui()
+        # 其他页面或导入新建/删除标签后同步列表
+        get_task_store().tagsChanged.connect(self.load_existing_tags)
 
     def init_ui(self):
         """配置添加任务表单"""
@@ -86,22 +98,31 @@ class CreateTaskModule(QWidget):
         submit_btn.setObjectName("submitButton")
         submit_btn.clicked.connect(self.save_task)
         
+        # 批量导入按钮
+        import_btn = QPushButton("批量导入")
+        import_btn.clicked.connect(self.import_tasks)
+
+        button_layout = QHBoxLayout()
+        button_layout.addStretch()
+        button_layout.addWidget(submit_btn)
+        button_layout.addWidget(import_btn)
+        button_layout.addStretch()
+
         form_widget.setLayout(form_layout)
         main_layout.addWidget(form_widget)
-        main_layout.addWidget(submit_btn, alignment=Qt.AlignCenter)
+        main_layout.addLayout(button_layout)
 
         self.setLayout(main_layout)
 
     def load_existing_tags(self):
-        """加载已有标签到列表"""
+        """加载已有标签到列表（保留已选中的标签）"""
+        selected = {item.text() for item in self.tag_list.selectedItems()}
         self.tag_list.clear()
         try:
-            cursor = self.db.conn.cursor()
-            cursor.execute("SELECT tag_name FROM tags")
-            tags = cursor.fetchall()
-            for tag in tags:
-                item = QListWidgetItem(tag[0])
+            for _, tag_name, _ in self.db.get_all_tags():
+                item = QListWidgetItem(tag_name)
                 self.tag_list.addItem(item)
+                item.setSelected(tag_name in selected)
         except Error as e:
             print(f"加载标签失败: {e}")
 
@@ -113,21 +134,21 @@ class CreateTaskModule(QWidget):
             return
         
         try:
-            # 检查是否已存在
-            cursor = self.db.conn.cursor()
-            cursor.execute("SELECT tag_id FROM tags WHERE tag_name = ?", (new_tag,))
-            if cursor.fetchone():
+            # 检查是否已存在（标签缓存，不查询数据库）
+            if self.db.get_tag_id(new_tag) is not None:
                 QMessageBox.warning(self, "重复标签", "该标签已存在")
                 return
-            
-            # 插入新标签
-            cursor.execute("INSERT INTO tags (tag_name) VALUES (?)", (new_tag,))
-            self.db.conn.commit()
-            self.load_existing_tags()  # 刷新列表
-            self.new_tag_input.clear()
         except Error as e:
-            self.db.conn.rollback()
             QMessageBox.critical(self, "数据库错误", f"添加标签失败: {e}")
+            return
+        
+        # 与其他写操作一起交给后写队列在写线程提交；失败时（错误提示由主窗口显示）把名称填回输入框
+        self.new_tag_input.clear()
+        get_write_queue().enqueue(
+            lambda db: db.get_or_create_tag(new_tag),
+            lambda: self.new_tag_input.text() or self.new_tag_input.setText(new_tag),
+            lambda tag_id: self.load_existing_tags()  # 刷新列表
+        )
 
     def save_task(self):
         """保存任务到数据库"""
@@ -150,38 +171,93 @@ class CreateTaskModule(QWidget):
             QMessageBox.warning(self, "输入错误", "请选择截止时间")
             return
         
-        try:
-            # 保存到数据库
-            task_id = self.db.create_task(
+        def write(db):
+            task_id = db.create_task(
                 name=task_data["name"],
                 description=task_data["description"] or None,
                 due_date=task_data["due_date"],
                 expected_income=task_data["expected_income"] or None,
-                tags=task_data["tags"]
+                tags=task_data["tags"],
+                # 财务数据与任务、标签在同一事务中写入
+                actual_income=task_data["actual_income"],
+                expense=task_data["expense"]
+            )
+            if task_id == -1:
+                raise Error("任务写入失败")  # 使后写队列回滚整批修改
+            return task_id
+
+        # 先清空表单，写入交给后写队列；失败时（错误提示由主窗口显示）把内容填回表单
+        self.clear_form()
+        get_write_queue().enqueue(
+            write,
+            lambda: self.restore_form(task_data),
+            lambda task_id: QMessageBox.information(self, "成功", "任务已保存！")
+        )
+
+    def clear_form(self):
+        self.task_name_input.clear()
+        self.desc_input.clear()
+        self.due_date_edit.setDate(QDate.currentDate())
+        self.expected_income_spin.setValue(0)
+        self.actual_income_spin.setValue(0)
+        self.expense_spin.setValue(0)
+        self.tag_list.clearSelection()
+
+    def restore_form(self, task_data: dict):
+        """保存失败后恢复表单内容（用户已开始填写下一个任务时不覆盖）"""
+        if self.task_name_input.text().strip():
+            return
+        self.task_name_input.setText(task_data["name"])
+        self.desc_input.setPlainText(task_data["description"])
+        self.due_date_edit.setDate(QDate(task_data["due_date"]))
+        self.expected_income_spin.setValue(task_data["expected_income"])
+        self.actual_income_spin.setValue(task_data["actual_income"])
+        self.expense_spin.setValue(task_data["expense"])
+        for row in range(self.tag_list.count()):
+            item = self.tag_list.item(row)
+            item.setSelected(item.text() in task_data["tags"])
+
+    def import_tasks(self):
+        """从 CSV/JSONL 文件批量导入任务
+        
+        导入在后台写线程中执行，与其他写操作串行，窗口保持响应。
+        """
+        path, _ = QFileDialog.getOpenFileName(
+            self, "选择导入文件", "", "任务数据 (*.csv *.jsonl *.ndjson)"
+        )
+        if not path:
+            return
+
+        progress_dialog = QProgressDialog("正在导入任务...", None, 0, 0, self)
+        progress_dialog.setWindowTitle("批量导入")
+        progress_dialog.setWindowModality(Qt.WindowModal)
+        progress_dialog.show()
+        progress = _ImportProgress(progress_dialog)
+        progress.progressed.connect(
+            lambda imported, rejected: progress_dialog.setLabelText(
+                f"已导入 {imported} 行，拒绝 {rejected} 行"))
+
+        def on_error(error):
+            progress_dialog.close()
+            QMessageBox.critical(self, "导入失败", f"发生错误: {error}")
+
+        get_data_service().submit_write(
+            lambda db: TaskImporter(db).import_file(path, progress.progressed.emit),
+            lambda report: self.show_import_report(progress_dialog, report),
+            on_error
+        )
+
+    def show_import_report(self, progress_dialog, report: dict):
+        progress_dialog.close()
+        self.load_existing_tags()  # 导入可能新建了标签
+
+        message = f"成功导入 {report['imported']} 个任务。"
+        if report["rejected_count"]:
+            details = "\n".join(
+                f"第 {line_no} 行: {reason}"
+                for line_no, reason in report["rejected"][:20]
             )
-            
-            # 保存财务数据（如果存在）
-            if task_data["actual_income"] > 0 or task_data["expense"] > 0:
-                self.db.conn.execute(
-                    """UPDATE tasks SET 
-                        actual_income = ?,
-                        expense = ?
-                    WHERE task_id = ?""",
-                    (task_data["actual_income"], task_data["expense"], task_id)
-                )
-                self.db.conn.commit()
-
-            #self.db.close()
-            
-            # 清空表单
-            self.task_name_input.clear()
-            self.desc_input.clear()
-            self.due_date_edit.setDate(QDate.currentDate())
-            self.expected_income_spin.setValue(0)
-            self.actual_income_spin.setValue(0)
-            self.expense_spin.setValue(0)
-            self.tag_list.clearSelection()
-            
-            QMessageBox.information(self, "成功", "任务已保存！")
-        except Exception as e:
-            QMessageBox.critical(self, "保存失败", f"发生错误: {str(e)}")
+            message += f"\n拒绝 {report['rejected_count']} 行：\n{details}"
+            if report["rejected_count"] > 20:
+                message += "\n..."
+        QMessageBox.information(self, "导入完成", message)
@@ -1,125 +1,405 @@
+import os
 import sqlite3
+import threading
+import weakref
 from sqlite3 import Error
+from contextlib import contextmanager
 from datetime import date
-from typing import List, Tuple, Optional
+from typing import Callable, Dict, Iterable, List, Tuple, Optional, Union
+
+from schema import (ROLLUP_MEASURES, TASK_COLUMNS, rollup_upsert,
+                    ensure_fulltext, grouped_rollup_sums, has_fulltext, migrate,
+                    rebuild_rollups)
+from querybuilder import (ARCHIVE_TABLES, LIVE_TABLES, TagLike, TaskQuery,
+                          as_tag_filter, day_range, single_tag)
+
+DEFAULT_DB_FILE = "task_manager1.db"
+BUSY_TIMEOUT_MS = 5000
+ARCHIVE_BATCH_SIZE = 5000
+MAX_IN_PARAMS = 500  # 单条 IN (...) 语句的参数上限，低于旧版 SQLite 的 999
+ARCHIVABLE_STATUSES = ('已完成', '已归档')
+
+# 写入事件：随提交后的通知一起给出受影响的ID列表（None 表示范围未知）
+TASKS_CREATED = "tasks_created"
+TASKS_UPDATED = "tasks_updated"
+TASKS_DELETED = "tasks_deleted"
+TAGS_CHANGED = "tags_changed"
+
+# 进程内共享的数据库实例注册表：每个数据库文件只连接一次、只检查一次表结构
+_registry: Dict[str, "TaskManagerDB"] = {}
+_registry_lock = threading.Lock()
+_schema_checked = set()  # 本进程内已检查过表结构的数据库文件
+
+# 写入监听器：listener(数据库键, 事件, ID列表)，在写入所在线程、事务提交之后调用
+WriteListener = Callable[[str, str, Optional[List[int]]], None]
+_write_listeners: List[WriteListener] = []
+
+# 进程内全部连接（含后台线程各自的连接），标签变化后逐个作废其标签缓存
+_instances: "weakref.WeakSet[TaskManagerDB]" = weakref.WeakSet()
+
+
+def _db_key(db_file: str) -> str:
+    return os.path.abspath(db_file) if db_file != ":memory:" else db_file
+
+
+def get_db(db_file: str = DEFAULT_DB_FILE) -> "TaskManagerDB":
+    """获取指定数据库文件的共享实例（不存在时创建）"""
+    key = _db_key(db_file)
+    with _registry_lock:
+        db = _registry.get(key)
+        if db is None or db.conn is None:
+            db = TaskManagerDB(db_file)
+            _registry[key] = db
+        return db
+
+
+def add_write_listener(listener: WriteListener):
+    """注册写入监听器：任意连接提交任务/标签的修改后都会回调"""
+    with _registry_lock:
+        _write_listeners.append(listener)
+
+
+def remove_write_listener(listener: WriteListener):
+    with _registry_lock:
+        if listener in _write_listeners:
+            _write_listeners.remove(listener)
+
+
+def close_all():
+    """关闭注册表中的全部数据库连接（程序退出时调用）"""
+    with _registry_lock:
+        for db in _registry.values():
+            db.close()
+        _registry.clear()
+
+
+def _iso_date(value: Union[date, str]) -> str:
+    """统一日期参数为 ISO 字符串（YYYY-MM-DD）"""
+    return value.isoformat() if isinstance(value, date) else str(value)
+
+
+def _rollup_sums() -> str:
+    return ", ".join(["COALESCE(SUM(task_count), 0)"] + [
+        f"COALESCE(SUM({m}), 0)" for m, _ in ROLLUP_MEASURES])
+
+
+def _rollup_row_to_dict(row: Tuple) -> dict:
+    """汇总查询结果（任务数 + 三项金额分）转为以元为单位的字典"""
+    return {
+        "task_count": row[0],
+        "expected_income": row[1] / 100,
+        "actual_income": row[2] / 100,
+        "expense": row[3] / 100,
+    }
+
+
+class TagCache:
+    """标签字典缓存：标签名 <-> 标签ID（含颜色），首次使用时整表载入一次
+
+    本连接的标签增删同步更新缓存；其他连接提交标签修改后，
+    TaskManagerDB 作废同一数据库上所有连接的缓存（可能来自其他线程）。
+    稳定状态下标签解析不再访问 SQLite。
+    """
+
+    def __init__(self, conn: sqlite3.Connection):
+        self.conn = conn
+        self._by_name: Dict[str, int] = {}
+        self._by_id: Dict[int, Tuple[str, Optional[str]]] = {}
+        # 每次作废加一；载入期间被作废时版本不一致，下次使用仍会重新载入
+        self._generation = 0
+        self._loaded_generation = -1
+
+    @property
+    def _loaded(self) -> bool:
+        return self._loaded_generation == self._generation
+
+    def _ensure_loaded(self):
+        if self._loaded:
+            return
+        generation = self._generation
+        by_name, by_id = {}, {}
+        for tag_id, tag_name, color in self.conn.execute(
+                "SELECT tag_id, tag_name, color FROM tags"):
+            by_name[tag_name] = tag_id
+            by_id[tag_id] = (tag_name, color)
+        self._by_name, self._by_id = by_name, by_id
+        self._loaded_generation = generation
+
+    def id_of(self, tag_name: str) -> Optional[int]:
+        self._ensure_loaded()
+        return self._by_name.get(tag_name)
+
+    def name_of(self, tag_id: int) -> Optional[str]:
+        self._ensure_loaded()
+        entry = self._by_id.get(tag_id)
+        return entry[0] if entry else None
+
+    def color_of(self, tag_id: int) -> Optional[str]:
+        self._ensure_loaded()
+        entry = self._by_id.get(tag_id)
+        return entry[1] if entry else None
+
+    def all(self) -> List[Tuple[int, str, Optional[str]]]:
+        """全部标签 (tag_id, tag_name, color)，按名称排序"""
+        self._ensure_loaded()
+        return sorted(((tag_id, name, color)
+                       for tag_id, (name, color) in self._by_id.items()),
+                      key=lambda tag: tag[1])
+
+    def add(self, tag_id: int, tag_name: str, color: str = None):
+        if not self._loaded:
+            return  # 尚未载入时无需维护，首次使用会整表读取
+        self._by_name[tag_name] = tag_id
+        self._by_id[tag_id] = (tag_name, color)
+
+    def remove(self, tag_id: int):
+        entry = self._by_id.pop(tag_id, None)
+        if entry:
+            self._by_name.pop(entry[0], None)
+
+    def invalidate(self):
+        """丢弃缓存（事务回滚或其他连接修改标签后调用），下次使用时重新载入"""
+        self._generation += 1
+
 
 class TaskManagerDB:
-    def __init__(self, db_file: str = "task_manager1.db"):
+    def __init__(self, db_file: str = DEFAULT_DB_FILE, read_only: bool = False):
+        """read_only=True 用于后台线程的只读连接（见 dataservice）"""
         self.conn = None
+        self.db_file = db_file
+        self.key = _db_key(db_file)
+        self._tx_depth = 0  # 当前事务嵌套层数，>0 时由最外层统一提交
+        self._changes: Dict[str, Optional[set]] = {}  # 本事务内待通知的写入
+        self.tags: Optional[TagCache] = None
         try:
             # 创建数据库连接
-            self.conn = sqlite3.connect(db_file)
-            self.conn.execute("PRAGMA foreign_keys = ON")  # 启用外键约束
+            self.conn = sqlite3.connect(db_file, timeout=BUSY_TIMEOUT_MS / 1000)
+            self._configure_connection(self.conn)
+            self.tags = TagCache(self.conn)
+            _instances.add(self)
             print(f"成功连接到SQLite数据库: {db_file}")
-            self._create_tables()
+            if self.key not in _schema_checked or self.key == ":memory:":
+                self._create_tables()
+                _schema_checked.add(self.key)
+            self.has_fulltext = has_fulltext(self.conn)  # 历史页搜索是否可用全文索引
+            if read_only:
+                self.conn.execute("PRAGMA query_only = ON")
         except Error as e:
             print(f"连接数据库失败: {e}")
             raise
 
+    @staticmethod
+    def _configure_connection(conn: sqlite3.Connection):
+        """设置连接级参数：外键、WAL日志与忙等待超时"""
+        conn.execute("PRAGMA foreign_keys = ON")  # 启用外键约束
+        conn.execute("PRAGMA journal_mode = WAL")  # 读写互不阻塞
+        conn.execute("PRAGMA synchronous = NORMAL")  # WAL模式下足够安全
+        conn.execute(f"PRAGMA busy_timeout = {BUSY_TIMEOUT_MS}")
+
+    @contextmanager
+    def transaction(self):
+        """工作单元：块内的所有写操作在同一事务中提交，出错时整体回滚
+
+        可以嵌套使用，内层块并入最外层事务。
+        """
+        outermost = self._tx_depth == 0
+        if outermost and not self.conn.in_transaction:
+            self.conn.execute("BEGIN IMMEDIATE")
+        self._tx_depth += 1
+        try:
+            yield self.conn
+        except BaseException:
+            self._tx_depth -= 1
+            if outermost:
+                self.conn.rollback()
+                self.tags.invalidate()  # 回滚可能撤销了事务内新建的标签
+                self._changes.clear()
+            raise
+        self._tx_depth -= 1
+        if outermost:
+            self.conn.commit()
+            self._flush_changes()
+
+    def _record_change(self, event: str, ids: Optional[Iterable[int]]):
+        """记录一次写入；事务外立即通知，事务内等最外层提交后统一通知"""
+        if ids is None:
+            self._changes[event] = None
+        elif event not in self._changes:
+            self._changes[event] = set(ids)
+        elif self._changes[event] is not None:
+            self._changes[event].update(ids)
+        if self._tx_depth == 0:
+            self._flush_changes()
+
+    def _flush_changes(self):
+        changes, self._changes = self._changes, {}
+        if not changes:
+            return
+        created = changes.get(TASKS_CREATED)
+        if created and changes.get(TASKS_UPDATED):
+            changes[TASKS_UPDATED] -= created  # 新建任务随后关联标签，不再重复通知
+        with _registry_lock:
+            listeners = list(_write_listeners)
+        if TAGS_CHANGED in changes:
+            for db in list(_instances):
+                if db is not self and db.key == self.key and db.tags is not None:
+                    db.tags.invalidate()
+        for event, ids in changes.items():
+            if ids is not None and not ids:
+                continue
+            for listener in listeners:
+                try:
+                    listener(self.key, event, sorted(ids) if ids is not None else None)
+                except Exception as e:
+                    print(f"写入监听器出错: {e}")
+
     def _execute_sql(self, sql: str, params: Tuple = None) -> sqlite3.Cursor:
-        """执行SQL语句的通用方法"""
+        """执行SQL语句的通用方法（事务外的写操作立即提交，读操作不提交）"""
         cursor = self.conn.cursor()
         try:
             if params:
                 cursor.execute(sql, params)
             else:
                 cursor.execute(sql)
-            self.conn.commit()
+            if self._tx_depth == 0 and self.conn.in_transaction:
+                self.conn.commit()
             return cursor
         except Error as e:
-            self.conn.rollback()
+            if self._tx_depth == 0:
+                self.conn.rollback()
             print(f"执行SQL失败: {e}\nSQL: {sql}")
             raise
 
-    def _create_tables(self):
-        """创建数据库表结构"""
-        tables = [
-            # 任务表
-            """
-            CREATE TABLE IF NOT EXISTS tasks (
-                task_id INTEGER PRIMARY KEY AUTOINCREMENT,
-                name TEXT NOT NULL,
-                description TEXT,
-                status TEXT NOT NULL DEFAULT '未开始'
-                    CHECK (status IN ('未开始', '进行中', '已完成', '已中断', '已归档')),
-                due_date DATE NOT NULL,
-                expected_income DECIMAL(10,2) CHECK (expected_income >= 0),
-                actual_income DECIMAL(10,2) CHECK (actual_income >= 0),
-                expense DECIMAL(10,2) CHECK (expense >= 0),
-                created_at DATETIME DEFAULT CURRENT_TIMESTAMP
-            )
-            """,
-            # 标签表
-            """
-            CREATE TABLE IF NOT EXISTS tags (
-                tag_id INTEGER PRIMARY KEY AUTOINCREMENT,
-                tag_name TEXT NOT NULL UNIQUE,
-                color TEXT
-            )
-            """,
-            # 任务-标签关联表
-            """
-            CREATE TABLE IF NOT EXISTS task_tags (
-                task_id INTEGER,
-                tag_id INTEGER,
-                PRIMARY KEY (task_id, tag_id),
-                FOREIGN KEY (task_id) REFERENCES tasks(task_id) ON DELETE CASCADE,
-                FOREIGN KEY (tag_id) REFERENCES tags(tag_id) ON DELETE CASCADE
-            )
-            """
-        ]
-
-        # 创建索引
-        indexes = [
-            "CREATE INDEX IF NOT EXISTS idx_tasks_status ON tasks(status)",
-            "CREATE INDEX IF NOT EXISTS idx_tasks_due_date ON tasks(due_date)"
-        ]
+    def _executemany_sql(self, sql: str, seq_of_params: Iterable[Tuple]) -> sqlite3.Cursor:
+        """批量执行同一条SQL语句（调用方负责包在事务中）"""
+        cursor = self.conn.cursor()
+        try:
+            cursor.executemany(sql, seq_of_params)
+            return cursor
+        except Error as e:
+            print(f"批量执行SQL失败: {e}\nSQL: {sql}")
+            raise
 
+    def _create_tables(self):
+        """检查并升级数据库表结构（见 schema.migrate）"""
         try:
-            cursor = self.conn.cursor()
-            for table_sql in tables:
-                cursor.execute(table_sql)
-            for index_sql in indexes:
-                cursor.execute(index_sql)
-            self.conn.commit()
-            print("数据库表结构创建成功")
+            if migrate(self.conn):
+                print("数据库表结构升级成功")
+            if ensure_fulltext(self.conn):
+                print("已补建全文索引")
         except Error as e:
-            self.conn.rollback()
-            print(f"创建表失败: {e}")
+            print(f"升级表结构失败: {e}")
             raise
 
+    def rebuild_rollups(self):
+        """全量重算财务汇总表（数据被外部工具修改后使用）"""
+        with self.transaction():
+            rebuild_rollups(self.conn.cursor())
+
     # ---------- 基础操作方法 ----------
     def create_task(self, 
                    name: str, 
                    due_date: date,
                    description: str = None,
                    expected_income: float = None,
-                   tags: List[str] = None) -> int:
-        """创建新任务并关联标签"""
+                   tags: List[str] = None,
+                   actual_income: float = None,
+                   expense: float = None) -> int:
+        """创建新任务并关联标签（单个事务内完成）"""
         sql = """
-        INSERT INTO tasks (name, description, due_date, expected_income)
-        VALUES (?, ?, ?, ?)
+        INSERT INTO tasks (name, description, due_date, expected_income,
+                           actual_income, expense)
+        VALUES (?, ?, ?, ?, ?, ?)
         """
-        params = (name, description, due_date.isoformat(), expected_income)
+        params = (name, description, _iso_date(due_date), expected_income,
+                  actual_income, expense)
         
         try:
-            cursor = self._execute_sql(sql, params)
-            task_id = cursor.lastrowid
-            
-            if tags:
-                self._link_tags_to_task(task_id, tags)
-                
+            with self.transaction():
+                cursor = self._execute_sql(sql, params)
+                task_id = cursor.lastrowid
+                self._record_change(TASKS_CREATED, [task_id])
+
+                if tags:
+                    self._link_tags_to_task(task_id, tags)
+
             return task_id
         except Error:
             return -1
 
     def _link_tags_to_task(self, task_id: int, tags: List[str]):
         """为任务关联标签（内部方法）"""
-        for tag_name in tags:
-            # 获取或创建标签
-            tag_id = self.get_or_create_tag(tag_name)
-            sql = "INSERT OR IGNORE INTO task_tags (task_id, tag_id) VALUES (?, ?)"
-            self._execute_sql(sql, (task_id, tag_id))
+        self.link_tags_many((task_id, tag_name) for tag_name in tags)
+
+    # ---------- 批量操作方法 ----------
+    def create_tasks(self, tasks: Iterable[dict]) -> List[int]:
+        """批量创建任务，全部在一个事务中写入
+
+        每个字典支持 name、due_date（必填）以及 description、status、
+        expected_income、actual_income、expense、tags。返回按输入顺序排列的任务ID。
+        """
+        tasks = list(tasks)
+        if not tasks:
+            return []
+
+        sql = """
+        INSERT INTO tasks (name, description, status, due_date,
+                           expected_income, actual_income, expense)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+        """
+        rows = [
+            (t["name"], t.get("description"), t.get("status") or "未开始",
+             _iso_date(t["due_date"]), t.get("expected_income"),
+             t.get("actual_income"), t.get("expense"))
+            for t in tasks
+        ]
+
+        with self.transaction():
+            # 事务持有写锁，AUTOINCREMENT 保证新ID单调递增且连续出现在 last_id 之后
+            last_id = self._execute_sql(
+                "SELECT COALESCE(MAX(task_id), 0) FROM tasks").fetchone()[0]
+            self._executemany_sql(sql, rows)
+            task_ids = [row[0] for row in self._execute_sql(
+                "SELECT task_id FROM tasks WHERE task_id > ? ORDER BY task_id",
+                (last_id,))]
+            self._record_change(TASKS_CREATED, task_ids)
+
+            self.link_tags_many(
+                ((task_id, tag_name)
+                 for task_id, t in zip(task_ids, tasks)
+                 for tag_name in (t.get("tags") or []))
+            )
+        return task_ids
+
+    def link_tags_many(self, pairs: Iterable[Tuple[int, str]]) -> int:
+        """批量关联 (任务ID, 标签名) 对，缺失的标签自动创建，返回新增关联数"""
+        with self.transaction():
+            rows = [(task_id, self.get_or_create_tag(tag_name))
+                    for task_id, tag_name in pairs]
+            if not rows:
+                return 0
+            cursor = self._executemany_sql(
+                "INSERT OR IGNORE INTO task_tags (task_id, tag_id) VALUES (?, ?)",
+                rows
+            )
+            self._record_change(TASKS_UPDATED, (task_id for task_id, _ in rows))
+        return cursor.rowcount
+
+    def update_status_many(self, task_ids: Iterable[int], new_status: str) -> int:
+        """批量更新任务状态（一个事务、按 IN 列表分块），返回受影响的行数"""
+        task_ids = list(dict.fromkeys(task_ids))
+        if not task_ids:
+            return 0
+        changed = 0
+        with self.transaction():
+            for start in range(0, len(task_ids), MAX_IN_PARAMS):
+                chunk = task_ids[start:start + MAX_IN_PARAMS]
+                placeholders = ", ".join("?" for _ in chunk)
+                changed += self._execute_sql(
+                    f"UPDATE tasks SET status = ? WHERE task_id IN ({placeholders}) "
+                    f"AND status != ?", (new_status, *chunk, new_status)).rowcount
+            self._record_change(TASKS_UPDATED, task_ids)
+        return changed
 
     def get_or_create_tag(self, tag_name: str, color: str = None) -> int:
         """获取或创建标签"""
@@ -128,69 +408,227 @@ class TaskManagerDB:
         if tag_id is not None:
             return tag_id
             
-        # 创建新标签
-        sql = "INSERT INTO tags (tag_name, color) VALUES (?, ?)"
-        params = (tag_name, color)
-        cursor = self._execute_sql(sql, params)
-        return cursor.lastrowid
+        # 缓存未命中：标签可能已由其他连接创建而本连接的缓存尚未作废，
+        # 冲突时不插入，再按名称读取ID
+        with self.transaction():
+            created = self._execute_sql(
+                "INSERT INTO tags (tag_name, color) VALUES (?, ?) "
+                "ON CONFLICT(tag_name) DO NOTHING", (tag_name, color)).rowcount
+            tag_id, color = self._execute_sql(
+                "SELECT tag_id, color FROM tags WHERE tag_name = ?", (tag_name,)).fetchone()
+            if created:
+                self._record_change(TAGS_CHANGED, [tag_id])
+        self.tags.add(tag_id, tag_name, color)
+        return tag_id
 
     def get_tag_id(self, tag_name: str) -> Optional[int]:
-        """根据标签名称获取ID"""
-        sql = "SELECT tag_id FROM tags WHERE tag_name = ?"
-        cursor = self._execute_sql(sql, (tag_name,))
-        result = cursor.fetchone()
-        return result[0] if result else None
+        """根据标签名称获取ID（走标签缓存）"""
+        return self.tags.id_of(tag_name)
+
+    def get_all_tags(self) -> List[Tuple[int, str, Optional[str]]]:
+        """获取全部标签 (tag_id, tag_name, color)，按名称排序（走标签缓存）"""
+        return self.tags.all()
+
+    def delete_tag(self, tag_id: int):
+        """删除标签（关联记录随外键级联删除）"""
+        with self.transaction():
+            task_ids = [row[0] for row in self._execute_sql(
+                "SELECT task_id FROM task_tags WHERE tag_id = ?", (tag_id,))]
+            self._execute_sql("DELETE FROM tags WHERE tag_id = ?", (tag_id,))
+            self._record_change(TAGS_CHANGED, [tag_id])
+            self._record_change(TASKS_UPDATED, task_ids)
+        self.tags.remove(tag_id)
+
+    # ---------- 归档 ----------
+    def archive_tasks(self, before: date,
+                      statuses: Tuple[str, ...] = ARCHIVABLE_STATUSES,
+                      batch_size: int = ARCHIVE_BATCH_SIZE,
+                      progress=None) -> int:
+        """把截止日期早于 before 的指定状态任务（连同标签关联）移入归档表
+
+        每批一个事务；progress(已归档数) 在每批提交后回调。返回归档的任务总数。
+        """
+        placeholders = ", ".join("?" for _ in statuses)
+        self.conn.execute(
+            "CREATE TEMP TABLE IF NOT EXISTS archive_batch (task_id INTEGER PRIMARY KEY)")
+        in_batch = "task_id IN (SELECT task_id FROM temp.archive_batch)"
+        moved = 0
+        while True:
+            with self.transaction():
+                self._execute_sql("DELETE FROM temp.archive_batch")
+                count = self._execute_sql(f"""
+                    INSERT INTO temp.archive_batch
+                    SELECT task_id FROM tasks
+                    WHERE status IN ({placeholders}) AND due_date < ?
+                    LIMIT ?
+                """, (*statuses, _iso_date(before), batch_size)).rowcount
+                if count == 0:
+                    break
+
+                self._execute_sql(f"""
+                    INSERT OR REPLACE INTO tasks_archive ({TASK_COLUMNS})
+                    SELECT {TASK_COLUMNS} FROM tasks WHERE {in_batch}
+                """)
+                self._execute_sql(f"""
+                    INSERT OR IGNORE INTO task_tags_archive (task_id, tag_id)
+                    SELECT task_id, tag_id FROM task_tags WHERE {in_batch}
+                """)
+                # 归档汇总按批累加；原任务删除时触发器会从活动汇总中扣减
+                self._execute_sql(rollup_upsert("daily_rollup_archive", f"""
+                    SELECT status, DATE(due_date), {grouped_rollup_sums()}
+                    FROM tasks WHERE {in_batch}
+                    GROUP BY status, DATE(due_date)
+                """))
+                self._execute_sql(rollup_upsert("daily_tag_rollup_archive", f"""
+                    SELECT tt.tag_id, t.status, DATE(t.due_date), {grouped_rollup_sums("t")}
+                    FROM task_tags tt JOIN tasks t ON t.task_id = tt.task_id
+                    WHERE t.{in_batch}
+                    GROUP BY tt.tag_id, t.status, DATE(t.due_date)
+                """))
+                self._record_change(TASKS_DELETED, (row[0] for row in self._execute_sql(
+                    "SELECT task_id FROM temp.archive_batch")))
+                self._execute_sql(f"DELETE FROM tasks WHERE {in_batch}")
+            moved += count
+            if progress:
+                progress(moved)
+        return moved
 
     # ---------- 查询方法 ----------
-    def get_task_details(self, task_id: int) -> dict:
-        """获取任务详情（含标签）"""
-        # 获取任务基本信息
-        task_sql = "SELECT * FROM tasks WHERE task_id = ?"
-        cursor = self._execute_sql(task_sql, (task_id,))
-        task = cursor.fetchone()
-        
-        if not task:
-            return None
-
-        # 获取关联标签
-        tag_sql = """
-        SELECT t.tag_name 
-        FROM task_tags tt
-        JOIN tags t ON tt.tag_id = t.tag_id
-        WHERE tt.task_id = ?
+    def get_task_details(self, task_id: int, include_archive: bool = True) -> Optional[dict]:
+        """获取任务详情（含标签）；活动表中没有时到归档表中查找
+
+        归档任务的字典中另有 archived_at 字段。
         """
-        cursor = self._execute_sql(tag_sql, (task_id,))
-        tags = [row[0] for row in cursor.fetchall()]
+        for tasks_table, tags_table in [LIVE_TABLES, ARCHIVE_TABLES][:2 if include_archive else 1]:
+            # 获取任务基本信息
+            cursor = self._execute_sql(
+                f"SELECT * FROM {tasks_table} WHERE task_id = ?", (task_id,))
+            task = cursor.fetchone()
+            if not task:
+                continue
+            columns = [col[0] for col in cursor.description]
 
-        # 转换为字典
-        columns = [col[0] for col in cursor.description]
-        return {
-            **dict(zip(columns, task)),
-            "tags": tags
-        }
+            # 获取关联标签
+            cursor = self._execute_sql(f"""
+                SELECT t.tag_name
+                FROM {tags_table} tt
+                JOIN tags t ON tt.tag_id = t.tag_id
+                WHERE tt.task_id = ?
+            """, (task_id,))
+            return {
+                **dict(zip(columns, task)),
+                "tags": [row[0] for row in cursor.fetchall()]
+            }
+        return None
 
     # ---------- 统计方法 ----------
-    def get_financial_summary(self) -> dict:
-        """获取财务汇总数据"""
-        sql = """
-        SELECT 
-            SUM(expected_income) AS total_expected,
-            SUM(actual_income) AS total_actual,
-            SUM(expense) AS total_expense
-        FROM tasks
+    # 以下方法均读取触发器维护的汇总表，代价与日期窗口内的天数成正比
+    @staticmethod
+    def _rollup_filter(status: str = None, start: date = None, end: date = None,
+                       tag_id: TagLike = None,
+                       include_archive: bool = False) -> Tuple[str, str, list]:
+        """返回 (汇总表名或子查询, WHERE子句, 参数)
+
+        tag_id 为多标签组合（TagFilter）时汇总表无法给出结果，改为对标签集合运算
+        选出的任务直接分组聚合，得到与汇总表同构的子查询。
+        """
+        if as_tag_filter(tag_id) and single_tag(tag_id) is None:
+            return TaskManagerDB._tagged_rollup(
+                status, start, end, tag_id, include_archive)
+        tag_id = single_tag(tag_id)
+        table = "daily_tag_rollup" if tag_id else "daily_rollup"
+        if include_archive:
+            table = f"(SELECT * FROM {table} UNION ALL SELECT * FROM {table}_archive)"
+        conditions, params = [], []
+        if tag_id:
+            conditions.append("tag_id = ?")
+            params.append(tag_id)
+        if status:
+            conditions.append("status = ?")
+            params.append(status)
+        if start:
+            conditions.append("day >= ?")
+            params.append(_iso_date(start))
+        if end:
+            conditions.append("day <= ?")
+            params.append(_iso_date(end))
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        return table, where, params
+
+    @staticmethod
+    def _tagged_rollup(status: Optional[str], start: Optional[date], end: Optional[date],
+                       tag_filter: TagLike,
+                       include_archive: bool) -> Tuple[str, str, list]:
+        selects, params = [], []
+        for table, tag_table in [LIVE_TABLES, ARCHIVE_TABLES][:2 if include_archive else 1]:
+            query = TaskQuery(table, tag_table).status(status).tag(tag_filter)
+            query.due_between(_iso_date(start) if start else None,
+                              day_range(end, end)[1] if end else None)
+            selects.append(
+                f"SELECT {table}.status, DATE({table}.due_date) AS day, "
+                f"{grouped_rollup_sums(table, named=True)} FROM {table} {query.where()} "
+                f"GROUP BY {table}.status, day")
+            params += query.params
+        return f"({' UNION ALL '.join(selects)})", "", params
+
+    def get_rollup_totals(self, status: str = None, start: date = None,
+                          end: date = None, tag_id: TagLike = None,
+                          include_archive: bool = False) -> dict:
+        """按状态/日期窗口（含两端）/标签汇总任务数与金额"""
+        table, where, params = self._rollup_filter(
+            status, start, end, tag_id, include_archive)
+        cursor = self._execute_sql(
+            f"SELECT {_rollup_sums()} FROM {table} {where}", tuple(params))
+        return _rollup_row_to_dict(cursor.fetchone())
+
+    def get_daily_rollup(self, status: str = None, start: date = None,
+                         end: date = None, tag_id: TagLike = None,
+                         include_archive: bool = False) -> Dict[str, dict]:
+        """按天返回汇总数据：{'YYYY-MM-DD': {task_count, expected_income, ...}}"""
+        table, where, params = self._rollup_filter(
+            status, start, end, tag_id, include_archive)
+        cursor = self._execute_sql(
+            f"SELECT day, {_rollup_sums()} FROM {table} {where} GROUP BY day",
+            tuple(params))
+        return {row[0]: _rollup_row_to_dict(row[1:]) for row in cursor}
+
+    def get_rollup_summary(self, status: str, start: date, end: date,
+                           tag_id: TagLike = None,
+                           include_archive: bool = False) -> Tuple[dict, Dict[str, dict]]:
+        """一次查询同时得到累计汇总和窗口 [start, end] 内的按天汇总
+
+        窗口外的行归入同一个分组（day 为 NULL），各分组相加即为累计值，
+        因此只扫描一遍汇总表（或多标签时的任务集合）。
+        返回 (累计汇总, {'YYYY-MM-DD': 当天汇总})。
         """
-        cursor = self._execute_sql(sql)
-        result = cursor.fetchone()
+        table, where, params = self._rollup_filter(
+            status, None, None, tag_id, include_archive)
+        cursor = self._execute_sql(
+            f"""SELECT CASE WHEN day >= ? AND day <= ? THEN day END AS window_day,
+                       {_rollup_sums()}
+                FROM {table} {where} GROUP BY window_day""",
+            tuple([_iso_date(start), _iso_date(end)] + params))
+        totals, daily = [0] * (len(ROLLUP_MEASURES) + 1), {}
+        for day, *sums in cursor:
+            totals = [total + value for total, value in zip(totals, sums)]
+            if day is not None:
+                daily[day] = _rollup_row_to_dict(sums)
+        return _rollup_row_to_dict(totals), daily
+
+    def get_financial_summary(self, include_archive: bool = False) -> dict:
+        """获取财务汇总数据"""
+        totals = self.get_rollup_totals(include_archive=include_archive)
         return {
-            "total_expected": result[0] or 0,
-            "total_actual": result[1] or 0,
-            "total_expense": result[2] or 0
+            "total_expected": totals["expected_income"],
+            "total_actual": totals["actual_income"],
+            "total_expense": totals["expense"]
         }
 
     def close(self):
         """关闭数据库连接"""
         if self.conn:
             self.conn.close()
+            self.conn = None
             print("数据库连接已关闭")
 
 # 使用示例
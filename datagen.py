@@ -0,0 +1,105 @@
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import date, timedelta
+from typing import Iterator, List
+
+from database import TaskManagerDB
+from importmodule import chunked
+from schema import TASK_STATUSES
+
+# 预设规模：名称 -> 任务数
+SIZES = {"10k": 10_000, "100k": 100_000, "1m": 1_000_000}
+DEFAULT_SEED = 20240501
+DEFAULT_TAG_COUNT = 2000
+DEFAULT_END_DATE = date(2025, 6, 30)  # 固定日期范围，保证同一种子生成的数据完全一致
+DATE_SPAN_DAYS = 3 * 365
+BATCH_SIZE = 10000
+
+# 状态分布：历史数据以已完成为主
+STATUS_WEIGHTS = {'未开始': 10, '进行中': 10, '已完成': 65, '已中断': 5, '已归档': 10}
+# 每个任务的标签数分布：0~4 个
+TAG_COUNT_WEIGHTS = [10, 35, 30, 15, 10]
+
+NAME_WORDS = ["探店", "测评", "开箱", "好物", "穿搭", "美妆", "护肤", "旅行",
+              "美食", "家居", "数码", "母婴", "健身", "宠物", "review", "vlog"]
+
+
+def tag_names(count: int) -> List[str]:
+    """生成固定的标签名列表"""
+    return [f"标签{i:04d}" for i in range(count)]
+
+
+def generate_tasks(count: int, seed: int = DEFAULT_SEED,
+                   tag_count: int = DEFAULT_TAG_COUNT,
+                   end_date: date = DEFAULT_END_DATE) -> Iterator[dict]:
+    """按种子确定性地生成任务字典（TaskManagerDB.create_tasks 的输入格式）
+
+    标签热度近似 Zipf 分布：少数标签覆盖大量任务，多数标签只有少量任务。
+    """
+    rng = random.Random(seed)
+    names = tag_names(tag_count)
+    tag_weights = [1 / (rank + 1) for rank in range(tag_count)]
+    statuses = [s for s in TASK_STATUSES if s in STATUS_WEIGHTS]
+    status_weights = [STATUS_WEIGHTS[s] for s in statuses]
+    start_date = end_date - timedelta(days=DATE_SPAN_DAYS)
+
+    for i in range(count):
+        status = rng.choices(statuses, status_weights)[0]
+        expected = round(rng.uniform(100, 5000), 2)
+        finished = status in ('已完成', '已归档')
+        n_tags = rng.choices(range(len(TAG_COUNT_WEIGHTS)), TAG_COUNT_WEIGHTS)[0]
+        yield {
+            "name": f"{rng.choice(NAME_WORDS)}{rng.choice(NAME_WORDS)}-{i}",
+            "description": f"合作方{rng.randrange(500)} {rng.choice(NAME_WORDS)} 推广",
+            "status": status,
+            "due_date": start_date + timedelta(days=rng.randrange(DATE_SPAN_DAYS + 1)),
+            "expected_income": expected,
+            "actual_income": round(expected * rng.uniform(0.8, 1.2), 2) if finished else None,
+            "expense": round(rng.uniform(0, 300), 2) if finished else 0.0,
+            "tags": list(dict.fromkeys(rng.choices(names, tag_weights, k=n_tags))),
+        }
+
+
+def build_database(path: str, count: int, seed: int = DEFAULT_SEED,
+                   tag_count: int = DEFAULT_TAG_COUNT, progress=None) -> TaskManagerDB:
+    """新建数据库文件并写入生成的数据（已存在的文件会被覆盖）"""
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+
+    db = TaskManagerDB(path)
+    with db.transaction():
+        for name in tag_names(tag_count):
+            db.get_or_create_tag(name)
+
+    written = 0
+    for batch in chunked(generate_tasks(count, seed, tag_count), BATCH_SIZE):
+        db.create_tasks(batch)
+        written += len(batch)
+        if progress:
+            progress(written, count)
+
+    db.conn.execute("ANALYZE")
+    db.conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    return db
+
+
+if __name__ == "__main__":
+    # 用法: python datagen.py 100k [-o bench_100k.db] [--seed N] [--tags N]
+    parser = argparse.ArgumentParser(description="生成用于性能测试的任务数据库")
+    parser.add_argument("size", choices=sorted(SIZES), help="任务规模")
+    parser.add_argument("-o", "--output", help="数据库文件（默认 bench_<size>.db）")
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED)
+    parser.add_argument("--tags", type=int, default=DEFAULT_TAG_COUNT, help="标签数")
+    args = parser.parse_args()
+
+    output = args.output or f"bench_{args.size}.db"
+    started = time.perf_counter()
+    db = build_database(
+        output, SIZES[args.size], args.seed, args.tags,
+        lambda done, total: print(f"\r已写入 {done}/{total}", end="", file=sys.stderr))
+    db.close()
+    print(f"\n生成 {output} 用时 {time.perf_counter() - started:.1f}s", file=sys.stderr)
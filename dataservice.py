@@ -0,0 +1,171 @@
+import threading
+from sqlite3 import OperationalError
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from PyQt5.QtCore import QObject, QRunnable, QThreadPool, pyqtSignal
+
+from database import DEFAULT_DB_FILE, TaskManagerDB, get_db
+
+READER_THREADS = 2
+
+_service: Optional["DataService"] = None
+
+
+def get_data_service() -> "DataService":
+    """获取进程内共享的后台数据服务（须在 GUI 线程首次调用）"""
+    global _service
+    if _service is None:
+        _service = DataService()
+    return _service
+
+
+class _JobSignals(QObject):
+    """QRunnable 不是 QObject，借助它把结果投递回 GUI 线程"""
+    finished = pyqtSignal(object)
+    failed = pyqtSignal(object)
+    cancelled = pyqtSignal()
+
+
+class _Job(QRunnable):
+    def __init__(self, service: "DataService", fn: Callable[[TaskManagerDB], Any],
+                 key: Optional[str], generation: int, writer: bool):
+        super().__init__()
+        self.service = service
+        self.fn = fn
+        self.key = key
+        self.generation = generation
+        self.writer = writer
+        self.signals = _JobSignals()
+
+    def run(self):
+        # 排队期间已被新请求取代，直接放弃
+        if not self.service._is_current(self.key, self.generation):
+            self.signals.cancelled.emit()
+            return
+        db = self.service._thread_db(self.writer)
+        self.service._mark_running(self.key, self.generation, db)
+        try:
+            result = self.fn(db)
+        except OperationalError as e:
+            if "interrupted" in str(e):
+                self.signals.cancelled.emit()  # 被 DataService.submit 中断的过期查询
+                return
+            self.signals.failed.emit(e)
+            return
+        except Exception as e:
+            self.signals.failed.emit(e)
+            return
+        finally:
+            self.service._mark_done(self.key, self.generation)
+        self.signals.finished.emit(result)
+
+
+class DataService(QObject):
+    """后台数据服务：查询在线程池中使用各自的只读连接执行，结果经信号回到 GUI 线程
+
+    - submit(key, ...) 以 key 区分请求类型，同一 key 的新请求会取消（并中断）旧请求，
+      过期结果不会回调；
+    - submit_write(...) 的写操作全部在同一个写线程中按顺序执行。
+    """
+
+    def __init__(self, db_file: str = DEFAULT_DB_FILE):
+        super().__init__()
+        self.db_file = db_file
+        get_db(db_file)  # 确保表结构已在主连接上检查过
+
+        self.read_pool = QThreadPool()
+        self.read_pool.setMaxThreadCount(READER_THREADS)
+        self.read_pool.setExpiryTimeout(-1)  # 保持线程（及其连接）常驻
+        self.write_pool = QThreadPool()
+        self.write_pool.setMaxThreadCount(1)  # 单写线程，写操作天然串行
+        self.write_pool.setExpiryTimeout(-1)
+
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._generations: Dict[str, int] = {}
+        self._running: Dict[str, Tuple[int, TaskManagerDB]] = {}
+        self._jobs = set()  # 持有引用，防止信号对象在回调前被回收
+
+    # ---------- 对外接口 ----------
+    def submit(self, key: str, fn: Callable[[TaskManagerDB], Any],
+               on_result: Callable[[Any], None],
+               on_error: Callable[[Exception], None] = None) -> int:
+        """在读线程执行 fn(db)，返回本次请求的序号"""
+        with self._lock:
+            generation = self._generations.get(key, 0) + 1
+            self._generations[key] = generation
+            running = self._running.get(key)
+            if running and running[0] < generation:
+                running[1].conn.interrupt()  # 中断仍在执行的过期查询
+        self._start(_Job(self, fn, key, generation, writer=False),
+                    on_result, on_error, self.read_pool)
+        return generation
+
+    def submit_write(self, fn: Callable[[TaskManagerDB], Any],
+                     on_result: Callable[[Any], None] = None,
+                     on_error: Callable[[Exception], None] = None):
+        """在写线程执行 fn(db)，完成后在 GUI 线程回调
+
+        页面不在这里刷新：提交后的变化由 TaskStore 经数据库写入监听细粒度通知；
+        标签修改提交时数据库层已作废各连接的标签缓存。
+        """
+        self._start(_Job(self, fn, None, 0, writer=True),
+                    on_result, on_error, self.write_pool)
+
+    def cancel(self, key: str):
+        """取消某类请求：在途结果将被丢弃"""
+        with self._lock:
+            self._generations[key] = self._generations.get(key, 0) + 1
+            running = self._running.get(key)
+            if running:
+                running[1].conn.interrupt()
+
+    def shutdown(self):
+        """等待在途任务结束（程序退出时调用）"""
+        for key in list(self._generations):
+            self.cancel(key)
+        self.read_pool.waitForDone()
+        self.write_pool.waitForDone()
+
+    # ---------- 内部实现 ----------
+    def _start(self, job: _Job, on_result, on_error, pool: QThreadPool):
+        def finish(result):
+            self._jobs.discard(job)
+            if on_result and self._is_current(job.key, job.generation):
+                on_result(result)
+
+        def fail(error):
+            self._jobs.discard(job)
+            if on_error and self._is_current(job.key, job.generation):
+                on_error(error)
+            elif not on_error:
+                print(f"后台查询失败: {error}")
+
+        job.setAutoDelete(False)
+        job.signals.finished.connect(finish)
+        job.signals.failed.connect(fail)
+        job.signals.cancelled.connect(lambda: self._jobs.discard(job))
+        self._jobs.add(job)
+        pool.start(job)
+
+    def _is_current(self, key: Optional[str], generation: int) -> bool:
+        return key is None or self._generations.get(key) == generation
+
+    def _thread_db(self, writer: bool) -> TaskManagerDB:
+        """每个工作线程一条连接：读线程只读，写线程可写"""
+        db = getattr(self._local, "db", None)
+        if db is None:
+            db = TaskManagerDB(self.db_file, read_only=not writer)
+            self._local.db = db
+        return db
+
+    def _mark_running(self, key: Optional[str], generation: int, db: TaskManagerDB):
+        if key is not None:
+            with self._lock:
+                self._running[key] = (generation, db)
+
+    def _mark_done(self, key: Optional[str], generation: int):
+        if key is not None:
+            with self._lock:
+                if self._running.get(key, (None,))[0] == generation:
+                    del self._running[key]
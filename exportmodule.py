@@ -0,0 +1,127 @@
+import csv
+import json
+import os
+import sqlite3
+from typing import Callable, Iterable, Iterator, Optional
+
+from querybuilder import TagLike, history_search_sql, history_tasks_sql
+
+FETCH_SIZE = 1000  # 每次从游标取出的行数
+PROGRESS_INTERVAL = 1000  # 每写出多少行报告一次进度
+
+# 导出字段：(JSON 键, 表头)；表头与 importmodule.COLUMN_ALIASES 一致，导出的文件可以再导入
+EXPORT_FIELDS = [
+    ("task_id", "任务ID"),
+    ("name", "任务名称"),
+    ("status", "状态"),
+    ("due_date", "截止时间"),
+    ("expected_income", "预计收入"),
+    ("actual_income", "实际收入"),
+    ("expense", "支出"),
+    ("tags", "标签"),
+]
+EXPORT_FORMATS = {"csv": "CSV 文件 (*.csv)", "xlsx": "Excel 工作簿 (*.xlsx)",
+                  "json": "JSON 文件 (*.json)"}
+
+
+class ExportError(Exception):
+    """导出无法进行（如缺少可选依赖）"""
+
+
+def iter_history_rows(conn: sqlite3.Connection, month: Optional[str], tag_id: TagLike,
+                      include_archive: bool = False, text: str = "",
+                      fulltext: bool = True, status: str = "已完成") -> Iterator[tuple]:
+    """逐批从游标读取符合历史页筛选条件的全部任务，按导出字段顺序产出
+
+    SQLite 按需逐行计算结果，这里每次只取 FETCH_SIZE 行，内存占用与总行数无关。
+    """
+    if text:
+        query, params = history_search_sql(
+            text, month, tag_id, status, include_archive, fulltext)
+        params = params + [-1, 0]  # LIMIT -1：不限行数
+    else:
+        query, params = history_tasks_sql(month, tag_id, status, include_archive)
+        params = params + [-1]
+    cursor = conn.execute(query, params)
+    try:
+        while True:
+            rows = cursor.fetchmany(FETCH_SIZE)
+            if not rows:
+                return
+            for task_id, name, due_date, expected, actual, expense, tags in rows:
+                yield task_id, name, status, due_date, expected, actual, expense, tags or ""
+    finally:
+        cursor.close()
+
+
+def _write_csv(rows: Iterable[tuple], path: str):
+    # 带 BOM 的 UTF-8，Excel 直接打开时中文不乱码
+    with open(path, "w", encoding="utf-8-sig", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow([header for _, header in EXPORT_FIELDS])
+        writer.writerows(rows)
+
+
+def _write_json(rows: Iterable[tuple], path: str):
+    """逐个写出数组元素，不在内存中构造整个列表"""
+    keys = [key for key, _ in EXPORT_FIELDS]
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("[")
+        for index, row in enumerate(rows):
+            f.write(",\n  " if index else "\n  ")
+            record = dict(zip(keys, row))
+            record["tags"] = [tag for tag in record["tags"].split(", ") if tag]
+            f.write(json.dumps(record, ensure_ascii=False))
+        f.write("\n]\n")
+
+
+def _write_xlsx(rows: Iterable[tuple], path: str):
+    try:
+        from openpyxl import Workbook
+    except ImportError:
+        raise ExportError("导出 Excel 需要安装 openpyxl（pip install openpyxl）")
+    # 只写模式：行写出后即落盘，内存占用不随行数增长
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet("历史任务")
+    sheet.append([header for _, header in EXPORT_FIELDS])
+    for row in rows:
+        sheet.append(row)
+    workbook.save(path)
+
+
+_WRITERS = {"csv": _write_csv, "json": _write_json, "xlsx": _write_xlsx}
+
+
+def export_rows(rows: Iterable[tuple], path: str, fmt: str = None,
+                progress: Callable[[int], None] = None) -> int:
+    """把行流式写入文件，返回写出的行数
+
+    fmt 省略时按扩展名判断。先写入临时文件，完成后再替换目标文件；
+    中途出错或被取消时不留下不完整的文件。
+    """
+    fmt = fmt or os.path.splitext(path)[1].lower().lstrip(".")
+    writer = _WRITERS.get(fmt)
+    if writer is None:
+        raise ExportError(f"不支持的导出格式: {fmt}")
+
+    written = 0
+
+    def counted() -> Iterator[tuple]:
+        nonlocal written
+        for row in rows:
+            yield row
+            written += 1
+            if progress and written % PROGRESS_INTERVAL == 0:
+                progress(written)
+
+    temp_path = f"{path}.part"
+    try:
+        writer(counted(), temp_path)
+        os.replace(temp_path, path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+    if progress:
+        progress(written)
+    return written
@@ -1,21 +1,59 @@
 import sys
-import sqlite3
-from datetime import datetime
+from collections import OrderedDict
+from datetime import date, datetime
 from PyQt5.QtWidgets import (QApplication, QWidget, QVBoxLayout, QHBoxLayout, QLabel, 
-                            QComboBox, QTableWidget, QTableWidgetItem, QHeaderView, 
-                            QPushButton, QDialog, QFormLayout, QGroupBox, QAbstractItemView)
-from PyQt5.QtCore import Qt, QDate
+                            QComboBox, QTableView, QHeaderView, 
+                            QPushButton, QDialog, QFormLayout, QGroupBox, QAbstractItemView,
+                            QCheckBox, QInputDialog, QMessageBox, QLineEdit,
+                            QFileDialog, QProgressDialog)
+from PyQt5.QtCore import Qt, QDate, QObject, QTimer, pyqtSignal
 from PyQt5.QtGui import QFont
+from database import get_db
+from dataservice import get_data_service
+from exportmodule import EXPORT_FORMATS, export_rows, iter_history_rows
+from historymodel import CHUNK_SIZE, HistoryTableModel, TaskIdRole, row_key
+from querybuilder import (history_count_sql, history_search_count_sql,
+                          history_search_sql, history_tasks_sql)
+from tagfilter import TagFilterButton
+from taskstore import get_task_store
+
+# 搜索框停止输入多久后再查询（毫秒）
+SEARCH_DELAY_MS = 300
+# 已读取/预取的块最多缓存多少个（跨筛选条件，按最近使用淘汰）
+CHUNK_CACHE_SIZE = 32
+
+class _ExportProgress(QObject):
+    """导出在读线程中进行，经由该对象的信号把已写出的行数排队送回 GUI 线程"""
+    progressed = pyqtSignal(int)
+
 
 class TaskHistoryPage(QWidget):
     def __init__(self):
         super().__init__()
-        self.db_conn = sqlite3.connect('task_manager1.db')  # 修改为你的数据库路径
-        self.current_page = 1
+        self.db = get_db()
+        self.db_conn = self.db.conn
+        self.data_service = get_data_service()
+        # 各筛选组合 (月份, 标签, 含归档, 搜索) 的任务总数，数据变化时清空
+        self.total_counts = {}
+        # (筛选条件, 块号) -> 行；切换回看过的月份或滚动到相邻块时直接使用
+        self.chunk_cache = OrderedDict()
+        # 数据版本：每次数据变化加一；查询发出后版本已变化时，结果来自旧数据，不写入缓存
+        self.data_epoch = 0
+        self.model = HistoryTableModel(self)
+        self.model.chunkRequested.connect(self.load_chunk)
         self.init_ui()
         self.load_months()
         self.load_tags()
         self.load_tasks()
+        
+        # 只显示已完成任务：涉及已完成任务的变化才刷新，同一轮事件中的多次变化合并
+        self.refresh_timer = QTimer(self)
+        self.refresh_timer.setSingleShot(True)
+        self.refresh_timer.timeout.connect(self.refresh)
+        task_store = get_task_store()
+        task_store.completedTasksChanged.connect(self.refresh_timer.start)
+        task_store.reset.connect(self.refresh_timer.start)
+        task_store.tagsChanged.connect(self.load_tags)
 
     def init_ui(self):
         self.setWindowTitle('任务历史记录')
@@ -34,37 +72,64 @@ class TaskHistoryPage(QWidget):
         filter_layout.addWidget(month_label)
         filter_layout.addWidget(self.month_combo)
         
-        # 标签筛选
+        # 标签筛选（可组合多个标签：且/或/非）
         tag_label = QLabel("标签筛选:")
-        self.tag_combo = QComboBox()
-        self.tag_combo.setMinimumWidth(150)
+        self.tag_filter_btn = TagFilterButton()
+        self.tag_filter_btn.setMinimumWidth(150)
         filter_layout.addWidget(tag_label)
-        filter_layout.addWidget(self.tag_combo)
+        filter_layout.addWidget(self.tag_filter_btn)
+        
+        # 名称/描述搜索（全文索引，按相关度排序）
+        self.search_input = QLineEdit()
+        self.search_input.setPlaceholderText("搜索名称或描述")
+        self.search_input.setClearButtonEnabled(True)
+        self.search_input.setMinimumWidth(180)
+        filter_layout.addWidget(self.search_input)
+        self.search_timer = QTimer(self)
+        self.search_timer.setSingleShot(True)
+        self.search_timer.setInterval(SEARCH_DELAY_MS)
+        
+        # 是否包含归档任务
+        self.archive_check = QCheckBox("包含归档")
+        filter_layout.addWidget(self.archive_check)
         
         # 添加占位符使按钮居右
         filter_layout.addStretch()
         
+        # 归档按钮
+        self.archive_btn = QPushButton("归档旧任务")
+        self.archive_btn.setFixedWidth(100)
+        filter_layout.addWidget(self.archive_btn)
+        
         # 刷新按钮
         self.refresh_btn = QPushButton("刷新")
         self.refresh_btn.setFixedWidth(100)
         filter_layout.addWidget(self.refresh_btn)
         
+        # 导出按钮
+        self.export_btn = QPushButton("导出")
+        self.export_btn.setFixedWidth(100)
+        filter_layout.addWidget(self.export_btn)
+        
         main_layout.addLayout(filter_layout)
 
-        # 任务表格
-        self.table = QTableWidget()
-        self.table.setColumnCount(6)
-        self.table.setHorizontalHeaderLabels(["任务名称", "完成日期", "预期收入", "实际收入", "支出", "标签"])
-        self.table.horizontalHeader().setSectionResizeMode(0, QHeaderView.Stretch)
-        self.table.horizontalHeader().setSectionResizeMode(1, QHeaderView.ResizeToContents)
-        self.table.horizontalHeader().setSectionResizeMode(2, QHeaderView.ResizeToContents)
-        self.table.horizontalHeader().setSectionResizeMode(3, QHeaderView.ResizeToContents)
-        self.table.horizontalHeader().setSectionResizeMode(4, QHeaderView.ResizeToContents)
-        self.table.horizontalHeader().setSectionResizeMode(5, QHeaderView.Stretch)
+        # 任务表格：模型按块载入并只保留最近显示的块，单元格文字在显示时才格式化
+        self.table = QTableView()
+        self.table.setModel(self.model)
+        header = self.table.horizontalHeader()
+        header.setSectionResizeMode(QHeaderView.Interactive)
+        header.setSectionResizeMode(0, QHeaderView.Stretch)
+        header.setSectionResizeMode(5, QHeaderView.Stretch)
+        for column in (1, 2, 3, 4):
+            self.table.setColumnWidth(column, 110)
+        # 固定行高，视图无需逐行计算高度
+        self.table.verticalHeader().setSectionResizeMode(QHeaderView.Fixed)
+        self.table.verticalHeader().setDefaultSectionSize(28)
+        self.table.verticalHeader().hide()
         self.table.setSelectionBehavior(QAbstractItemView.SelectRows)
         self.table.setEditTriggers(QAbstractItemView.NoEditTriggers)
         self.table.setStyleSheet("""
-            QTableWidget {
+            QTableView {
                 gridline-color: #e0e0e0;
                 font-size: 12px;
             }
@@ -78,46 +143,40 @@ class TaskHistoryPage(QWidget):
         
         main_layout.addWidget(self.table)
 
-        # 分页控件
-        page_layout = QHBoxLayout()
-        page_layout.addStretch()
-        
-        self.prev_btn = QPushButton("上一页")
-        self.prev_btn.setFixedWidth(80)
-        page_layout.addWidget(self.prev_btn)
-        
-        self.page_label = QLabel("第 1 页")
-        self.page_label.setFixedWidth(80)
-        self.page_label.setAlignment(Qt.AlignCenter)
-        page_layout.addWidget(self.page_label)
-        
-        self.next_btn = QPushButton("下一页")
-        self.next_btn.setFixedWidth(80)
-        page_layout.addWidget(self.next_btn)
-        
-        page_layout.addStretch()
-        main_layout.addLayout(page_layout)
+        # 结果总数
+        self.count_label = QLabel()
+        self.count_label.setAlignment(Qt.AlignCenter)
+        main_layout.addWidget(self.count_label)
         
         self.setLayout(main_layout)
 
         # 事件绑定
-        self.month_combo.currentIndexChanged.connect(self.reset_page)
-        self.tag_combo.currentIndexChanged.connect(self.reset_page)
-        self.refresh_btn.clicked.connect(self.load_tasks)
-        self.prev_btn.clicked.connect(self.prev_page)
-        self.next_btn.clicked.connect(self.next_page)
-        self.table.cellDoubleClicked.connect(self.show_task_detail)
+        self.month_combo.currentIndexChanged.connect(self.load_tasks)
+        self.tag_filter_btn.filterChanged.connect(self.load_tasks)
+        self.search_input.textChanged.connect(self.search_timer.start)
+        self.search_timer.timeout.connect(self.load_tasks)
+        self.archive_check.toggled.connect(self.on_archive_toggled)
+        self.archive_btn.clicked.connect(self.archive_old_tasks)
+        self.refresh_btn.clicked.connect(self.refresh)
+        self.export_btn.clicked.connect(self.export_tasks)
+        self.table.doubleClicked.connect(self.show_task_detail)
 
     def load_months(self):
         """加载可用的月份"""
+        # 读取日汇总表，行数与天数成正比而非任务数
+        rollup = "daily_rollup"
+        if self.archive_check.isChecked():
+            rollup = "(SELECT * FROM daily_rollup UNION ALL SELECT * FROM daily_rollup_archive)"
         cursor = self.db_conn.cursor()
-        cursor.execute("""
-            SELECT DISTINCT strftime('%Y-%m', due_date) AS month 
-            FROM tasks 
+        cursor.execute(f"""
+            SELECT DISTINCT substr(day, 1, 7) AS month 
+            FROM {rollup} 
             WHERE status = '已完成'
-            ORDER BY due_date DESC
+            ORDER BY month DESC
         """)
         
+        selected = self.month_combo.currentData()
+        self.month_combo.blockSignals(True)
         self.month_combo.clear()
         self.month_combo.addItem("全部月份", None)
         
@@ -125,192 +184,269 @@ class TaskHistoryPage(QWidget):
             year, month_num = month.split('-')
             month_name = f"{year}年{int(month_num)}月"
             self.month_combo.addItem(month_name, month)
+        
+        index = self.month_combo.findData(selected)
+        self.month_combo.setCurrentIndex(max(index, 0))
+        self.month_combo.blockSignals(False)
     
     def load_tags(self):
-        """加载标签数据"""
-        cursor = self.db_conn.cursor()
-        cursor.execute("SELECT tag_id, tag_name FROM tags ORDER BY tag_name")
-        
-        self.tag_combo.clear()
-        self.tag_combo.addItem("全部标签", None)
-        
-        for tag_id, tag_name in cursor.fetchall():
-            self.tag_combo.addItem(tag_name, tag_id)
+        """加载标签数据（保留当前选择）"""
+        if self.tag_filter_btn.load_tags(self.db.get_all_tags()):
+            self.load_tasks()  # 筛选中的标签已被删除
+    
+    def refresh(self):
+        """重新读取月份列表和任务列表（数据已变化，缓存的总数和块作废）"""
+        self.data_epoch += 1
+        self.total_counts.clear()
+        self.chunk_cache.clear()
+        self.data_service.cancel("history_prefetch")
+        self.load_months()
+        self.load_tasks()
     
     def get_selected_month(self):
         """获取选中的月份值"""
         return self.month_combo.currentData()
     
     def get_selected_tag(self):
-        """获取选中的标签ID"""
-        return self.tag_combo.currentData()
+        """获取标签筛选（TagFilter，未筛选时为 None）"""
+        return self.tag_filter_btn.tag_filter()
     
-    def reset_page(self):
-        """重置分页到第一页"""
-        self.current_page = 1
+    def get_search_text(self):
+        """获取搜索文字"""
+        return self.search_input.text().strip()
+    
+    def on_archive_toggled(self):
+        """切换是否包含归档：月份列表随之变化"""
+        self.load_months()
         self.load_tasks()
     
-    def prev_page(self):
-        """跳转到上一页"""
-        if self.current_page > 1:
-            self.current_page -= 1
-            self.load_tasks()
+    def archive_old_tasks(self):
+        """把若干个月之前的已完成/已归档任务移入归档表"""
+        months, ok = QInputDialog.getInt(
+            self, "归档旧任务", "归档多少个月之前的已完成任务:", 12, 1, 120)
+        if not ok:
+            return
+        
+        today = date.today()
+        year, month = divmod(today.year * 12 + today.month - 1 - months, 12)
+        cutoff = date(year, month + 1, 1)
+        reply = QMessageBox.question(
+            self, "确认归档",
+            f"将截止日期早于 {cutoff.isoformat()} 的已完成/已归档任务移入归档表，是否继续？",
+            QMessageBox.Yes | QMessageBox.No)
+        if reply != QMessageBox.Yes:
+            return
+        
+        self.archive_btn.setEnabled(False)
+        
+        def on_archived(count):
+            self.archive_btn.setEnabled(True)
+            QMessageBox.information(self, "归档完成", f"已归档 {count} 个任务")
+            self.refresh()
+        
+        def on_error(error):
+            self.archive_btn.setEnabled(True)
+            QMessageBox.critical(self, "归档失败", str(error))
+        
+        self.data_service.submit_write(
+            lambda db: db.archive_tasks(cutoff), on_archived, on_error)
     
-    def next_page(self):
-        """跳转到下一页"""
-        # 先获取任务总数以确定最大页数
-        total_tasks = self.get_total_tasks()
-        total_pages = (total_tasks + 9) // 10  # 向上取整
-        
-        if self.current_page < total_pages:
-            self.current_page += 1
-            self.load_tasks()
+    def current_filter(self):
+        """(月份, 标签, 含归档, 搜索文字)"""
+        return (self.get_selected_month(), self.get_selected_tag(),
+                self.archive_check.isChecked(), self.get_search_text())
     
-    def get_total_tasks(self):
-        """获取符合条件的任务总数"""
-        month = self.get_selected_month()
-        tag_id = self.get_selected_tag()
-        
-        query = """
-            SELECT COUNT(DISTINCT tasks.task_id)
-            FROM tasks
-            LEFT JOIN task_tags ON tasks.task_id = task_tags.task_id
-            WHERE tasks.status = '已完成'
-        """
-        params = []
-        
-        if month:
-            query += " AND strftime('%Y-%m', due_date) = ?"
-            params.append(month)
-        
-        if tag_id:
-            query += " AND task_tags.tag_id = ?"
-            params.append(tag_id)
+    @staticmethod
+    def fetch_chunk(db, task_filter, chunk, after):
+        """查询一块任务（在后台读线程执行）
         
-        cursor = self.db_conn.cursor()
-        cursor.execute(query, params)
-        return cursor.fetchone()[0]
+        按日期浏览时用键集分页：after 为上一块最后一行的 (due_date, task_id)，
+        沿 (status, due_date) 索引直接定位；搜索结果按相关度排序，按偏移分页。
+        """
+        month, tag_id, include_archive, text = task_filter
+        if text:
+            query, params = history_search_sql(
+                text, month, tag_id, include_archive=include_archive, fulltext=db.has_fulltext)
+            return db.conn.execute(query, params + [CHUNK_SIZE, chunk * CHUNK_SIZE]).fetchall()
+        query, params = history_tasks_sql(
+            month, tag_id, include_archive=include_archive, after=after)
+        return db.conn.execute(query, params + [CHUNK_SIZE]).fetchall()
+    
+    @staticmethod
+    def fetch_count(db, task_filter):
+        """符合条件的任务总数（在后台读线程执行）"""
+        month, tag_id, include_archive, text = task_filter
+        if text:
+            query, params = history_search_count_sql(
+                text, month, tag_id, include_archive=include_archive, fulltext=db.has_fulltext)
+        else:
+            query, params = history_count_sql(month, tag_id, include_archive=include_archive)
+        return db.conn.execute(query, params).fetchone()[0]
     
     def load_tasks(self):
-        """加载并显示任务数据"""
-        month = self.get_selected_month()
-        tag_id = self.get_selected_tag()
-        offset = (self.current_page - 1) * 10
-        
-        # 查询任务数据
-        query = """
-            SELECT 
-                tasks.task_id, 
-                tasks.name, 
-                tasks.due_date, 
-                tasks.expected_income, 
-                tasks.actual_income, 
-                tasks.expense,
-                GROUP_CONCAT(tags.tag_name, ', ') AS tags
-            FROM tasks
-            LEFT JOIN task_tags ON tasks.task_id = task_tags.task_id
-            LEFT JOIN tags ON task_tags.tag_id = tags.tag_id
-            WHERE tasks.status = '已完成'
-        """
-        params = []
-        
-        if month:
-            query += " AND strftime('%Y-%m', due_date) = ?"
-            params.append(month)
-        
-        if tag_id:
-            query += " AND task_tags.tag_id = ?"
-            params.append(tag_id)
+        """按当前筛选条件重新载入：清空表格后由视图按需分块读取"""
+        self.model.reset()
+        self.model.fetchMore()
+        self.load_count()
+    
+    def load_chunk(self, chunk, after):
+        """模型需要某一块数据时填入模型：先查缓存，未命中再到后台查询"""
+        task_filter = self.current_filter()
+        generation = self.model.generation
+        epoch = self.data_epoch
+        
+        def on_loaded(rows):
+            self.cache_chunk(epoch, task_filter, chunk, rows)
+            if generation == self.model.generation:
+                self.model.set_chunk(generation, chunk, rows)
+                self.prefetch_around(task_filter, chunk, rows)
+        
+        rows = self.chunk_cache.get((task_filter, chunk))
+        if rows is not None:
+            self.chunk_cache.move_to_end((task_filter, chunk))
+            # 请求可能来自视图绘制过程中的 data()，推迟到下一轮事件循环再修改模型
+            QTimer.singleShot(0, lambda: on_loaded(rows))
+            return
+        
+        def on_error(error):
+            self.model.cancel_chunk(generation, chunk)
+            QMessageBox.critical(self, "数据库错误", f"加载任务失败: {error}")
+        
+        self.data_service.submit(
+            f"history_chunk:{chunk}",
+            lambda db: self.fetch_chunk(db, task_filter, chunk, after),
+            on_loaded,
+            on_error
+        )
+    
+    def cache_chunk(self, epoch, task_filter, chunk, rows):
+        if epoch != self.data_epoch:
+            return  # 查询期间数据已变化
+        self.chunk_cache[(task_filter, chunk)] = rows
+        self.chunk_cache.move_to_end((task_filter, chunk))
+        while len(self.chunk_cache) > CHUNK_CACHE_SIZE:
+            self.chunk_cache.popitem(last=False)
+    
+    def prefetch_around(self, task_filter, chunk, rows):
+        """显示一块后在后台预取下一块，以及模型已淘汰的上一块"""
+        targets = []
+        if len(rows) == CHUNK_SIZE:
+            targets.append((chunk + 1, row_key(rows[-1])))
+        if chunk > 0 and not self.model.has_chunk(chunk - 1):
+            targets.append((chunk - 1, self.model.anchor(chunk - 1)))
+        targets = [(target, after) for target, after in targets
+                   if (task_filter, target) not in self.chunk_cache
+                   and (target == 0 or after is not None or task_filter[3])]
+        if not targets:
+            return
+        epoch = self.data_epoch
+        
+        def on_prefetched(results):
+            for target, target_rows in results:
+                self.cache_chunk(epoch, task_filter, target, target_rows)
+        
+        # 只保留最新一次预取；失败时不提示，等真正需要时再正常读取
+        self.data_service.submit(
+            "history_prefetch",
+            lambda db: [(target, self.fetch_chunk(db, task_filter, target, after))
+                        for target, after in targets],
+            on_prefetched,
+            lambda error: None
+        )
+    
+    def load_count(self):
+        """显示结果总数（按筛选条件缓存，数据变化时才重新统计）"""
+        task_filter = self.current_filter()
+        total = self.total_counts.get(task_filter)
+        if total is not None:
+            self.render_count(total)
+            return
+        
+        epoch = self.data_epoch
+        
+        def on_loaded(total):
+            if epoch != self.data_epoch:
+                return  # 查询期间数据已变化，refresh() 已重新统计
+            self.total_counts[task_filter] = total
+            if task_filter == self.current_filter():
+                self.render_count(total)
+        
+        self.count_label.setText("正在统计...")
+        self.data_service.submit(
+            "history_count", lambda db: self.fetch_count(db, task_filter), on_loaded)
+    
+    def render_count(self, total):
+        self.count_label.setText(f"共 {total} 个任务")
+    
+    def export_tasks(self):
+        """把当前筛选条件下的全部任务导出为 CSV/XLSX/JSON
         
-        query += """
-            GROUP BY tasks.task_id
-            ORDER BY tasks.due_date DESC
-            LIMIT 10 OFFSET ?
+        在后台读线程中从游标逐批读取并写入文件，内存占用与任务数无关，窗口保持响应。
         """
-        params.append(offset)
-        
-        cursor = self.db_conn.cursor()
-        cursor.execute(query, params)
-        tasks = cursor.fetchall()
-        
-        # 更新表格
-        self.table.setRowCount(len(tasks))
-        
-        for row, task in enumerate(tasks):
-            task_id, name, due_date, expected_income, actual_income, expense, tags = task
-            
-            # 转换日期格式
-            formatted_date = QDate.fromString(due_date, "yyyy-MM-dd").toString("yyyy-MM-dd")
-            
-            # 填充表格
-            self.table.setItem(row, 0, QTableWidgetItem(name))
-            self.table.setItem(row, 1, QTableWidgetItem(formatted_date))
-            self.table.setItem(row, 2, QTableWidgetItem(f"¥{expected_income:,.2f}"))
-            self.table.setItem(row, 3, QTableWidgetItem(f"¥{actual_income:,.2f}"))
-            self.table.setItem(row, 4, QTableWidgetItem(f"¥{expense:,.2f}"))
-            self.table.setItem(row, 5, QTableWidgetItem(tags if tags else "无标签"))
-            
-            # 存储task_id在隐藏列中
-            self.table.setItem(row, 0, QTableWidgetItem(name))
-            self.table.item(row, 0).setData(Qt.UserRole, task_id)
-        
-        # 更新分页信息
-        total_tasks = self.get_total_tasks()
-        total_pages = (total_tasks + 9) // 10  # 向上取整
-        
-        self.page_label.setText(f"第 {self.current_page} 页 / 共 {total_pages} 页")
-        self.prev_btn.setEnabled(self.current_page > 1)
-        self.next_btn.setEnabled(self.current_page < total_pages)
+        path, selected = QFileDialog.getSaveFileName(
+            self, "导出历史任务", "历史任务.csv", ";;".join(EXPORT_FORMATS.values()))
+        if not path:
+            return
+        fmt = next(fmt for fmt, label in EXPORT_FORMATS.items() if label == selected) \
+            if selected in EXPORT_FORMATS.values() else "csv"
+        if not path.lower().endswith(f".{fmt}"):
+            path += f".{fmt}"
+        
+        task_filter = self.current_filter()
+        month, tag_id, include_archive, text = task_filter
+        total = self.total_counts.get(task_filter, 0)
+        progress_dialog = QProgressDialog("正在导出任务...", "取消", 0, total, self)
+        progress_dialog.setWindowTitle("导出")
+        progress_dialog.setWindowModality(Qt.WindowModal)
+        progress_dialog.setMinimumDuration(0)
+        progress = _ExportProgress(progress_dialog)
+        progress.progressed.connect(progress_dialog.setValue)
+        progress.progressed.connect(
+            lambda written: progress_dialog.setLabelText(f"已导出 {written} 个任务"))
+        
+        def write(db):
+            rows = iter_history_rows(db.conn, month, tag_id, include_archive, text,
+                                     db.has_fulltext)
+            return export_rows(rows, path, fmt, progress.progressed.emit)
+        
+        def on_exported(count):
+            progress_dialog.close()
+            QMessageBox.information(self, "导出完成", f"已导出 {count} 个任务到\n{path}")
+        
+        def on_error(error):
+            progress_dialog.close()
+            QMessageBox.critical(self, "导出失败", str(error))
+        
+        # 取消时中断后台查询，未写完的临时文件随之删除
+        progress_dialog.canceled.connect(lambda: self.data_service.cancel("history_export"))
+        self.data_service.submit("history_export", write, on_exported, on_error)
     
-    def show_task_detail(self, row, column):
+    def show_task_detail(self, index):
         """显示任务详情弹窗"""
-        task_id_item = self.table.item(row, 0)
-        task_id = task_id_item.data(Qt.UserRole)
+        task_id = index.data(TaskIdRole)
         
         if task_id:
-            dialog = TaskDetailDialog(task_id, self.db_conn)
+            dialog = TaskDetailDialog(task_id, self.db)
             dialog.exec_()
 
 
 class TaskDetailDialog(QDialog):
-    def __init__(self, task_id, db_conn):
+    def __init__(self, task_id, db):
         super().__init__()
         self.task_id = task_id
-        self.db_conn = db_conn
+        self.db = db
         self.setWindowTitle("任务详情")
         self.setMinimumWidth(500)
         self.load_task_data()
         self.init_ui()
 
     def load_task_data(self):
-        """从数据库加载任务详情数据"""
-        cursor = self.db_conn.cursor()
-        
-        # 查询任务基本信息
-        cursor.execute("""
-            SELECT 
-                name, description, status, due_date, 
-                expected_income, actual_income, expense, created_at
-            FROM tasks
-            WHERE task_id = ?
-        """, (self.task_id,))
-        
-        task_data = cursor.fetchone()
-        if task_data:
-            (self.name, self.description, self.status, self.due_date, 
-             self.expected_income, self.actual_income, self.expense, self.created_at) = task_data
-        
-        # 查询任务标签
-        cursor.execute("""
-            SELECT tags.tag_name
-            FROM task_tags
-            JOIN tags ON task_tags.tag_id = tags.tag_id
-            WHERE task_tags.task_id = ?
-        """, (self.task_id,))
-        
-        self.tags = [tag[0] for tag in cursor.fetchall()]
-        if not self.tags:
-            self.tags = ["无标签"]
+        """从数据库加载任务详情数据（活动表中没有时到归档表中查找）"""
+        task = self.db.get_task_details(self.task_id)
+        for column in ("name", "description", "status", "due_date",
+                       "expected_income", "actual_income", "expense", "created_at"):
+            setattr(self, column, task[column])
+        self.tags = task["tags"] or ["无标签"]
 
     def init_ui(self):
         layout = QVBoxLayout()
@@ -0,0 +1,147 @@
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+from PyQt5.QtCore import QAbstractTableModel, QModelIndex, Qt, pyqtSignal
+
+HISTORY_COLUMNS = ["任务名称", "完成日期", "预期收入", "实际收入", "支出", "标签"]
+CHUNK_SIZE = 200   # 每次从数据库读取的行数
+MAX_CHUNKS = 8     # 内存中最多保留的块数，超出时淘汰最久未显示的块
+
+TaskIdRole = Qt.UserRole + 1
+
+# 查询行：(task_id, name, due_date, expected_income, actual_income, expense, tags)
+_MONEY_COLUMNS = {2: 3, 3: 4, 4: 5}  # 表格列 -> 查询行中的金额字段
+
+
+def row_key(row) -> Tuple[str, int]:
+    """行在历史列表中的排序键 (due_date, task_id)"""
+    return row[2], row[0]
+
+
+class HistoryTableModel(QAbstractTableModel):
+    """已完成任务的虚拟化表格模型
+
+    行按 CHUNK_SIZE 分块载入：视图滚动到底部时 fetchMore 发出
+    chunkRequested(块号, 上一块最后一行的排序键)，由页面在后台查询后调用 set_chunk。
+    内存中只保留最近显示过的 MAX_CHUNKS 块，其余块只记住起点的排序键；
+    滚动回被淘汰的块时按该键重新读取，因此滚动多远内存占用都不变。
+    单元格文字在 data() 中按需格式化，不预先生成。
+    """
+
+    chunkRequested = pyqtSignal(int, object)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._row_count = 0
+        self._chunks: "OrderedDict[int, list]" = OrderedDict()  # 块号 -> 行，按最近使用排序
+        self._anchors: Dict[int, Optional[Tuple[str, int]]] = {0: None}  # 块号 -> 起点之前的键
+        self._requested = set()  # 已请求、尚未返回的块
+        self._exhausted = False
+        self.generation = 0  # 每次重置加一，丢弃重置前发出的请求的结果
+
+    def rowCount(self, parent=QModelIndex()) -> int:
+        return 0 if parent.isValid() else self._row_count
+
+    def columnCount(self, parent=QModelIndex()) -> int:
+        return 0 if parent.isValid() else len(HISTORY_COLUMNS)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return HISTORY_COLUMNS[section]
+        return None
+
+    def data(self, index: QModelIndex, role: int = Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        row = self._row(index.row())
+        if row is None:
+            return "…" if role == Qt.DisplayRole and index.column() == 0 else None
+        column = index.column()
+        if role == Qt.DisplayRole:
+            if column == 0:
+                return row[1]
+            if column == 1:
+                return str(row[2])[:10]
+            if column in _MONEY_COLUMNS:
+                return f"¥{row[_MONEY_COLUMNS[column]] or 0:,.2f}"
+            return row[6] or "无标签"
+        if role == Qt.TextAlignmentRole and column in _MONEY_COLUMNS:
+            return int(Qt.AlignRight | Qt.AlignVCenter)
+        if role == TaskIdRole:
+            return row[0]
+        return None
+
+    def _row(self, row: int):
+        chunk, offset = divmod(row, CHUNK_SIZE)
+        rows = self._chunks.get(chunk)
+        if rows is None:
+            self._request(chunk)  # 已被淘汰，按记住的起点重新读取
+            return None
+        self._chunks.move_to_end(chunk)
+        return rows[offset] if offset < len(rows) else None
+
+    # ---------- 分块载入 ----------
+    def canFetchMore(self, parent=QModelIndex()) -> bool:
+        next_chunk = self._row_count // CHUNK_SIZE
+        return (not parent.isValid() and not self._exhausted
+                and next_chunk not in self._requested)
+
+    def fetchMore(self, parent=QModelIndex()):
+        if self.canFetchMore(parent):
+            self._request(self._row_count // CHUNK_SIZE)
+
+    def _request(self, chunk: int):
+        if chunk in self._requested or chunk not in self._anchors:
+            return
+        self._requested.add(chunk)
+        self.chunkRequested.emit(chunk, self._anchors[chunk])
+
+    def set_chunk(self, generation: int, chunk: int, rows: List[tuple]):
+        """填入一块查询结果；generation 与当前不符（期间已重置）时忽略"""
+        if generation != self.generation:
+            return
+        self._requested.discard(chunk)
+        first = chunk * CHUNK_SIZE
+        if rows:
+            self._anchors[chunk + 1] = row_key(rows[-1])
+        self._chunks[chunk] = rows
+        self._chunks.move_to_end(chunk)
+        while len(self._chunks) > MAX_CHUNKS:
+            self._chunks.popitem(last=False)
+
+        if first >= self._row_count:
+            # 新的一块：追加行
+            if len(rows) < CHUNK_SIZE:
+                self._exhausted = True
+            if rows:
+                self.beginInsertRows(QModelIndex(), first, first + len(rows) - 1)
+                self._row_count = first + len(rows)
+                self.endInsertRows()
+        elif rows:
+            # 重新读取的块：通知视图重绘
+            last = min(first + CHUNK_SIZE, self._row_count) - 1
+            self.dataChanged.emit(self.index(first, 0),
+                                  self.index(last, len(HISTORY_COLUMNS) - 1))
+
+    def has_chunk(self, chunk: int) -> bool:
+        return chunk in self._chunks
+
+    def anchor(self, chunk: int) -> Optional[Tuple[str, int]]:
+        """某一块起点之前一行的排序键（尚未读到该块之前的数据时为 None）"""
+        return self._anchors.get(chunk)
+
+    def cancel_chunk(self, generation: int, chunk: int):
+        """请求失败：允许之后重新请求该块"""
+        if generation == self.generation:
+            self._requested.discard(chunk)
+
+    def reset(self):
+        """清空全部行（筛选条件或数据变化），随后视图会通过 fetchMore 重新载入"""
+        self.beginResetModel()
+        self.generation += 1
+        self._row_count = 0
+        self._chunks.clear()
+        self._anchors = {0: None}
+        self._requested.clear()
+        self._exhausted = False
+        self.endResetModel()
@@ -0,0 +1,198 @@
+import csv
+import json
+import os
+from datetime import date
+from decimal import Decimal, InvalidOperation
+from itertools import islice
+from sqlite3 import Error, IntegrityError
+from typing import Callable, Iterable, Iterator, List, Optional, Tuple
+
+from database import TaskManagerDB, get_db
+
+BATCH_SIZE = 5000           # 每个事务写入的行数
+MAX_REPORTED_REJECTS = 1000  # 报告中保留的拒绝明细上限（计数不受限制）
+
+VALID_STATUSES = ('未开始', '进行中', '已完成', '已中断', '已归档')
+
+# 表头别名：兼容数据库字段名和界面上的中文名称
+COLUMN_ALIASES = {
+    "name": "name", "任务名称": "name",
+    "description": "description", "任务描述": "description",
+    "status": "status", "状态": "status",
+    "due_date": "due_date", "截止时间": "due_date",
+    "expected_income": "expected_income", "预计收入": "expected_income",
+    "actual_income": "actual_income", "实际收入": "actual_income",
+    "expense": "expense", "支出": "expense",
+    "tags": "tags", "标签": "tags",
+}
+TAG_SEPARATORS = (",", "，", ";", "；", "|")
+
+
+class RowError(ValueError):
+    """单行数据校验失败"""
+
+
+def iter_raw_rows(path: str) -> Iterator[Tuple[int, dict]]:
+    """逐行读取 CSV/JSONL 文件，产出 (行号, 原始字典)，不整体载入内存"""
+    ext = os.path.splitext(path)[1].lower()
+    with open(path, encoding="utf-8-sig", newline="") as f:
+        if ext in (".jsonl", ".ndjson"):
+            for line_no, line in enumerate(f, start=1):
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    record = json.loads(line)
+                except ValueError as e:
+                    yield line_no, {"__error__": f"JSON格式错误: {e}"}
+                    continue
+                if not isinstance(record, dict):
+                    record = {"__error__": "每行必须是一个JSON对象"}
+                yield line_no, record
+        else:
+            reader = csv.DictReader(f)
+            for record in reader:
+                # 行号从表头之后算起，与电子表格中看到的行号一致
+                yield reader.line_num, record
+
+
+def _parse_amount(value, field: str) -> Optional[float]:
+    if value is None or (isinstance(value, str) and not value.strip()):
+        return None
+    try:
+        amount = Decimal(str(value).replace(",", "").replace("¥", "").strip())
+    except InvalidOperation:
+        raise RowError(f"{field} 不是有效金额: {value!r}")
+    if not amount.is_finite():  # NaN/Infinity 能被 Decimal 解析，但不是金额
+        raise RowError(f"{field} 不是有效金额: {value!r}")
+    if amount < 0:
+        raise RowError(f"{field} 不能为负数: {value!r}")
+    return float(amount)
+
+
+def _parse_tags(value) -> List[str]:
+    if not value:
+        return []
+    if isinstance(value, list):
+        names = [str(v) for v in value]
+    else:
+        text = str(value)
+        for sep in TAG_SEPARATORS[1:]:
+            text = text.replace(sep, TAG_SEPARATORS[0])
+        names = text.split(TAG_SEPARATORS[0])
+    # 去重并保持原有顺序
+    return list(dict.fromkeys(n.strip() for n in names if n.strip()))
+
+
+def normalize_row(record: dict) -> dict:
+    """把原始记录转换为 TaskManagerDB.create_tasks 接受的任务字典"""
+    if "__error__" in record:
+        raise RowError(record["__error__"])
+
+    row = {}
+    for key, value in record.items():
+        field = COLUMN_ALIASES.get((key or "").strip())
+        if field:
+            row[field] = value.strip() if isinstance(value, str) else value
+
+    name = row.get("name")
+    if not name:
+        raise RowError("任务名称不能为空")
+
+    due_raw = row.get("due_date")
+    if not due_raw:
+        raise RowError("截止时间不能为空")
+    due_text = str(due_raw).replace("/", "-")[:10]
+    try:
+        due_date = date.fromisoformat(due_text)
+    except ValueError:
+        raise RowError(f"截止时间格式应为 YYYY-MM-DD: {due_raw!r}")
+
+    status = row.get("status") or "未开始"
+    if status not in VALID_STATUSES:
+        raise RowError(f"未知状态: {status!r}")
+
+    return {
+        "name": name,
+        "description": row.get("description") or None,
+        "status": status,
+        "due_date": due_date,
+        "expected_income": _parse_amount(row.get("expected_income"), "预计收入"),
+        "actual_income": _parse_amount(row.get("actual_income"), "实际收入"),
+        "expense": _parse_amount(row.get("expense"), "支出"),
+        "tags": _parse_tags(row.get("tags")),
+    }
+
+
+def chunked(iterable: Iterable, size: int) -> Iterator[list]:
+    """把可迭代对象切成固定大小的块"""
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+class TaskImporter:
+    """流式批量导入任务：分块读取、经标签缓存解析标签、按批次事务写入"""
+
+    def __init__(self, db: TaskManagerDB = None, batch_size: int = BATCH_SIZE):
+        self.db = db or get_db()
+        self.batch_size = batch_size
+
+    def import_file(self, path: str,
+                    progress: Callable[[int, int], None] = None) -> dict:
+        """导入文件，返回 {"imported", "rejected_count", "rejected"} 报告
+
+        progress(已导入行数, 已拒绝行数) 在每个批次提交后回调。
+        rejected 为 (行号, 原因) 列表，最多保留 MAX_REPORTED_REJECTS 条。
+        """
+        report = {"imported": 0, "rejected_count": 0, "rejected": []}
+
+        for chunk in chunked(iter_raw_rows(path), self.batch_size):
+            batch = []
+            for line_no, record in chunk:
+                try:
+                    batch.append((line_no, normalize_row(record)))
+                except RowError as e:
+                    self._reject(report, line_no, str(e))
+
+            if batch:
+                self._write_batch(batch, report)
+            if progress:
+                progress(report["imported"], report["rejected_count"])
+
+        return report
+
+    def _write_batch(self, batch: List[Tuple[int, dict]], report: dict):
+        """整批写入；若被数据库约束拒绝，则逐行重试以定位坏行
+
+        标签名经由 TaskManagerDB 的标签缓存解析，整个文件只载入一次标签表。
+        """
+        try:
+            self.db.create_tasks([task for _, task in batch])
+            report["imported"] += len(batch)
+            return
+        except IntegrityError:
+            pass  # 事务已回滚，标签缓存随之失效
+
+        with self.db.transaction():
+            for line_no, task in batch:
+                self.db.conn.execute("SAVEPOINT import_row")
+                try:
+                    self.db.create_tasks([task])
+                except Error as e:
+                    self.db.conn.execute("ROLLBACK TO import_row")
+                    self.db.tags.invalidate()  # 本行新建的标签已被撤销
+                    self._reject(report, line_no, f"数据库拒绝: {e}")
+                else:
+                    report["imported"] += 1
+                finally:
+                    self.db.conn.execute("RELEASE import_row")
+
+    @staticmethod
+    def _reject(report: dict, line_no: int, reason: str):
+        report["rejected_count"] += 1
+        if len(report["rejected"]) < MAX_REPORTED_REJECTS:
+            report["rejected"].append((line_no, reason))
@@ -0,0 +1,343 @@
+import json
+from bisect import bisect_left
+from collections import namedtuple
+from typing import Dict, List, Optional
+
+from PyQt5.QtCore import (QAbstractListModel, QEvent, QMimeData, QModelIndex, QPoint,
+                          QRect, QSize, Qt, pyqtSignal)
+from PyQt5.QtGui import QColor, QFont, QFontMetrics, QPainter, QPen
+from PyQt5.QtWidgets import QStyle, QStyledItemDelegate, QStyleOptionViewItem
+
+KANBAN_STATUSES = ["未开始", "进行中", "已完成", "已中断"]
+STATUS_COLORS = {
+    "未开始": "#CBD5E0",
+    "进行中": "#63B3ED",
+    "已完成": "#68D391",
+    "已中断": "#FC8181",
+}
+
+# 看板卡片数据：tags 为标签名元组
+KanbanTask = namedtuple("KanbanTask", "task_id name status due_date tags")
+
+TaskIdRole = Qt.UserRole + 1
+TaskRole = Qt.UserRole + 2
+
+# 拖放卡片时携带的数据：{"status": 来源列, "task_ids": [...]}
+TASKS_MIME_TYPE = "application/x-xhshelper-task-ids"
+
+
+def sort_key(task: KanbanTask):
+    """列内排序：截止日期升序，同一天按任务ID"""
+    return task.due_date, task.task_id
+
+
+def kanban_task_from_record(record) -> KanbanTask:
+    """taskstore.TaskRecord -> KanbanTask"""
+    return KanbanTask(record.task_id, record.name, record.status,
+                      record.due_date, record.tags)
+
+
+def kanban_task_from_row(row) -> KanbanTask:
+    """(task_id, name, status, due_date, 'a, b') 查询行 -> KanbanTask"""
+    task_id, name, status, due_date, tags = row
+    return KanbanTask(task_id, name, status, due_date,
+                      tuple(tags.split(", ")) if tags else ())
+
+
+class KanbanColumnModel(QAbstractListModel):
+    """看板中一列（一个状态）的任务，按 sort_key 有序
+
+    数据按页载入：视图滚动到底部时 fetchMore 发出 fetchMoreRequested(最后一个排序键)，
+    由页面在后台查询下一页后调用 append_tasks。
+    除整体替换外支持按任务插入/删除/更新，行位置用二分查找定位，
+    不随列中任务数线性增长。
+    """
+
+    fetchMoreRequested = pyqtSignal(object)
+    # 其他列的卡片被拖入本列：(任务ID列表, 本列状态)；由页面写入数据库
+    tasksDropped = pyqtSignal(list, str)
+
+    def __init__(self, status: str, parent=None):
+        super().__init__(parent)
+        self.status = status
+        self._tasks: List[KanbanTask] = []
+        self._keys: list = []  # 与 _tasks 对应的排序键
+        self._by_id: Dict[int, KanbanTask] = {}
+        self._exhausted = True  # 是否已载入该列全部任务
+        self._loading = False
+
+    def rowCount(self, parent=QModelIndex()) -> int:
+        return 0 if parent.isValid() else len(self._tasks)
+
+    def data(self, index: QModelIndex, role: int = Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        task = self._tasks[index.row()]
+        if role == Qt.DisplayRole:
+            return task.name
+        if role == Qt.ToolTipRole:
+            return f"{task.name}\n截止时间：{task.due_date}"
+        if role == TaskIdRole:
+            return task.task_id
+        if role == TaskRole:
+            return task
+        return None
+
+    # ---------- 拖放 ----------
+    def flags(self, index: QModelIndex):
+        if not index.isValid():
+            return Qt.ItemIsDropEnabled  # 允许放到列的空白处
+        return Qt.ItemIsEnabled | Qt.ItemIsSelectable | Qt.ItemIsDragEnabled
+
+    def supportedDragActions(self):
+        return Qt.MoveAction
+
+    def supportedDropActions(self):
+        return Qt.MoveAction
+
+    def mimeTypes(self) -> List[str]:
+        return [TASKS_MIME_TYPE]
+
+    def mimeData(self, indexes) -> QMimeData:
+        task_ids = sorted({self._tasks[index.row()].task_id for index in indexes})
+        mime = QMimeData()
+        mime.setData(TASKS_MIME_TYPE, json.dumps(
+            {"status": self.status, "task_ids": task_ids}).encode("utf-8"))
+        return mime
+
+    @staticmethod
+    def _decode(mime: QMimeData) -> Optional[dict]:
+        if not mime.hasFormat(TASKS_MIME_TYPE):
+            return None
+        return json.loads(bytes(mime.data(TASKS_MIME_TYPE)).decode("utf-8"))
+
+    def canDropMimeData(self, mime, action, row, column, parent) -> bool:
+        payload = self._decode(mime)
+        return bool(payload) and payload["status"] != self.status
+
+    def dropMimeData(self, mime, action, row, column, parent) -> bool:
+        """不直接改动模型：列内顺序由截止日期决定，卡片随写入后的变更通知移动"""
+        if not self.canDropMimeData(mime, action, row, column, parent):
+            return False
+        self.tasksDropped.emit(self._decode(mime)["task_ids"], self.status)
+        return True
+
+    def removeRows(self, row, count, parent=QModelIndex()) -> bool:
+        return False  # 拖出后由变更通知移除，视图不要自行删除行
+
+    # ---------- 分页 ----------
+    def canFetchMore(self, parent=QModelIndex()) -> bool:
+        return not parent.isValid() and not self._exhausted and not self._loading
+
+    def fetchMore(self, parent=QModelIndex()):
+        if self.canFetchMore(parent):
+            self._loading = True
+            self.fetchMoreRequested.emit(self._keys[-1] if self._keys else None)
+
+    def set_tasks(self, tasks: List[KanbanTask], exhausted: bool = True):
+        """整体替换（tasks 须已按 sort_key 排序）；exhausted 为 False 表示后面还有"""
+        self.beginResetModel()
+        self._tasks = list(tasks)
+        self._keys = [sort_key(task) for task in self._tasks]
+        self._by_id = {task.task_id: task for task in self._tasks}
+        self._exhausted = exhausted
+        self._loading = False
+        self.endResetModel()
+
+    def append_tasks(self, tasks: List[KanbanTask], exhausted: bool):
+        """追加下一页（跳过期间已通过增量更新载入的任务）"""
+        self._loading = False
+        self._exhausted = exhausted
+        tasks = [task for task in tasks if task.task_id not in self._by_id
+                 and (not self._keys or sort_key(task) > self._keys[-1])]
+        if not tasks:
+            return
+        first = len(self._tasks)
+        self.beginInsertRows(QModelIndex(), first, first + len(tasks) - 1)
+        self._tasks.extend(tasks)
+        self._keys.extend(sort_key(task) for task in tasks)
+        self._by_id.update((task.task_id, task) for task in tasks)
+        self.endInsertRows()
+
+    def cancel_fetch(self):
+        """放弃在途的下一页请求，允许视图重新触发 fetchMore"""
+        self._loading = False
+
+    def covers(self, task: KanbanTask) -> bool:
+        """任务是否落在已载入的范围内（范围之外的任务留给后续分页载入）"""
+        return self._exhausted or (bool(self._keys) and sort_key(task) <= self._keys[-1])
+
+    def task_at(self, row: int) -> KanbanTask:
+        return self._tasks[row]
+
+    def contains(self, task_id: int) -> bool:
+        return task_id in self._by_id
+
+    def row_of(self, task_id: int) -> int:
+        """任务所在行，不在本列时返回 -1"""
+        task = self._by_id.get(task_id)
+        return bisect_left(self._keys, sort_key(task)) if task else -1
+
+    def insert_task(self, task: KanbanTask) -> int:
+        """按排序位置插入任务，返回所在行；超出已载入范围时不插入，返回 -1"""
+        if not self.covers(task):
+            return -1
+        key = sort_key(task)
+        row = bisect_left(self._keys, key)
+        self.beginInsertRows(QModelIndex(), row, row)
+        self._tasks.insert(row, task)
+        self._keys.insert(row, key)
+        self._by_id[task.task_id] = task
+        self.endInsertRows()
+        return row
+
+    def remove_task(self, task_id: int) -> bool:
+        row = self.row_of(task_id)
+        if row < 0:
+            return False
+        self.beginRemoveRows(QModelIndex(), row, row)
+        del self._tasks[row]
+        del self._keys[row]
+        del self._by_id[task_id]
+        self.endRemoveRows()
+        return True
+
+    def update_task(self, task: KanbanTask) -> int:
+        """替换同一任务的数据；排序键变化时移动到新位置。返回所在行"""
+        row = self.row_of(task.task_id)
+        if row < 0:
+            return self.insert_task(task)
+        if self._keys[row] != sort_key(task):
+            self.remove_task(task.task_id)
+            return self.insert_task(task)
+        self._tasks[row] = task
+        self._by_id[task.task_id] = task
+        index = self.index(row)
+        self.dataChanged.emit(index, index)
+        return row
+
+
+class TaskCardDelegate(QStyledItemDelegate):
+    """直接绘制任务卡片：名称、标签、截止时间和状态按钮
+
+    不为每个任务创建控件，视图中的控件数量与任务数无关。
+    点击状态按钮时发出 statusMenuRequested(index, 全局坐标)。
+    """
+
+    statusMenuRequested = pyqtSignal(QModelIndex, QPoint)
+
+    MARGIN = 5        # 卡片外边距
+    PADDING = 12      # 卡片内边距
+    SPACING = 6       # 行间距
+    CHIP_PADDING = 6  # 标签左右内边距
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.name_font = QFont()
+        self.name_font.setBold(True)
+        self.name_font.setPixelSize(14)
+        self.small_font = QFont()
+        self.small_font.setPixelSize(12)
+        self._name_metrics = QFontMetrics(self.name_font)
+        self._small_metrics = QFontMetrics(self.small_font)
+
+    # ---------- 布局 ----------
+    def _line_heights(self):
+        chip_height = self._small_metrics.height() + 4
+        return self._name_metrics.height(), chip_height, chip_height
+
+    def sizeHint(self, option: QStyleOptionViewItem, index: QModelIndex) -> QSize:
+        # 高度固定，视图可使用 uniformItemSizes 跳过逐行测量
+        name_h, chip_h, bottom_h = self._line_heights()
+        height = (2 * (self.MARGIN + self.PADDING) + name_h + chip_h + bottom_h
+                  + 2 * self.SPACING)
+        return QSize(option.rect.width() or 200, height)
+
+    def _card_rect(self, option: QStyleOptionViewItem) -> QRect:
+        return option.rect.adjusted(self.MARGIN, self.MARGIN, -self.MARGIN, -self.MARGIN)
+
+    def _status_rect(self, option: QStyleOptionViewItem, status: str) -> QRect:
+        """卡片右下角的状态按钮区域"""
+        card = self._card_rect(option)
+        _, _, bottom_h = self._line_heights()
+        width = self._small_metrics.horizontalAdvance(f"{status} ▾") + 2 * self.CHIP_PADDING
+        return QRect(card.right() - self.PADDING - width,
+                     card.bottom() - self.PADDING - bottom_h + 1, width, bottom_h)
+
+    # ---------- 绘制 ----------
+    def paint(self, painter: QPainter, option: QStyleOptionViewItem, index: QModelIndex):
+        task: Optional[KanbanTask] = index.data(TaskRole)
+        if task is None:
+            return super().paint(painter, option, index)
+
+        painter.save()
+        painter.setRenderHint(QPainter.Antialiasing)
+        card = self._card_rect(option)
+        color = QColor(STATUS_COLORS.get(task.status, "#CBD5E0"))
+
+        # 卡片背景与左侧状态色条
+        selected = option.state & QStyle.State_Selected
+        painter.setPen(QPen(QColor("#3182CE"), 2) if selected else Qt.NoPen)
+        painter.setBrush(QColor("#EBF8FF") if selected else QColor("white"))
+        painter.drawRoundedRect(card, 8, 8)
+        painter.setPen(Qt.NoPen)
+        painter.setBrush(color)
+        painter.drawRoundedRect(QRect(card.left(), card.top(), 4, card.height()), 2, 2)
+
+        name_h, chip_h, bottom_h = self._line_heights()
+        content = card.adjusted(self.PADDING, self.PADDING, -self.PADDING, -self.PADDING)
+
+        # 任务名称
+        painter.setFont(self.name_font)
+        painter.setPen(QColor("#1A202C"))
+        name_rect = QRect(content.left(), content.top(), content.width(), name_h)
+        painter.drawText(name_rect, Qt.AlignLeft | Qt.AlignVCenter,
+                         self._name_metrics.elidedText(task.name, Qt.ElideRight,
+                                                       content.width()))
+
+        # 标签（放不下时以 +N 结尾）
+        painter.setFont(self.small_font)
+        x = content.left()
+        y = name_rect.bottom() + 1 + self.SPACING
+        for i, tag in enumerate(task.tags):
+            width = self._small_metrics.horizontalAdvance(tag) + 2 * self.CHIP_PADDING
+            rest = len(task.tags) - i
+            more_width = self._small_metrics.horizontalAdvance(f"+{rest}")
+            if x + width > content.right() - (more_width if rest > 1 else 0):
+                painter.setPen(QColor("#718096"))
+                painter.drawText(QRect(x, y, content.right() - x, chip_h),
+                                 Qt.AlignLeft | Qt.AlignVCenter, f"+{rest}")
+                break
+            chip = QRect(x, y, width, chip_h)
+            painter.setPen(Qt.NoPen)
+            painter.setBrush(QColor("#E2E8F0"))
+            painter.drawRoundedRect(chip, 4, 4)
+            painter.setPen(QColor("#4A5568"))
+            painter.drawText(chip, Qt.AlignCenter, tag)
+            x += width + 5
+
+        # 截止时间
+        status_rect = self._status_rect(option, task.status)
+        painter.setPen(QColor("#718096"))
+        painter.drawText(QRect(content.left(), status_rect.top(),
+                               status_rect.left() - content.left(), bottom_h),
+                         Qt.AlignLeft | Qt.AlignVCenter, f"截止时间：{task.due_date}")
+
+        # 状态按钮
+        painter.setPen(QPen(color, 1))
+        painter.setBrush(Qt.NoBrush)
+        painter.drawRoundedRect(status_rect, 4, 4)
+        painter.setPen(QColor("#2D3748"))
+        painter.drawText(status_rect, Qt.AlignCenter, f"{task.status} ▾")
+        painter.restore()
+
+    def editorEvent(self, event: QEvent, model, option: QStyleOptionViewItem,
+                    index: QModelIndex) -> bool:
+        if (event.type() == QEvent.MouseButtonRelease
+                and event.button() == Qt.LeftButton):
+            task = index.data(TaskRole)
+            if task and self._status_rect(option, task.status).contains(event.pos()):
+                self.statusMenuRequested.emit(index, event.globalPos())
+                return True
+        return super().editorEvent(event, model, option, index)
+
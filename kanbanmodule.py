@@ -1,64 +1,170 @@
 from PyQt5.QtWidgets import (
-    QMainWindow, QWidget, QStackedWidget, 
-    QPushButton, QVBoxLayout, QHBoxLayout, QLabel,
-    QLineEdit, QTextEdit, QDateEdit, QComboBox, QListWidget,
-    QDoubleSpinBox, QFormLayout, QMessageBox, QListWidgetItem
+    QWidget, QVBoxLayout, QHBoxLayout, QLabel, QListView, QMenu, QMessageBox,
+    QAbstractItemView, QComboBox, QLineEdit, QPushButton, QToolButton
 )
-from PyQt5.QtCore import QDate
-from PyQt5.QtCore import Qt
-from PyQt5.QtWidgets import QScrollArea, QFrame
-from sqlite3 import Error
-from datetime import date
+from PyQt5.QtCore import Qt, QTimer
 
-from database import TaskManagerDB
+from database import get_db
+from dataservice import get_data_service
+from kanbanmodel import (KANBAN_STATUSES, STATUS_COLORS, KanbanColumnModel,
+                         TaskCardDelegate, TaskIdRole, kanban_task_from_record,
+                         kanban_task_from_row)
+from querybuilder import (DUE_WINDOWS, KanbanFilter, due_window_range,
+                          is_empty_filter, kanban_counts_sql, kanban_page_sql,
+                          like_contains)
+from taskstore import get_task_store
+from writequeue import get_write_queue
+
+# 每列每次载入的卡片数
+KANBAN_PAGE_SIZE = 100
+# 搜索框停止输入多久后再查询（毫秒）
+SEARCH_DELAY_MS = 300
 
 class KanbanPage(QWidget):
     def __init__(self):
         super().__init__()
-        self.db = TaskManagerDB()
+        self.db = get_db()
+        self.data_service = get_data_service()
+        self.write_queue = get_write_queue()
+        self._full_load_pending = False
+        self._counts = {}  # 各状态任务总数（有筛选时为筛选后的数量）
+        self.task_filter = KanbanFilter()
+        
+        # 任务变化由任务存储推送，只更新受影响的卡片
+        self.task_store = get_task_store()
+        self.task_store.taskAdded.connect(lambda task: self.on_task_changed(None, task))
+        self.task_store.taskChanged.connect(self.on_task_changed)
+        self.task_store.taskRemoved.connect(self.on_task_removed)
+        self.task_store.countsChanged.connect(self.on_counts_changed)
+        self.task_store.reset.connect(self.load_kanban_tasks)
+        self.task_store.tagsChanged.connect(self.load_filter_tags)
         self.init_ui()
     
     def init_ui(self):
         """配置任务看板页面"""
         main_layout = QVBoxLayout()
+        main_layout.addLayout(self.create_filter_bar())
 
-        # 创建滚动区域
-        scroll = QScrollArea()
-        scroll.setWidgetResizable(True)
-        scroll.setHorizontalScrollBarPolicy(Qt.ScrollBarAlwaysOff)
-        
-        # 看板主体容器
-        board_widget = QWidget()
+        # 看板主体：每个状态一列，每列一个列表视图，卡片由委托绘制
         board_layout = QHBoxLayout()
         board_layout.setContentsMargins(20, 10, 20, 10)
         board_layout.setSpacing(20)
         
+        self.card_delegate = TaskCardDelegate(self)
+        self.card_delegate.statusMenuRequested.connect(self.show_status_menu)
+        
         # 定义四列状态
         self.status_columns = {
-            "未开始": self.create_status_column("未开始", "#CBD5E0"),
-            "进行中": self.create_status_column("进行中", "#63B3ED"),
-            "已完成": self.create_status_column("已完成", "#68D391"),
-            "已中断": self.create_status_column("已中断", "#FC8181")
+            status: self.create_status_column(status, STATUS_COLORS[status])
+            for status in KANBAN_STATUSES
         }
         
         # 添加各状态列到看板
         for column in self.status_columns.values():
             board_layout.addLayout(column["layout"])
         
-        board_widget.setLayout(board_layout)
-        scroll.setWidget(board_widget)
-        main_layout.addWidget(scroll)
-
+        main_layout.addLayout(board_layout)
         self.setLayout(main_layout)
         
         # 加载任务数据
         self.load_kanban_tasks()
 
+    def create_filter_bar(self) -> QHBoxLayout:
+        """筛选栏：标签（多选，任一匹配）、截止日期窗口、名称搜索"""
+        layout = QHBoxLayout()
+        layout.setContentsMargins(20, 10, 20, 0)
+        
+        self.tag_button = QToolButton()
+        self.tag_button.setText("标签")
+        self.tag_button.setPopupMode(QToolButton.InstantPopup)
+        self.tag_menu = QMenu(self.tag_button)
+        self.tag_menu.triggered.connect(self.apply_filter)
+        self.tag_button.setMenu(self.tag_menu)
+        self.load_filter_tags()
+        layout.addWidget(self.tag_button)
+        
+        self.window_combo = QComboBox()
+        self.window_combo.addItem("全部时间", None)
+        for window, label in DUE_WINDOWS.items():
+            self.window_combo.addItem(label, window)
+        self.window_combo.currentIndexChanged.connect(self.apply_filter)
+        layout.addWidget(self.window_combo)
+        
+        self.search_input = QLineEdit()
+        self.search_input.setPlaceholderText("搜索任务名称")
+        self.search_input.setClearButtonEnabled(True)
+        self.search_timer = QTimer(self)
+        self.search_timer.setSingleShot(True)
+        self.search_timer.setInterval(SEARCH_DELAY_MS)
+        self.search_timer.timeout.connect(self.apply_filter)
+        self.search_input.textChanged.connect(self.search_timer.start)
+        layout.addWidget(self.search_input, stretch=1)
+        
+        clear_btn = QPushButton("清除筛选")
+        clear_btn.clicked.connect(self.clear_filter)
+        layout.addWidget(clear_btn)
+        return layout
+
+    def load_filter_tags(self):
+        """重建标签菜单（保留已勾选的标签）"""
+        checked = set(self.task_filter.tag_ids)
+        self.tag_menu.clear()
+        for tag_id, tag_name, _ in self.db.get_all_tags():
+            action = self.tag_menu.addAction(tag_name)
+            action.setCheckable(True)
+            action.setChecked(tag_id in checked)
+            action.setData(tag_id)
+
+    def current_filter(self) -> KanbanFilter:
+        tag_ids = tuple(action.data() for action in self.tag_menu.actions()
+                        if action.isChecked())
+        return KanbanFilter(tag_ids, self.window_combo.currentData(),
+                            self.search_input.text().strip())
+
+    def apply_filter(self):
+        """筛选条件变化后重新加载各列（条件下推到 SQL）"""
+        task_filter = self.current_filter()
+        if task_filter == self.task_filter:
+            return
+        self.task_filter = task_filter
+        count = len(task_filter.tag_ids)
+        self.tag_button.setText(f"标签 ({count})" if count else "标签")
+        self.load_kanban_tasks()
+
+    def clear_filter(self):
+        for action in self.tag_menu.actions():
+            action.setChecked(False)
+        self.window_combo.blockSignals(True)
+        self.window_combo.setCurrentIndex(0)
+        self.window_combo.blockSignals(False)
+        self.search_input.blockSignals(True)
+        self.search_input.clear()
+        self.search_input.blockSignals(False)
+        self.apply_filter()
+
+    def matches_filter(self, card) -> bool:
+        """变更通知中的卡片是否满足当前筛选（与 SQL 条件一致）"""
+        task_filter = self.task_filter
+        if is_empty_filter(task_filter):
+            return True
+        start, end = due_window_range(task_filter.window)
+        due = str(card.due_date)[:10]
+        if (start and due < start) or (end and due >= end):
+            return False
+        if task_filter.text and not like_contains(card.name, task_filter.text):
+            return False
+        if task_filter.tag_ids:
+            names = {self.db.tags.name_of(tag_id) for tag_id in task_filter.tag_ids}
+            if not names.intersection(card.tags):
+                return False
+        return True
+
     def create_status_column(self, title: str, color: str) -> dict:
         """创建单个状态列"""
         column = {
             "layout": QVBoxLayout(),
-            "widget": QWidget(),
+            "model": KanbanColumnModel(title, self),
+            "view": QListView(),
             "title": title
         }
         
@@ -71,140 +177,205 @@ class KanbanPage(QWidget):
             border-radius: 4px;
             font-weight: bold;
         """)
-        title_widget.setAlignment(Qt.AlignTop)
+        column["title_label"] = title_widget
+        column["model"].fetchMoreRequested.connect(
+            lambda after, status=title: self.load_more(status, after))
+        
+        # 任务列表：所有卡片等高，视图无需逐行测量
+        view = column["view"]
+        view.setModel(column["model"])
+        view.setItemDelegate(self.card_delegate)
+        view.setUniformItemSizes(True)
+        view.setVerticalScrollMode(QAbstractItemView.ScrollPerPixel)
+        view.setHorizontalScrollBarPolicy(Qt.ScrollBarAlwaysOff)
+        view.setEditTriggers(QAbstractItemView.NoEditTriggers)
         
-        # 任务列表容器
-        #task_list = QVBoxLayout()
-        #task_list.setSpacing(10)
-        #task_list.addWidget(title_widget)
-        #task_list.addStretch()
+        # 多选（Ctrl/Shift）后拖到其他列即可批量修改状态
+        view.setSelectionMode(QAbstractItemView.ExtendedSelection)
+        view.setDragDropMode(QAbstractItemView.DragDrop)
+        view.setDefaultDropAction(Qt.MoveAction)
+        view.setDropIndicatorShown(False)  # 列内按截止日期排序，放下的位置无意义
+        column["model"].tasksDropped.connect(self.move_tasks)
+        view.setStyleSheet("QListView { background: #F7FAFC; border: none; }")
         
         column["layout"].setSpacing(10)
         column["layout"].addWidget(title_widget)
-        column["layout"].addStretch()
-        #column["layout"].addLayout(task_list)
+        column["layout"].addWidget(view)
         return column
 
+    @staticmethod
+    def fetch_counts(db, task_filter=None) -> dict:
+        """各状态任务总数（无筛选时读取日汇总表）"""
+        query, params = kanban_counts_sql(task_filter)
+        return dict(db.conn.execute(query, params).fetchall())
+
+    @staticmethod
+    def fetch_column_page(db, status, after=None, task_filter=None) -> tuple:
+        """某一列 after 之后的一页卡片，返回 (卡片列表, 是否已到末尾)"""
+        query, params = kanban_page_sql(status, after, task_filter)
+        rows = db.conn.execute(query, params + [KANBAN_PAGE_SIZE + 1]).fetchall()
+        tasks = [kanban_task_from_row(row) for row in rows[:KANBAN_PAGE_SIZE]]
+        return tasks, len(rows) <= KANBAN_PAGE_SIZE
+
+    @staticmethod
+    def fetch_kanban_tasks(db, task_filter=None) -> tuple:
+        """查询每列的第一页和各列总数（在后台读线程执行）
+
+        打开看板的开销只与列数和每页大小有关，与任务总数无关。
+        """
+        pages = {status: KanbanPage.fetch_column_page(db, status, None, task_filter)
+                 for status in KANBAN_STATUSES}
+        return pages, KanbanPage.fetch_counts(db, task_filter)
+
     def load_kanban_tasks(self):
-        """加载并展示所有任务"""
-        # 清空现有任务卡片
-        for column in self.status_columns.values():
-            while column["layout"].count() > 2:
-                item = column["layout"].takeAt(1)
-                if item.widget():
-                    item.widget().deleteLater()
-        
-        # 从数据库获取任务数据
-        try:
-            cursor = self.db.conn.execute("""
-                SELECT t.task_id, t.name, t.status, t.due_date, 
-                       GROUP_CONCAT(tag.tag_name, ', ') AS tags
-                FROM tasks t
-                LEFT JOIN task_tags tt ON t.task_id = tt.task_id
-                LEFT JOIN tags tag ON tt.tag_id = tag.tag_id
-                GROUP BY t.task_id
-                ORDER BY t.due_date ASC
-            """)
-            
-            #print(len(cursor.fetchall()))
-
-            for task in cursor.fetchall():
-                task_id = task[0]
-                name = task[1]
-                status = task[2]
-                due_date = task[3]
-                tags = task[4].split(", ") if task[4] else []
-                
-                # 创建任务卡片
-                card = self.create_task_card(task_id, name, tags, due_date, status)
-                
-                # 添加到对应状态列
-                if status in self.status_columns:
-                    self.status_columns[status]["layout"].insertWidget(
-                        self.status_columns[status]["layout"].count()-1,  # 保留最后的stretch
-                        card
-                    )
-
-        except Error as e:
-            QMessageBox.critical(self, "数据库错误", f"加载任务失败: {e}")
-
-    def create_task_card(self, task_id: int, name: str, tags: list, 
-                        due_date: date, status: str) -> QFrame:
-        """创建单个任务卡片组件"""
-        card = QFrame()
-        card.setObjectName("taskCard")
-        card.setStyleSheet(f"""
-            #taskCard {{
-                background: white;
-                border-radius: 8px;
-                padding: 15px;
-                border-left: 4px solid {self.get_status_color(status)};
-            }}
-        """)
-        
-        layout = QVBoxLayout()
-        layout.setSpacing(8)
-        
-        # 任务名称
-        name_label = QLabel(name)
-        name_label.setStyleSheet("font-weight: bold; font-size: 14px;")
-        layout.addWidget(name_label)
-        
-        # 标签显示
-        if tags:
-            tag_container = QWidget()
-            tag_layout = QHBoxLayout()
-            tag_layout.setContentsMargins(0, 0, 0, 0)
-            tag_layout.setSpacing(5)
-            
-            for tag in tags:
-                tag_label = QLabel(tag)
-                tag_label.setStyleSheet("""
-                    background: #E2E8F0;
-                    color: #4A5568;
-                    padding: 2px 6px;
-                    border-radius: 4px;
-                    font-size: 12px;
-                """)
-                tag_layout.addWidget(tag_label)
-            
-            tag_container.setLayout(tag_layout)
-            layout.addWidget(tag_container)
-        
-        # 截止时间
-        due_label = QLabel(f"截止时间：{due_date}")
-        due_label.setStyleSheet("color: #718096; font-size: 12px;")
-        layout.addWidget(due_label)
-        
-        # 状态选择下拉框
-        status_combo = QComboBox()
-        status_combo.addItems(["未开始", "进行中", "已完成", "已中断"])
-        status_combo.setCurrentText(status)
-        status_combo.currentTextChanged.connect(
-            lambda new_status, t_id=task_id: self.update_task_status(t_id, new_status)
+        """在后台加载各列第一页，完成后展示"""
+        self._full_load_pending = True
+        for status in KANBAN_STATUSES:
+            self.data_service.cancel(f"kanban_more:{status}")
+        self.data_service.cancel("kanban_counts")
+        task_filter = self.task_filter
+        self.data_service.submit(
+            "kanban",
+            lambda db: self.fetch_kanban_tasks(db, task_filter),
+            self.render_kanban_tasks,
+            lambda e: QMessageBox.critical(self, "数据库错误", f"加载任务失败: {e}")
         )
-        layout.addWidget(status_combo)
+
+    def render_kanban_tasks(self, result: tuple):
+        """用查询结果替换各列模型的数据"""
+        pages, self._counts = result
+        self._full_load_pending = False
+        for status, column in self.status_columns.items():
+            tasks, exhausted = pages[status]
+            column["model"].set_tasks(tasks, exhausted)
+            self.update_column_title(status)
+
+    def load_more(self, status: str, after):
+        """列表滚动到底部时在后台载入该列的下一页"""
+        model = self.status_columns[status]["model"]
+        task_filter = self.task_filter
+        
+        def on_error(error):
+            model.cancel_fetch()
+            QMessageBox.critical(self, "数据库错误", f"加载任务失败: {error}")
         
-        card.setLayout(layout)
-        return card
+        self.data_service.submit(
+            f"kanban_more:{status}",
+            lambda db: self.fetch_column_page(db, status, after, task_filter),
+            lambda result: model.append_tasks(*result),
+            on_error
+        )
+
+    def update_column_title(self, status: str):
+        column = self.status_columns[status]
+        count = self._counts.get(status, column["model"].rowCount())
+        column["title_label"].setText(f"{status} ({count})")
+
+    # ---------- 增量更新 ----------
+    def on_task_changed(self, old, task):
+        """任务新建或修改：移动、插入或更新对应卡片
+
+        落在某列已载入范围之外的任务不插入，滚动到那里时随分页载入。
+        """
+        if self._full_load_pending:
+            self.load_kanban_tasks()  # 在途的整体加载可能读到了变化前的数据
+            return
+        self.place_card(kanban_task_from_record(task))
+
+    def place_card(self, card):
+        """把卡片放到其状态对应的列（不满足筛选时只从各列移除）"""
+        visible = self.matches_filter(card)
+        touched = {status for status, column in self.status_columns.items()
+                   if column["model"].contains(card.task_id)
+                   and (status != card.status or not visible)}
+        for status in touched:
+            self.status_columns[status]["model"].remove_task(card.task_id)
+        if visible and card.status in self.status_columns:
+            self.status_columns[card.status]["model"].update_task(card)
+            touched.add(card.status)
+        self.cancel_column_fetches(touched)
+
+    def on_task_removed(self, task_id, old):
+        """任务被删除或归档：移除对应卡片"""
+        if self._full_load_pending:
+            self.load_kanban_tasks()
+            return
+        touched = {status for status, column in self.status_columns.items()
+                   if column["model"].remove_task(task_id)}
+        self.cancel_column_fetches(touched)
+
+    def cancel_column_fetches(self, statuses):
+        """在途的下一页是按变化前的数据查询的，作废后由视图重新触发"""
+        for status in statuses:
+            self.data_service.cancel(f"kanban_more:{status}")
+            self.status_columns[status]["model"].cancel_fetch()
+
+    def on_counts_changed(self, counts: dict):
+        if is_empty_filter(self.task_filter):
+            self.render_counts(counts)
+            return
+        # 有筛选时存储给出的是全部任务数，改为在后台按筛选条件重新计数
+        task_filter = self.task_filter
+
+        def on_loaded(result):
+            if task_filter == self.task_filter:
+                self.render_counts(result)
+
+        self.data_service.submit(
+            "kanban_counts", lambda db: self.fetch_counts(db, task_filter), on_loaded)
+
+    def render_counts(self, counts: dict):
+        self._counts = counts
+        for status in self.status_columns:
+            self.update_column_title(status)
+
+    def show_status_menu(self, index, global_pos):
+        """点击卡片上的状态按钮时弹出状态菜单"""
+        task_id = index.data(TaskIdRole)
+        current = index.model().status
+        menu = QMenu(self)
+        for status in KANBAN_STATUSES:
+            action = menu.addAction(status)
+            action.setEnabled(status != current)
+        chosen = menu.exec_(global_pos)
+        if chosen:
+            self.move_tasks([task_id], chosen.text())
 
     def get_status_color(self, status: str) -> str:
         """获取状态对应的颜色"""
-        return {
-            "未开始": "#CBD5E0",
-            "进行中": "#63B3ED",
-            "已完成": "#68D391",
-            "已中断": "#FC8181"
-        }.get(status, "#CBD5E0")
+        return STATUS_COLORS.get(status, "#CBD5E0")
+
+    def find_card(self, task_id: int):
+        for column in self.status_columns.values():
+            row = column["model"].row_of(task_id)
+            if row >= 0:
+                return column["model"].task_at(row)
+        return None
 
     def update_task_status(self, task_id: int, new_status: str):
-        """更新任务状态"""
-        try:
-            self.db.conn.execute(
-                "UPDATE tasks SET status = ? WHERE task_id = ?",
-                (new_status, task_id)
-            )
-            self.db.conn.commit()
-            self.load_kanban_tasks()  # 刷新看板
-        except Error as e:
-            QMessageBox.critical(self, "更新失败", f"状态更新失败: {e}")
\ No newline at end of file
+        """更新单个任务状态"""
+        self.move_tasks([task_id], new_status)
+
+    def move_tasks(self, task_ids: list, new_status: str):
+        """批量修改任务状态：卡片立即移到新列，写入交给后写队列
+
+        短时间内的多次修改合并为一个事务；写入失败时卡片和计数恢复原状
+        （错误提示由主窗口统一显示）。
+        """
+        for task_id in task_ids:
+            card = self.find_card(task_id)
+            if card is not None and card.status != new_status:
+                self.place_card(card._replace(status=new_status))
+                self._counts[card.status] = self._counts.get(card.status, 1) - 1
+                self._counts[new_status] = self._counts.get(new_status, 0) + 1
+                rollback = lambda card=card: self.restore_card(card)
+            else:
+                rollback = None
+            self.write_queue.set_status(task_id, new_status, rollback)
+        for status in self.status_columns:
+            self.update_column_title(status)
+
+    def restore_card(self, card):
+        """撤销乐观修改：卡片放回原列，计数以任务存储为准重新显示"""
+        self.place_card(card)
+        self.on_counts_changed(self.task_store.status_counts)
\ No newline at end of file
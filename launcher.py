@@ -2,6 +2,9 @@ import sys
 from PyQt5.QtGui import QFont
 from PyQt5.QtWidgets import QApplication
 from mainwindow import MainWindow
+from database import close_all
+from dataservice import get_data_service
+from writequeue import get_write_queue
 
 if __name__ == "__main__":
     app = QApplication(sys.argv)
@@ -10,6 +13,10 @@ if __name__ == "__main__":
     font = QFont()
     font.setFamily("微软雅黑")
     app.setFont(font)
+    # 退出时先提交尚未写入的修改并等待后台任务结束，再关闭共享数据库连接
+    app.aboutToQuit.connect(lambda: get_write_queue().flush())
+    app.aboutToQuit.connect(lambda: get_data_service().shutdown())
+    app.aboutToQuit.connect(close_all)
     
     window = MainWindow()
     window.show()
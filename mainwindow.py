@@ -10,7 +10,8 @@ from PyQt5.QtWidgets import QScrollArea, QFrame
 from sqlite3 import Error
 from datetime import date
 
-from database import TaskManagerDB
+from database import get_db
+from writequeue import get_write_queue
 from calendarmodule import TaskCalendar
 from statisticsmodule import StatsDashboard
 from historydatamodule import TaskHistoryPage
@@ -22,7 +23,11 @@ class MainWindow(QMainWindow):
         super().__init__()
         self.setWindowTitle("任务管理系统")
         self.setMinimumSize(1100, 600)
-        self.db = TaskManagerDB()
+        self.db = get_db()
+        # 各页面的修改经后写队列异步提交，失败时在这里统一提示
+        self.write_queue = get_write_queue()
+        self.write_queue.failed.connect(
+            lambda e: QMessageBox.critical(self, "保存失败", f"修改未能保存，已恢复原状: {e}"))
         
         # 初始化主界面
         self.init_ui()
@@ -129,16 +134,8 @@ class MainWindow(QMainWindow):
         return page
 
     def update_task_status(self, task_id: int, new_status: str):
-        """更新任务状态"""
-        try:
-            self.db.conn.execute(
-                "UPDATE tasks SET status = ? WHERE task_id = ?",
-                (new_status, task_id)
-            )
-            self.db.conn.commit()
-            self.load_kanban_tasks()  # 刷新看板
-        except Error as e:
-            QMessageBox.critical(self, "更新失败", f"状态更新失败: {e}")
+        """更新任务状态（经后写队列提交，看板随任务存储的变更通知刷新）"""
+        self.write_queue.set_status(task_id, new_status)
     
     def apply_styles(self):
         """应用样式表"""
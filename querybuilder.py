@@ -0,0 +1,444 @@
+from collections import namedtuple
+from datetime import date, timedelta
+from typing import List, Optional, Sequence, Tuple, Union
+
+from schema import FTS_TABLES
+
+DateLike = Union[date, str]
+
+
+def _to_date(value: DateLike) -> date:
+    return value if isinstance(value, date) else date.fromisoformat(str(value)[:10])
+
+
+def month_range(month: str) -> Tuple[str, str]:
+    """'YYYY-MM' -> 半开区间 ['YYYY-MM-01', 下月1日)"""
+    year, month_num = (int(part) for part in month.split('-')[:2])
+    start = date(year, month_num, 1)
+    end = date(year + 1, 1, 1) if month_num == 12 else date(year, month_num + 1, 1)
+    return start.isoformat(), end.isoformat()
+
+
+def day_range(start: DateLike, end: DateLike) -> Tuple[str, str]:
+    """闭区间 [start, end] 的日期 -> 半开区间 [start, end + 1天)"""
+    return _to_date(start).isoformat(), (_to_date(end) + timedelta(days=1)).isoformat()
+
+
+# 截止日期窗口：名称 -> 显示文字
+DUE_WINDOWS = {"overdue": "已逾期", "week": "本周", "month": "本月"}
+
+
+def due_window_range(window: Optional[str],
+                     today: date = None) -> Tuple[Optional[str], Optional[str]]:
+    """截止日期窗口 -> 半开区间 (start, end)，两端均可能为 None"""
+    today = today or date.today()
+    if window == "overdue":
+        return None, today.isoformat()
+    if window == "week":
+        monday = today - timedelta(days=today.weekday())
+        return monday.isoformat(), (monday + timedelta(days=7)).isoformat()
+    if window == "month":
+        return month_range(today.strftime("%Y-%m"))
+    return None, None
+
+
+def escape_like(text: str) -> str:
+    """转义 LIKE 通配符（配合 ESCAPE '\\'）"""
+    return text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+_ASCII_LOWER = str.maketrans("ABCDEFGHIJKLMNOPQRSTUVWXYZ", "abcdefghijklmnopqrstuvwxyz")
+
+
+def like_contains(value: Optional[str], text: str) -> bool:
+    """在 Python 中判断 value LIKE '%text%'：与 SQLite 默认的 LIKE 一样只忽略 ASCII 字母大小写"""
+    return text.translate(_ASCII_LOWER) in (value or "").translate(_ASCII_LOWER)
+
+
+# 看板筛选条件：tag_ids 为任一匹配，window 见 DUE_WINDOWS，text 为名称包含的文字
+KanbanFilter = namedtuple("KanbanFilter", "tag_ids window text", defaults=((), None, ""))
+
+
+# 多标签筛选（均为标签ID元组）：all_of 全部包含（且），any_of 至少包含一个（或），
+# none_of 都不包含（非）。历史页和统计页的 tag_id 参数既可以是单个标签ID，也可以是 TagFilter
+TagFilter = namedtuple("TagFilter", "all_of any_of none_of", defaults=((), (), ()))
+TagLike = Union[int, TagFilter, None]
+
+
+def as_tag_filter(tag: TagLike) -> Optional[TagFilter]:
+    """单个标签ID视为只含该标签的 TagFilter；空筛选返回 None"""
+    if isinstance(tag, TagFilter):
+        return tag if (tag.all_of or tag.any_of or tag.none_of) else None
+    return TagFilter(all_of=(tag,)) if tag else None
+
+
+def single_tag(tag: TagLike) -> Optional[int]:
+    """筛选条件恰好是“包含某一个标签”时返回该标签ID（可直接读取标签日汇总表）"""
+    tag_filter = as_tag_filter(tag)
+    if tag_filter and not (tag_filter.any_of or tag_filter.none_of) \
+            and len(tag_filter.all_of) == 1:
+        return tag_filter.all_of[0]
+    return None
+
+
+def tag_set_sql(tag_filter: TagFilter, tag_table: str = "task_tags") -> Tuple[str, list]:
+    """TagFilter -> 满足条件的任务ID集合的 SELECT（集合运算）
+
+    每个标签各自走 (tag_id, task_id) 索引取出任务ID集合，再用 INTERSECT/EXCEPT 合并，
+    开销取决于这些集合的大小而不是任务表的大小。没有正向条件时返回“要排除的”集合，
+    由调用方使用 NOT IN。
+    """
+    def ids_with(tag_ids) -> str:
+        if len(tag_ids) == 1:
+            return f"SELECT task_id FROM {tag_table} WHERE tag_id = ?"
+        placeholders = ", ".join("?" for _ in tag_ids)
+        return f"SELECT task_id FROM {tag_table} WHERE tag_id IN ({placeholders})"
+
+    parts = [ids_with((tag_id,)) for tag_id in tag_filter.all_of]
+    params = list(tag_filter.all_of)
+    if tag_filter.any_of:
+        parts.append(ids_with(tag_filter.any_of))
+        params.extend(tag_filter.any_of)
+    if not parts:
+        return ids_with(tag_filter.none_of), list(tag_filter.none_of)
+    sql = " INTERSECT ".join(parts)
+    if tag_filter.none_of:
+        sql += f" EXCEPT {ids_with(tag_filter.none_of)}"
+        params.extend(tag_filter.none_of)
+    return sql, params
+
+
+def is_empty_filter(task_filter: Optional[KanbanFilter]) -> bool:
+    return (task_filter is None
+            or not (task_filter.tag_ids or task_filter.window or task_filter.text))
+
+
+class TaskQuery:
+    """组装 tasks 表的 WHERE 条件
+
+    日期条件一律转为 due_date 上的半开区间，不在列上套函数，
+    使 SQLite 可以使用 (status, due_date) / (due_date) 索引。
+    """
+
+    def __init__(self, alias: str = "tasks", tag_table: str = "task_tags"):
+        self.alias = alias
+        self.tag_table = tag_table
+        self.conditions: List[str] = []
+        self.params: list = []
+
+    def status(self, status: Optional[str]) -> "TaskQuery":
+        if status:
+            self.conditions.append(f"{self.alias}.status = ?")
+            self.params.append(status)
+        return self
+
+    def due_between(self, start: Optional[str], end: Optional[str]) -> "TaskQuery":
+        """start <= due_date < end（两端均可省略）"""
+        if start:
+            self.conditions.append(f"{self.alias}.due_date >= ?")
+            self.params.append(start)
+        if end:
+            self.conditions.append(f"{self.alias}.due_date < ?")
+            self.params.append(end)
+        return self
+
+    def month(self, month: Optional[str]) -> "TaskQuery":
+        if month:
+            self.due_between(*month_range(month))
+        return self
+
+    def days(self, start: DateLike, end: DateLike) -> "TaskQuery":
+        return self.due_between(*day_range(start, end))
+
+    def tag(self, tag: TagLike) -> "TaskQuery":
+        """单个标签ID或 TagFilter"""
+        tag_filter = as_tag_filter(tag)
+        if tag_filter:
+            sql, params = tag_set_sql(tag_filter, self.tag_table)
+            negate = not (tag_filter.all_of or tag_filter.any_of)
+            self.conditions.append(
+                f"{self.alias}.task_id {'NOT IN' if negate else 'IN'} ({sql})")
+            self.params.extend(params)
+        return self
+
+    def tags_any(self, tag_ids: Sequence[int]) -> "TaskQuery":
+        """带有其中任一标签"""
+        if tag_ids:
+            placeholders = ", ".join("?" for _ in tag_ids)
+            self.conditions.append(
+                f"{self.alias}.task_id IN "
+                f"(SELECT task_id FROM {self.tag_table} WHERE tag_id IN ({placeholders}))")
+            self.params.extend(tag_ids)
+        return self
+
+    def name_contains(self, text: Optional[str]) -> "TaskQuery":
+        if text:
+            self.conditions.append(f"{self.alias}.name LIKE ? ESCAPE '\\'")
+            self.params.append(f"%{escape_like(text)}%")
+        return self
+
+    def text_contains(self, text: Optional[str]) -> "TaskQuery":
+        """名称或描述包含 text"""
+        if text:
+            self.conditions.append(
+                f"({self.alias}.name LIKE ? ESCAPE '\\' "
+                f"OR {self.alias}.description LIKE ? ESCAPE '\\')")
+            self.params.extend([f"%{escape_like(text)}%"] * 2)
+        return self
+
+    def kanban_filter(self, task_filter: Optional[KanbanFilter]) -> "TaskQuery":
+        if not is_empty_filter(task_filter):
+            self.due_between(*due_window_range(task_filter.window))
+            self.tags_any(task_filter.tag_ids)
+            self.name_contains(task_filter.text)
+        return self
+
+    def where(self) -> str:
+        return f"WHERE {' AND '.join(self.conditions)}" if self.conditions else ""
+
+
+# 活动表与归档表：(任务表, 任务-标签表)
+LIVE_TABLES = ("tasks", "task_tags")
+ARCHIVE_TABLES = ("tasks_archive", "task_tags_archive")
+
+
+def _history_sources(include_archive: bool) -> List[Tuple[str, str]]:
+    return [LIVE_TABLES, ARCHIVE_TABLES] if include_archive else [LIVE_TABLES]
+
+
+def _history_columns(table: str, tag_table: str) -> str:
+    """历史页表格行：基本字段、金额及逗号分隔的标签名"""
+    return f"""
+            {table}.task_id,
+            {table}.name,
+            {table}.due_date,
+            {table}.expected_income,
+            {table}.actual_income,
+            {table}.expense,
+            (SELECT GROUP_CONCAT(tags.tag_name, ', ')
+             FROM {tag_table} JOIN tags ON {tag_table}.tag_id = tags.tag_id
+             WHERE {tag_table}.task_id = {table}.task_id) AS tags"""
+
+
+# trigram 分词器无法匹配少于三个字符的词，这些词改用 LIKE
+FTS_MIN_TERM_LENGTH = 3
+# bm25 中名称相对描述的权重：名称命中的任务排在前面
+FTS_NAME_WEIGHT = 5.0
+
+
+def split_search(text: str, fulltext: bool = True) -> Tuple[Optional[str], List[str]]:
+    """搜索文字 -> (FTS5 MATCH 表达式或 None, 需用 LIKE 匹配的词)
+
+    按空白切分，各词之间为“且”；每个词作为短语加引号，避免被解析为 FTS 语法。
+    """
+    terms = text.split()
+    if not fulltext:
+        return None, terms
+    long_terms = [term for term in terms if len(term) >= FTS_MIN_TERM_LENGTH]
+    match = " ".join('"{}"'.format(term.replace('"', '""')) for term in long_terms)
+    return match or None, [term for term in terms if len(term) < FTS_MIN_TERM_LENGTH]
+
+
+def _search_queries(text: str, month: Optional[str], tag_id: TagLike,
+                    status: str, include_archive: bool, fulltext: bool):
+    """每个数据源一个 (FROM 子句, 相关度表达式, TaskQuery)"""
+    match, like_terms = split_search(text, fulltext)
+    for table, tag_table in _history_sources(include_archive):
+        query = TaskQuery(table, tag_table).status(status).month(month).tag(tag_id)
+        for term in like_terms:
+            query.text_contains(term)
+        if match:
+            fts = FTS_TABLES[table]
+            source = f"{fts} JOIN {table} ON {table}.task_id = {fts}.rowid"
+            query.conditions.insert(0, f"{fts} MATCH ?")
+            query.params.insert(0, match)
+            rank = f"bm25({fts}, {FTS_NAME_WEIGHT}, 1.0)"
+        else:
+            source, rank = table, "0"
+        yield source, rank, query
+
+
+def _history_query(table: str, tag_table: str, month: Optional[str],
+                   tag_id: TagLike, status: str,
+                   after: Optional[Tuple[str, int]]) -> TaskQuery:
+    query = TaskQuery(table, tag_table).status(status).month(month).tag(tag_id)
+    if after:
+        # 按 (due_date, task_id) 降序排列，after 之后即更小的键
+        query.conditions.append(f"({table}.due_date, {table}.task_id) < (?, ?)")
+        query.params.extend(after)
+    return query
+
+
+# ---------- 各页面使用的查询 ----------
+def history_tasks_sql(month: Optional[str], tag_id: TagLike,
+                      status: str = "已完成",
+                      include_archive: bool = False,
+                      after: Optional[Tuple[str, int]] = None) -> Tuple[str, list]:
+    """历史页：after 之后的一页已完成任务（调用方追加 LIMIT 参数）
+
+    键集分页：按 (due_date, task_id) 降序，用上一页最后一行的键定位，
+    沿 (status, due_date) 索引直接从该位置读起，与翻到第几页无关。
+    include_archive 时以 UNION ALL 合并归档表，两侧各自走索引。
+    """
+    selects, params = [], []
+    for table, tag_table in _history_sources(include_archive):
+        query = _history_query(table, tag_table, month, tag_id, status, after)
+        selects.append(f"""
+        SELECT {_history_columns(table, tag_table)}
+        FROM {table}
+        {query.where()}""")
+        params += query.params
+    sql = "\n        UNION ALL".join(selects) + """
+        ORDER BY due_date DESC, task_id DESC
+        LIMIT ?
+    """
+    return sql, params
+
+
+def history_count_sql(month: Optional[str], tag_id: TagLike,
+                      status: str = "已完成",
+                      include_archive: bool = False) -> Tuple[str, list]:
+    """历史页：符合筛选条件的任务总数
+
+    读取由触发器维护的日汇总表（与任务表在同一事务中更新，数值精确），
+    扫描的行数与天数成正比，与任务数无关。多标签组合无法从汇总表得出，
+    改为对标签集合运算的结果计数。
+    """
+    if as_tag_filter(tag_id) and single_tag(tag_id) is None:
+        counts, params = [], []
+        for table, tag_table in _history_sources(include_archive):
+            query = TaskQuery(table, tag_table).status(status).month(month).tag(tag_id)
+            counts.append(f"(SELECT COUNT(*) FROM {table} {query.where()})")
+            params += query.params
+        return f"SELECT {' + '.join(counts)}", params
+    tag_id = single_tag(tag_id)
+    rollups = ["daily_tag_rollup" if tag_id else "daily_rollup"]
+    if include_archive:
+        rollups.append(f"{rollups[0]}_archive")
+    conditions, params = ["status = ?"], [status]
+    if tag_id:
+        conditions.insert(0, "tag_id = ?")
+        params.insert(0, tag_id)
+    if month:
+        conditions.append("day >= ? AND day < ?")
+        params.extend(month_range(month))
+    where = " AND ".join(conditions)
+    counts = [f"(SELECT COALESCE(SUM(task_count), 0) FROM {rollup} WHERE {where})"
+              for rollup in rollups]
+    return f"SELECT {' + '.join(counts)}", params * len(rollups)
+
+
+def history_search_sql(text: str, month: Optional[str], tag_id: TagLike,
+                       status: str = "已完成", include_archive: bool = False,
+                       fulltext: bool = True) -> Tuple[str, list]:
+    """历史页：名称或描述匹配 text 的一页任务（调用方追加 LIMIT/OFFSET 参数）
+
+    经全文索引找出匹配的任务，再按月份/标签筛选，按 bm25 相关度排序、
+    相关度相同时按截止日期倒序。相关度要对全部匹配行排序后才能确定，
+    因此这里用 OFFSET 分页，而不是按日期的键集分页。
+    fulltext 为假（数据库没有全文索引）时退化为 LIKE 匹配。
+    """
+    selects, params = [], []
+    for source, rank, query in _search_queries(
+            text, month, tag_id, status, include_archive, fulltext):
+        table = query.alias
+        selects.append(f"""
+        SELECT {_history_columns(table, query.tag_table)}, {rank} AS rank
+        FROM {source}
+        {query.where()}""")
+        params += query.params
+    sql = f"""
+        SELECT task_id, name, due_date, expected_income, actual_income, expense, tags
+        FROM ({" UNION ALL".join(selects)})
+        ORDER BY rank, due_date DESC, task_id DESC
+        LIMIT ? OFFSET ?
+    """
+    return sql, params
+
+
+def history_search_count_sql(text: str, month: Optional[str], tag_id: TagLike,
+                             status: str = "已完成", include_archive: bool = False,
+                             fulltext: bool = True) -> Tuple[str, list]:
+    """历史页：搜索结果总数"""
+    counts, params = [], []
+    for source, _, query in _search_queries(
+            text, month, tag_id, status, include_archive, fulltext):
+        counts.append(f"(SELECT COUNT(*) FROM {source} {query.where()})")
+        params += query.params
+    return f"SELECT {' + '.join(counts)}", params
+
+
+def _kanban_select(where: str) -> str:
+    """看板卡片行，按 (截止日期, 任务ID) 升序；标签用相关子查询逐行拼接，LIMIT 可提前结束"""
+    return f"""
+        SELECT t.task_id, t.name, t.status, t.due_date, 
+               (SELECT GROUP_CONCAT(tag.tag_name, ', ')
+                FROM task_tags tt JOIN tags tag ON tt.tag_id = tag.tag_id
+                WHERE tt.task_id = t.task_id) AS tags
+        FROM tasks t
+        {where}
+        ORDER BY t.due_date ASC, t.task_id ASC
+    """
+
+
+def kanban_page_sql(status: str, after: Optional[Tuple[str, int]] = None,
+                    task_filter: Optional[KanbanFilter] = None) -> Tuple[str, list]:
+    """看板页：某一列 (due_date, task_id) 在 after 之后的一页（调用方追加 LIMIT 参数）
+
+    键集分页：用上一页最后一张卡片的排序键定位，走 (status, due_date) 索引，
+    与翻到第几页无关。筛选条件一并下推到 SQL。
+    """
+    query = TaskQuery("t").status(status).kanban_filter(task_filter)
+    if after:
+        query.conditions.append("(t.due_date, t.task_id) > (?, ?)")
+        query.params.extend(after)
+    return _kanban_select(query.where()) + " LIMIT ?", query.params
+
+
+def kanban_counts_sql(task_filter: Optional[KanbanFilter] = None) -> Tuple[str, list]:
+    """看板页：各状态任务数
+
+    无筛选时读取日汇总表（行数与天数成正比），有筛选时按条件分组计数。
+    """
+    if is_empty_filter(task_filter):
+        return "SELECT status, SUM(task_count) FROM daily_rollup GROUP BY status", []
+    query = TaskQuery("t").kanban_filter(task_filter)
+    return f"SELECT t.status, COUNT(*) FROM tasks t {query.where()} GROUP BY t.status", \
+        query.params
+
+
+def _task_record_select(where: str) -> str:
+    """任务快照行：基本字段、金额及逗号分隔的标签名"""
+    return f"""
+        SELECT t.task_id, t.name, t.status, t.due_date,
+               t.expected_income, t.actual_income, t.expense,
+               (SELECT GROUP_CONCAT(tag.tag_name, ', ')
+                FROM task_tags tt JOIN tags tag ON tt.tag_id = tag.tag_id
+                WHERE tt.task_id = t.task_id) AS tags
+        FROM tasks t
+        {where}
+    """
+
+
+def task_records_sql(task_ids: Sequence[int]) -> Tuple[str, list]:
+    """任务存储：按任务ID读取快照行"""
+    placeholders = ", ".join("?" for _ in task_ids)
+    return _task_record_select(f"WHERE t.task_id IN ({placeholders})"), list(task_ids)
+
+
+def active_tasks_sql(statuses: Sequence[str]) -> Tuple[str, list]:
+    """任务存储：指定状态的全部任务（走 (status, due_date) 索引）"""
+    placeholders = ", ".join("?" for _ in statuses)
+    return _task_record_select(f"WHERE t.status IN ({placeholders})"), list(statuses)
+
+
+def calendar_counts_sql(start: DateLike, end: DateLike) -> Tuple[str, list]:
+    """日历页：[start, end] 内每天的任务数"""
+    query = TaskQuery().days(start, end)
+    sql = f"""
+        SELECT DATE(tasks.due_date) AS task_date, COUNT(*)
+        FROM tasks
+        {query.where()}
+        GROUP BY DATE(tasks.due_date)
+    """
+    return sql, query.params
@@ -0,0 +1,485 @@
+import sqlite3
+from typing import Callable, List, Optional, Tuple
+
+# 当前表结构版本，记录在 PRAGMA user_version 中
+SCHEMA_VERSION = 6
+FULLTEXT_VERSION = 6  # 引入全文索引的版本
+MIGRATION_BATCH_SIZE = 20000  # 重建大表时每个事务复制的行数
+
+TASK_STATUSES = ('未开始', '进行中', '已完成', '已中断', '已归档')
+
+# ---------- 基础表结构 ----------
+TASKS_TABLE = """
+    CREATE TABLE IF NOT EXISTS {name} (
+        task_id INTEGER PRIMARY KEY AUTOINCREMENT,
+        name TEXT NOT NULL,
+        description TEXT,
+        status TEXT NOT NULL DEFAULT '未开始'
+            CHECK (status IN ('未开始', '进行中', '已完成', '已中断', '已归档')),
+        due_date DATE NOT NULL,
+        expected_income DECIMAL(10,2) CHECK (expected_income >= 0),
+        actual_income DECIMAL(10,2) CHECK (actual_income >= 0),
+        expense DECIMAL(10,2) CHECK (expense >= 0),
+        created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+    )
+"""
+TASK_COLUMNS = ("task_id, name, description, status, due_date, "
+                "expected_income, actual_income, expense, created_at")
+
+BASE_TABLES = [
+    # 任务表
+    TASKS_TABLE.format(name="tasks"),
+    # 标签表
+    """
+    CREATE TABLE IF NOT EXISTS tags (
+        tag_id INTEGER PRIMARY KEY AUTOINCREMENT,
+        tag_name TEXT NOT NULL UNIQUE,
+        color TEXT
+    )
+    """,
+    # 任务-标签关联表
+    """
+    CREATE TABLE IF NOT EXISTS task_tags (
+        task_id INTEGER,
+        tag_id INTEGER,
+        PRIMARY KEY (task_id, tag_id),
+        FOREIGN KEY (task_id) REFERENCES tasks(task_id) ON DELETE CASCADE,
+        FOREIGN KEY (tag_id) REFERENCES tags(tag_id) ON DELETE CASCADE
+    )
+    """
+]
+
+BASE_INDEXES = [
+    "CREATE INDEX IF NOT EXISTS idx_tasks_status ON tasks(status)",
+    "CREATE INDEX IF NOT EXISTS idx_tasks_due_date ON tasks(due_date)"
+]
+
+QUERY_INDEXES = [
+    # (status, due_date) 覆盖所有页面“按状态+日期”的筛选，取代单列状态索引
+    "DROP INDEX IF EXISTS idx_tasks_status",
+    "CREATE INDEX IF NOT EXISTS idx_tasks_status_due_date ON tasks(status, due_date)",
+    "CREATE INDEX IF NOT EXISTS idx_tasks_due_date ON tasks(due_date)",
+    # 按标签找任务（主键为 (task_id, tag_id)，只能按任务找标签）
+    "CREATE INDEX IF NOT EXISTS idx_task_tags_tag_task ON task_tags(tag_id, task_id)"
+]
+
+
+# ---------- 财务汇总表（由触发器维护） ----------
+# 金额以“分”为单位存为整数，增减时不会累积浮点误差
+ROLLUP_MEASURES = (
+    ("expected_cents", "expected_income"),
+    ("actual_cents", "actual_income"),
+    ("expense_cents", "expense"),
+)
+ROLLUP_TABLES = {
+    # 表名: 主键列
+    "daily_rollup": ("status", "day"),
+    "daily_tag_rollup": ("tag_id", "status", "day"),
+    # 归档任务的汇总，由 TaskManagerDB.archive_tasks 批量维护
+    "daily_rollup_archive": ("status", "day"),
+    "daily_tag_rollup_archive": ("tag_id", "status", "day"),
+}
+
+
+def _rollup_values(row: str, sign: str = "") -> str:
+    """生成某行任务对汇总表的增量：任务数与三项金额（分）"""
+    values = [f"{sign}1"]
+    for _, column in ROLLUP_MEASURES:
+        values.append(
+            f"{sign}CAST(ROUND(COALESCE({row}.{column}, 0) * 100) AS INTEGER)")
+    return ", ".join(values)
+
+
+def rollup_upsert(table: str, source_sql: str) -> str:
+    """生成累加到汇总表的 UPSERT 语句，source_sql 按主键列+度量列顺序给出数据"""
+    keys = ROLLUP_TABLES[table]
+    measures = ["task_count"] + [m for m, _ in ROLLUP_MEASURES]
+    updates = ", ".join(f"{m} = {m} + excluded.{m}" for m in measures)
+    return (f"INSERT INTO {table} ({', '.join(keys + tuple(measures))}) "
+            f"{source_sql} "
+            f"ON CONFLICT ({', '.join(keys)}) DO UPDATE SET {updates};")
+
+
+def _rollup_prune(table: str, where: str) -> str:
+    """删除计数归零的汇总行"""
+    return f"DELETE FROM {table} WHERE task_count = 0 AND {where};"
+
+
+def _daily_delta(row: str, sign: str = "") -> str:
+    return rollup_upsert(
+        "daily_rollup",
+        f"SELECT {row}.status, DATE({row}.due_date), {_rollup_values(row, sign)}")
+
+
+def _tag_delta(row: str, sign: str = "") -> str:
+    return rollup_upsert(
+        "daily_tag_rollup",
+        f"SELECT tt.tag_id, {row}.status, DATE({row}.due_date), "
+        f"{_rollup_values(row, sign)} "
+        f"FROM task_tags tt WHERE tt.task_id = {row}.task_id")
+
+
+ROLLUP_SCHEMA = [
+    """
+    CREATE TABLE IF NOT EXISTS daily_rollup (
+        status TEXT NOT NULL,
+        day DATE NOT NULL,
+        task_count INTEGER NOT NULL DEFAULT 0,
+        expected_cents INTEGER NOT NULL DEFAULT 0,
+        actual_cents INTEGER NOT NULL DEFAULT 0,
+        expense_cents INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (status, day)
+    ) WITHOUT ROWID
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS daily_tag_rollup (
+        tag_id INTEGER NOT NULL,
+        status TEXT NOT NULL,
+        day DATE NOT NULL,
+        task_count INTEGER NOT NULL DEFAULT 0,
+        expected_cents INTEGER NOT NULL DEFAULT 0,
+        actual_cents INTEGER NOT NULL DEFAULT 0,
+        expense_cents INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (tag_id, status, day)
+    ) WITHOUT ROWID
+    """,
+    # 新任务：计入日汇总（此时尚无标签关联）
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_tasks_rollup_insert
+    AFTER INSERT ON tasks
+    BEGIN
+        {_daily_delta("NEW")}
+    END
+    """,
+    # 金额、状态或日期变化：先减旧值再加新值
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_tasks_rollup_update
+    AFTER UPDATE OF status, due_date, expected_income, actual_income, expense ON tasks
+    WHEN OLD.status IS NOT NEW.status
+      OR OLD.due_date IS NOT NEW.due_date
+      OR OLD.expected_income IS NOT NEW.expected_income
+      OR OLD.actual_income IS NOT NEW.actual_income
+      OR OLD.expense IS NOT NEW.expense
+    BEGIN
+        {_daily_delta("OLD", "-")}
+        {_daily_delta("NEW")}
+        {_rollup_prune("daily_rollup", "status = OLD.status AND day = DATE(OLD.due_date)")}
+        {_tag_delta("OLD", "-")}
+        {_tag_delta("NEW")}
+        {_rollup_prune("daily_tag_rollup",
+                       "status = OLD.status AND day = DATE(OLD.due_date) AND tag_id IN "
+                       "(SELECT tag_id FROM task_tags WHERE task_id = OLD.task_id)")}
+    END
+    """,
+    # 删除任务：须在 BEFORE 触发器中处理标签汇总，此时级联删除尚未发生
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_tasks_rollup_delete
+    BEFORE DELETE ON tasks
+    BEGIN
+        {_daily_delta("OLD", "-")}
+        {_rollup_prune("daily_rollup", "status = OLD.status AND day = DATE(OLD.due_date)")}
+        {_tag_delta("OLD", "-")}
+        {_rollup_prune("daily_tag_rollup",
+                       "status = OLD.status AND day = DATE(OLD.due_date) AND tag_id IN "
+                       "(SELECT tag_id FROM task_tags WHERE task_id = OLD.task_id)")}
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_task_tags_rollup_insert
+    AFTER INSERT ON task_tags
+    BEGIN
+        {rollup_upsert("daily_tag_rollup",
+                        "SELECT NEW.tag_id, t.status, DATE(t.due_date), "
+                        f"{_rollup_values('t')} FROM tasks t WHERE t.task_id = NEW.task_id")}
+    END
+    """,
+    # 任务已被删除时（级联删除）子查询为空，不会重复扣减
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_task_tags_rollup_delete
+    AFTER DELETE ON task_tags
+    BEGIN
+        {rollup_upsert("daily_tag_rollup",
+                        "SELECT OLD.tag_id, t.status, DATE(t.due_date), "
+                        f"{_rollup_values('t', '-')} FROM tasks t WHERE t.task_id = OLD.task_id")}
+        {_rollup_prune("daily_tag_rollup",
+                       "tag_id = OLD.tag_id AND (status, day) IN "
+                       "(SELECT status, DATE(due_date) FROM tasks WHERE task_id = OLD.task_id)")}
+    END
+    """,
+]
+
+
+def grouped_rollup_sums(alias: str = "", named: bool = False) -> str:
+    """对任务行分组聚合时的任务数与三项金额（分）表达式
+
+    named 为 True 时按汇总表列名命名，结果可以当作汇总表使用。
+    """
+    prefix = f"{alias}." if alias else ""
+    return ", ".join(["COUNT(*)" + (" AS task_count" if named else "")] + [
+        f"SUM(CAST(ROUND(COALESCE({prefix}{column}, 0) * 100) AS INTEGER))"
+        + (f" AS {measure}" if named else "")
+        for measure, column in ROLLUP_MEASURES])
+
+
+# ---------- 归档层 ----------
+# 归档表与 tasks/task_tags 同构，不设 AUTOINCREMENT（沿用原任务ID）
+ARCHIVE_SCHEMA = [
+    TASKS_TABLE.format(name="tasks_archive").replace(
+        "task_id INTEGER PRIMARY KEY AUTOINCREMENT", "task_id INTEGER PRIMARY KEY"
+    ).replace(
+        "created_at DATETIME DEFAULT CURRENT_TIMESTAMP",
+        "created_at DATETIME,\n        archived_at DATETIME DEFAULT CURRENT_TIMESTAMP"
+    ),
+    """
+    CREATE TABLE IF NOT EXISTS task_tags_archive (
+        task_id INTEGER,
+        tag_id INTEGER,
+        PRIMARY KEY (task_id, tag_id),
+        FOREIGN KEY (task_id) REFERENCES tasks_archive(task_id) ON DELETE CASCADE,
+        FOREIGN KEY (tag_id) REFERENCES tags(tag_id) ON DELETE CASCADE
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_tasks_archive_status_due_date "
+    "ON tasks_archive(status, due_date)",
+    "CREATE INDEX IF NOT EXISTS idx_task_tags_archive_tag_task "
+    "ON task_tags_archive(tag_id, task_id)",
+] + [
+    ROLLUP_SCHEMA[index].replace(table, f"{table}_archive", 1)
+    for index, table in ((0, "daily_rollup"), (1, "daily_tag_rollup"))
+]
+
+
+# ---------- 全文索引 ----------
+# 任务表 -> 全文索引表；外部内容表，只存索引不重复存正文
+FTS_TABLES = {"tasks": "tasks_fts", "tasks_archive": "tasks_archive_fts"}
+
+
+def _fulltext_schema(table: str, fts: str) -> List[str]:
+    """任务名称和描述的 FTS5 索引及同步触发器
+
+    trigram 分词按连续三个字符切分，中文、英文及混排文本都能按子串匹配；
+    只在 name/description 变化时更新索引，改状态等操作不触及它。
+    """
+    new_row = f"INSERT INTO {fts}(rowid, name, description) " \
+              f"VALUES (NEW.task_id, NEW.name, NEW.description);"
+    old_row = f"INSERT INTO {fts}({fts}, rowid, name, description) " \
+              f"VALUES ('delete', OLD.task_id, OLD.name, OLD.description);"
+    return [
+        f"""
+        CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5(
+            name, description,
+            content='{table}', content_rowid='task_id', tokenize='trigram'
+        )
+        """,
+        f"""
+        CREATE TRIGGER IF NOT EXISTS trg_{fts}_insert AFTER INSERT ON {table}
+        BEGIN {new_row} END
+        """,
+        f"""
+        CREATE TRIGGER IF NOT EXISTS trg_{fts}_delete AFTER DELETE ON {table}
+        BEGIN {old_row} END
+        """,
+        f"""
+        CREATE TRIGGER IF NOT EXISTS trg_{fts}_update AFTER UPDATE OF name, description ON {table}
+        BEGIN {old_row} {new_row} END
+        """,
+    ]
+
+
+def fulltext_supported(conn: sqlite3.Connection) -> bool:
+    """当前 SQLite 是否带有 FTS5 及 trigram 分词器（3.34 起）"""
+    try:
+        conn.execute("CREATE VIRTUAL TABLE temp.fts_probe USING fts5(x, tokenize='trigram')")
+        conn.execute("DROP TABLE temp.fts_probe")
+        return True
+    except sqlite3.OperationalError:
+        return False
+
+
+def has_fulltext(conn: sqlite3.Connection) -> bool:
+    return conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE name = 'tasks_fts'").fetchone() is not None
+
+
+def rebuild_rollups(cursor: sqlite3.Cursor):
+    """根据 tasks/task_tags 全量重算汇总表"""
+    sums = grouped_rollup_sums()
+    cursor.execute("DELETE FROM daily_rollup")
+    cursor.execute("DELETE FROM daily_tag_rollup")
+    cursor.execute(f"""
+        INSERT INTO daily_rollup
+        SELECT status, DATE(due_date), {sums}
+        FROM tasks GROUP BY status, DATE(due_date)
+    """)
+    cursor.execute(f"""
+        INSERT INTO daily_tag_rollup
+        SELECT tt.tag_id, t.status, DATE(t.due_date), {sums}
+        FROM task_tags tt JOIN tasks t ON t.task_id = tt.task_id
+        GROUP BY tt.tag_id, t.status, DATE(t.due_date)
+    """)
+
+
+# ---------- 迁移步骤 ----------
+# 每个步骤由 (prepare, apply) 组成：
+#   prepare(conn) 可选，在事务外执行，可自行分批提交（必须可重复执行，以便中断后续跑）；
+#   apply(conn) 在单个事务中执行，与 user_version 的更新一起提交。
+def _apply_base_tables(conn: sqlite3.Connection):
+    for sql in BASE_TABLES + BASE_INDEXES:
+        conn.execute(sql)
+
+
+def _tasks_check_is_current(conn: sqlite3.Connection) -> bool:
+    row = conn.execute(
+        "SELECT sql FROM sqlite_master WHERE type = 'table' AND name = 'tasks'").fetchone()
+    return row is None or all(f"'{status}'" in row[0] for status in TASK_STATUSES)
+
+
+def _prepare_tasks_rebuild(conn: sqlite3.Connection):
+    """分批把旧 tasks 复制到新表，每批一个事务；中断后从已复制的最大ID继续"""
+    if _tasks_check_is_current(conn):
+        return
+    conn.execute(TASKS_TABLE.format(name="tasks_migrating"))
+    conn.commit()
+    while True:
+        conn.execute("BEGIN IMMEDIATE")
+        last_id = conn.execute(
+            "SELECT COALESCE(MAX(task_id), 0) FROM tasks_migrating").fetchone()[0]
+        copied = conn.execute(f"""
+            INSERT INTO tasks_migrating ({TASK_COLUMNS})
+            SELECT {TASK_COLUMNS} FROM tasks
+            WHERE task_id > ? ORDER BY task_id LIMIT ?
+        """, (last_id, MIGRATION_BATCH_SIZE)).rowcount
+        conn.commit()
+        if copied < MIGRATION_BATCH_SIZE:
+            return
+
+
+def _apply_tasks_rebuild(conn: sqlite3.Connection):
+    """用新表替换旧 tasks（status CHECK 加入 '已归档'）"""
+    if _tasks_check_is_current(conn):
+        return
+    last_id = conn.execute(
+        "SELECT COALESCE(MAX(task_id), 0) FROM tasks_migrating").fetchone()[0]
+    conn.execute(f"""
+        INSERT INTO tasks_migrating ({TASK_COLUMNS})
+        SELECT {TASK_COLUMNS} FROM tasks WHERE task_id > ?
+    """, (last_id,))
+    seq = conn.execute(
+        "SELECT seq FROM sqlite_sequence WHERE name = 'tasks'").fetchone()
+
+    # 引用 tasks 的触发器会让 RENAME 时的结构校验失败；由后续版本的迁移重建
+    for (trigger,) in conn.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'trigger'").fetchall():
+        conn.execute(f"DROP TRIGGER {trigger}")
+    conn.execute("DROP TABLE tasks")
+    conn.execute("ALTER TABLE tasks_migrating RENAME TO tasks")
+    if seq:
+        # 保持 AUTOINCREMENT 不复用已删除任务的ID
+        conn.execute("UPDATE sqlite_sequence SET seq = MAX(seq, ?) WHERE name = 'tasks'",
+                     (seq[0],))
+    for sql in BASE_INDEXES:
+        conn.execute(sql)
+
+
+def _apply_query_indexes(conn: sqlite3.Connection):
+    for sql in QUERY_INDEXES:
+        conn.execute(sql)
+
+
+def _apply_rollups(conn: sqlite3.Connection):
+    for sql in ROLLUP_SCHEMA:
+        conn.execute(sql)
+    rebuild_rollups(conn.cursor())  # 旧数据库首次升级时回填
+
+
+def _apply_archive(conn: sqlite3.Connection):
+    for sql in ARCHIVE_SCHEMA:
+        conn.execute(sql)
+
+
+def _build_fulltext(conn: sqlite3.Connection):
+    for table, fts in FTS_TABLES.items():
+        for sql in _fulltext_schema(table, fts):
+            conn.execute(sql)
+        conn.execute(f"INSERT INTO {fts}({fts}) VALUES ('rebuild')")  # 索引已有任务
+
+
+def _apply_fulltext(conn: sqlite3.Connection):
+    """SQLite 不支持 trigram 时跳过建索引，版本号照常更新，以免阻塞之后的迁移；
+    索引是否存在以 tasks_fts 表为准，升级 SQLite 后由 ensure_fulltext 在启动时补建"""
+    if not fulltext_supported(conn):
+        print("警告: 当前 SQLite 不支持 FTS5 trigram 分词，搜索将退化为 LIKE 匹配")
+        return
+    _build_fulltext(conn)
+
+
+def ensure_fulltext(conn: sqlite3.Connection) -> bool:
+    """结构版本已含全文索引、但迁移时 SQLite 不支持而跳过了的，现在补建；返回是否补建"""
+    if (schema_version(conn) < FULLTEXT_VERSION or has_fulltext(conn)
+            or not fulltext_supported(conn)):
+        return False
+    if conn.in_transaction:
+        conn.commit()
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        _build_fulltext(conn)
+        conn.commit()
+    except sqlite3.Error:
+        conn.rollback()
+        raise
+    return True
+
+
+Step = Tuple[int, str, Optional[Callable[[sqlite3.Connection], None]],
+             Callable[[sqlite3.Connection], None]]
+
+MIGRATIONS: List[Step] = [
+    (1, "基础表结构", None, _apply_base_tables),
+    (2, "tasks.status 约束加入 '已归档'", _prepare_tasks_rebuild, _apply_tasks_rebuild),
+    (3, "组合查询索引", None, _apply_query_indexes),
+    (4, "财务汇总表及触发器", None, _apply_rollups),
+    (5, "归档表", None, _apply_archive),
+    (FULLTEXT_VERSION, "任务名称与描述全文索引", None, _apply_fulltext),
+]
+
+
+def schema_version(conn: sqlite3.Connection) -> int:
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def migrate(conn: sqlite3.Connection) -> bool:
+    """把数据库升级到 SCHEMA_VERSION，返回是否执行了迁移
+
+    结构已是最新时只读取一次 PRAGMA user_version。
+    """
+    version = schema_version(conn)
+    if version >= SCHEMA_VERSION:
+        return False
+
+    if conn.in_transaction:
+        conn.commit()
+    # 重建表时不能触发级联删除；外键开关只能在事务外修改
+    conn.execute("PRAGMA foreign_keys = OFF")
+    try:
+        for target, description, prepare, apply in MIGRATIONS:
+            if version >= target:
+                continue
+            print(f"数据库迁移到版本 {target}: {description}")
+            if prepare:
+                prepare(conn)
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                apply(conn)
+                conn.execute(f"PRAGMA user_version = {target}")
+                conn.commit()
+            except sqlite3.Error:
+                conn.rollback()
+                raise
+            version = target
+
+        violations = conn.execute("PRAGMA foreign_key_check").fetchall()
+        if violations:
+            print(f"警告: 数据库中存在 {len(violations)} 条外键不一致的记录")
+    finally:
+        conn.execute("PRAGMA foreign_keys = ON")
+    return True
@@ -2,19 +2,32 @@ import sys
 import sqlite3
 from datetime import datetime, timedelta
 from PyQt5.QtWidgets import (QApplication, QWidget, QVBoxLayout, QHBoxLayout,
-                             QLabel, QComboBox)
-from PyQt5.QtCore import Qt
+                             QLabel, QCheckBox)
+from PyQt5.QtCore import Qt, QTimer
 from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
 from matplotlib.figure import Figure
-from database import TaskManagerDB
+from database import get_db
+from dataservice import get_data_service
+from tagfilter import TagFilterButton
+from taskstore import get_task_store
 
 class StatsDashboard(QWidget):
     def __init__(self):
         super().__init__()
-        self.db = TaskManagerDB()
+        self.db = get_db()
+        self.data_service = get_data_service()
         self.init_ui()
         self.load_tags()
         self.update_display()
+        
+        # 只统计已完成任务：涉及已完成任务的变化才刷新，同一轮事件中的多次变化合并
+        self.refresh_timer = QTimer(self)
+        self.refresh_timer.setSingleShot(True)
+        self.refresh_timer.timeout.connect(self.update_display)
+        task_store = get_task_store()
+        task_store.completedTasksChanged.connect(self.refresh_timer.start)
+        task_store.reset.connect(self.refresh_timer.start)
+        task_store.tagsChanged.connect(self.load_tags)
 
     def init_ui(self):
         self.setWindowTitle('任务统计仪表盘')
@@ -23,8 +36,14 @@ class StatsDashboard(QWidget):
         main_layout = QVBoxLayout()
 
         # 标签筛选
-        self.tag_combo = QComboBox()
-        main_layout.addWidget(self.tag_combo)
+        filter_layout = QHBoxLayout()
+        self.tag_filter_btn = TagFilterButton()
+        filter_layout.addWidget(self.tag_filter_btn, stretch=1)
+        
+        # 是否统计归档任务
+        self.archive_check = QCheckBox("包含归档")
+        filter_layout.addWidget(self.archive_check)
+        main_layout.addLayout(filter_layout)
 
         # 累计收益显示
         self.total_income_label = QLabel()
@@ -52,105 +71,71 @@ class StatsDashboard(QWidget):
         self.setLayout(main_layout)
 
         # 事件绑定
-        self.tag_combo.currentIndexChanged.connect(self.update_display)
+        self.tag_filter_btn.filterChanged.connect(self.update_display)
+        self.archive_check.toggled.connect(self.update_display)
 
     def load_tags(self):
-        """加载标签数据到下拉框"""
-        cursor = self.db.conn.cursor()
-        cursor.execute("SELECT tag_id, tag_name FROM tags ORDER BY tag_name")
-        self.tag_combo.clear()
-        self.tag_combo.addItem("全部", None)
-        for tag_id, tag_name in cursor.fetchall():
-            self.tag_combo.addItem(tag_name, tag_id)
+        """加载标签数据到筛选菜单（保留当前选择）"""
+        if self.tag_filter_btn.load_tags(self.db.get_all_tags()):
+            self.update_display()  # 筛选中的标签已被删除
 
     def get_selected_tag(self):
-        """获取当前选中的标签ID"""
-        return self.tag_combo.currentData()
+        """获取当前标签筛选（TagFilter，未筛选时为 None）"""
+        return self.tag_filter_btn.tag_filter()
 
     def update_display(self):
-        """更新所有显示内容"""
+        """在后台查询统计数据，完成后更新所有显示内容"""
         tag_id = self.get_selected_tag()
-        
+        include_archive = self.archive_check.isChecked()
+        self.data_service.submit(
+            "stats",
+            lambda db: self.get_stats_data(tag_id, db, include_archive),
+            self.render_display
+        )
+
+    def render_display(self, data):
+        """用同一份统计结果更新累计收益和全部图表"""
         # 更新累计收益
-        total = self.get_total_income(tag_id)
-        self.total_income_label.setText(f"累计收益：¥{total:,.2f}")
+        self.total_income_label.setText(f"累计收益：¥{data['all_time_income']:,.2f}")
         
         # 更新图表
-        self.update_line_chart(tag_id)
-        self.update_pie_chart(tag_id)
-
-    def get_total_income(self, tag_id):
-        """获取累计收益"""
-        query = """
-            SELECT COALESCE(SUM(expected_income), 0) 
-            FROM tasks 
-            WHERE status = '已完成'
-        """
-        params = []
-        if tag_id:
-            query += " AND task_id IN (SELECT task_id FROM task_tags WHERE tag_id = ?)"
-            params.append(tag_id)
-        
-        cursor = self.db.conn.cursor()
-        cursor.execute(query, params)
-        return cursor.fetchone()[0]
+        self.update_line_chart(data)
+        self.update_pie_chart(data)
+
+    def get_stats_data(self, tag_id, db=None, include_archive=False):
+        """获取仪表盘全部数据：累计收益、近30天每日收益和窗口内总收支
 
-    def get_chart_data(self, tag_id):
-        """获取图表所需数据"""
+        一次查询汇总表得到全部数值（见 TaskManagerDB.get_rollup_summary），
+        各显示部件都从返回的字典取数，不再各自查询。
+        """
         end_date = datetime.now().date()
         start_date = end_date - timedelta(days=29)
         
         # 生成完整日期范围
         dates = [start_date + timedelta(days=i) for i in range(30)]
         
-        # 查询每日收益
-        daily_query = """
-            SELECT DATE(due_date), SUM(expected_income)
-            FROM tasks
-            WHERE status = '已完成' 
-              AND due_date BETWEEN ? AND ?
-        """
-        params = [start_date.isoformat(), end_date.isoformat()]
-        
-        if tag_id:
-            daily_query += " AND task_id IN (SELECT task_id FROM task_tags WHERE tag_id = ?)"
-            params.append(tag_id)
-        
-        daily_query += " GROUP BY DATE(due_date)"
-        
-        cursor = self.db.conn.execute(daily_query, params)
-        daily_data = {datetime.strptime(d[0], "%Y-%m-%d").date(): d[1] for d in cursor}
+        db = db or self.db
+        totals, daily_data = db.get_rollup_summary("已完成", start_date, end_date,
+                                                   tag_id, include_archive)
         
         # 填充数据
-        income = [daily_data.get(date, 0) for date in dates]
-        
-        # 查询总收支
-        total_query = """
-            SELECT 
-                COALESCE(SUM(expected_income), 0),
-                COALESCE(SUM(expense), 0) 
-            FROM tasks
-            WHERE status = '已完成'
-              AND due_date BETWEEN ? AND ?
-        """
-        total_params = [start_date.isoformat(), end_date.isoformat()]
-        if tag_id:
-            total_query += " AND task_id IN (SELECT task_id FROM task_tags WHERE tag_id = ?)"
-            total_params.append(tag_id)
+        income = [daily_data[d.isoformat()]["expected_income"]
+                  if d.isoformat() in daily_data else 0 for d in dates]
         
-        cursor = self.db.conn.execute(total_query, total_params)
-        total_income, total_expense = cursor.fetchone()
+        # 窗口内总收支
+        total_income = sum(day["expected_income"] for day in daily_data.values())
+        total_expense = sum(day["expense"] for day in daily_data.values())
         
         return {
+            'all_time_income': totals["expected_income"],
             'dates': dates,
             'income': income,
             'total_income': total_income,
             'total_expense': total_expense
         }
 
-    def update_line_chart(self, tag_id):
+    def update_line_chart(self, data):
         """更新折线图"""
-        data = self.get_chart_data(tag_id)
         
         # 清除旧图表
         if hasattr(self, 'line_canvas'):
@@ -170,9 +155,8 @@ class StatsDashboard(QWidget):
         #self.line_chart_widget.setLayout(layout)
         self.charts_layout.addWidget(self.line_canvas)
 
-    def update_pie_chart(self, tag_id):
+    def update_pie_chart(self, data):
         """更新饼图"""
-        data = self.get_chart_data(tag_id)
         total_income = data['total_income']
         total_expense = data['total_expense']
         
@@ -0,0 +1,123 @@
+from typing import Dict, Iterable, Optional, Tuple
+
+from PyQt5.QtCore import pyqtSignal
+from PyQt5.QtWidgets import QAction, QActionGroup, QMenu, QToolButton
+
+from querybuilder import TagFilter
+
+# 每个标签在筛选中的作用：模式 -> (菜单文字, 说明中的连接词)
+TAG_MODES = {
+    "all_of": ("必须包含（且）", "且"),
+    "any_of": ("包含任一（或）", "或"),
+    "none_of": ("排除（非）", "非"),
+}
+
+
+class TagFilterButton(QToolButton):
+    """多标签筛选按钮（历史页与统计页共用）
+
+    菜单中每个标签一个子菜单，可设为 不限 / 必须包含 / 包含任一 / 排除，
+    组合结果为 querybuilder.TagFilter，由查询编译为 task_tags 上的 INTERSECT/EXCEPT。
+    """
+
+    filterChanged = pyqtSignal()
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setPopupMode(QToolButton.InstantPopup)
+        self._menu = QMenu(self)
+        self.setMenu(self._menu)
+        self._names: Dict[int, str] = {}
+        self._modes: Dict[int, str] = {}  # 标签ID -> TAG_MODES 中的模式
+        self._submenus: Dict[int, QMenu] = {}
+        self._clear_action: Optional[QAction] = None
+        self._update_text()
+
+    def load_tags(self, tags: Iterable[Tuple[int, str, str]]) -> bool:
+        """重建菜单（保留各标签的设置）；已删除的标签从筛选中移除时返回 True"""
+        self._names = {tag_id: tag_name for tag_id, tag_name, _ in tags}
+        removed = [tag_id for tag_id in self._modes if tag_id not in self._names]
+        for tag_id in removed:
+            del self._modes[tag_id]
+        self._rebuild_menu()
+        self._update_text()
+        return bool(removed)
+
+    def tag_filter(self) -> Optional[TagFilter]:
+        """当前筛选；未设置任何标签时为 None"""
+        if not self._modes:
+            return None
+        groups = {mode: [] for mode in TAG_MODES}
+        for tag_id, mode in sorted(self._modes.items()):
+            groups[mode].append(tag_id)
+        return TagFilter(**{mode: tuple(ids) for mode, ids in groups.items()})
+
+    def clear(self):
+        if self._modes:
+            tag_ids = list(self._modes)
+            self._modes.clear()
+            for tag_id in tag_ids:
+                self._update_submenu(tag_id)
+            self._update_text()
+            self.filterChanged.emit()
+
+    def _rebuild_menu(self):
+        self._menu.clear()
+        self._submenus.clear()
+        self._clear_action = self._menu.addAction("清除标签筛选")
+        self._clear_action.triggered.connect(self.clear)
+        self._menu.addSeparator()
+        for tag_id, tag_name in self._names.items():
+            submenu = self._menu.addMenu(tag_name)
+            group = QActionGroup(submenu)
+            for mode, label in [(None, "不限")] + [
+                    (key, text) for key, (text, _) in TAG_MODES.items()]:
+                action = QAction(label, group)
+                action.setCheckable(True)
+                action.setData(mode)
+                action.triggered.connect(
+                    lambda _, t=tag_id, m=mode: self._set_mode(t, m))
+                submenu.addAction(action)
+            self._submenus[tag_id] = submenu
+            self._update_submenu(tag_id)
+
+    def _update_submenu(self, tag_id: int):
+        """同步子菜单标题与勾选项（菜单在信号处理中不能重建，只原地更新）"""
+        submenu = self._submenus.get(tag_id)
+        if submenu is None:
+            return
+        mode = self._modes.get(tag_id)
+        name = self._names[tag_id]
+        submenu.setTitle(f"{name}（{TAG_MODES[mode][1]}）" if mode else name)
+        for action in submenu.actions():
+            action.setChecked(action.data() == mode)
+
+    def _set_mode(self, tag_id: int, mode: Optional[str]):
+        if self._modes.get(tag_id) == mode:
+            return
+        if mode:
+            self._modes[tag_id] = mode
+        else:
+            self._modes.pop(tag_id, None)
+        self._update_submenu(tag_id)
+        self._update_text()
+        self.filterChanged.emit()
+
+    def _update_text(self):
+        count = len(self._modes)
+        if self._clear_action is not None:
+            self._clear_action.setEnabled(bool(count))
+        self.setText(f"标签 ({count})" if count else "全部标签")
+        tag_filter = self.tag_filter()
+        self.setToolTip(describe_tag_filter(tag_filter, self._names) if tag_filter
+                        else "按标签组合筛选")
+
+
+def describe_tag_filter(tag_filter: TagFilter, names: Dict[int, str]) -> str:
+    """筛选条件的文字说明，如 “且: 图文, 视频；非: 广告”"""
+    parts = []
+    for mode, (_, word) in TAG_MODES.items():
+        tag_ids = getattr(tag_filter, mode)
+        if tag_ids:
+            parts.append(f"{word}: " + ", ".join(names.get(t, str(t)) for t in tag_ids))
+    return "；".join(parts)
@@ -0,0 +1,196 @@
+from collections import namedtuple
+from typing import Dict, Optional
+
+from PyQt5.QtCore import QObject, QTimer, pyqtSignal
+
+from database import (DEFAULT_DB_FILE, TAGS_CHANGED, TASKS_CREATED,
+                      add_write_listener, get_db, remove_write_listener)
+from dataservice import get_data_service
+from querybuilder import active_tasks_sql, kanban_counts_sql, task_records_sql
+
+# 快照中保留的“进行中”状态；已完成/已归档的历史任务不常驻内存
+ACTIVE_STATUSES = ('未开始', '进行中', '已中断')
+# 一次写入涉及的任务超过该数量时发出 reset，由各页面整体刷新
+STORE_DIFF_LIMIT = 500
+
+TaskRecord = namedtuple(
+    "TaskRecord",
+    "task_id name status due_date expected_income actual_income expense tags")
+
+_store: Optional["TaskStore"] = None
+
+
+def get_task_store() -> "TaskStore":
+    """获取进程内共享的任务存储（须在 GUI 线程首次调用）"""
+    global _store
+    if _store is None:
+        _store = TaskStore()
+    return _store
+
+
+def task_record_from_row(row) -> TaskRecord:
+    *fields, tags = row
+    return TaskRecord(*fields, tuple(tags.split(", ")) if tags else ())
+
+
+class TaskStore(QObject):
+    """活动任务的内存快照及细粒度变更通知
+
+    任何连接（GUI 线程或后台写线程）提交任务/标签修改后，数据库层回调本对象；
+    存储在读线程中按ID重新读取受影响的行，与快照比对后发出：
+    - taskAdded(新记录)
+    - taskChanged(旧记录或 None, 新记录)：旧记录只在任务原本处于快照中时给出
+    - taskRemoved(任务ID, 旧记录或 None)
+    - tagsChanged(标签ID列表)
+    - countsChanged({状态: 任务数})
+    - completedTasksChanged()：本批变化可能涉及已完成任务（历史页、统计页据此刷新）
+    - reset()：变化范围未知或过大，监听方应整体刷新
+
+    快照（活动任务ID -> 记录）只用于给出变更前的旧记录，页面不从这里读取任务，
+    仍按各自的筛选条件查询数据库。
+    """
+
+    taskAdded = pyqtSignal(object)
+    taskChanged = pyqtSignal(object, object)
+    taskRemoved = pyqtSignal(int, object)
+    tagsChanged = pyqtSignal(object)
+    countsChanged = pyqtSignal(object)
+    completedTasksChanged = pyqtSignal()
+    reset = pyqtSignal()
+
+    # 数据库层在写线程回调，经由该信号排队转到 GUI 线程
+    _written = pyqtSignal(str, object)
+
+    def __init__(self, db_file: str = DEFAULT_DB_FILE):
+        super().__init__()
+        self.db_key = get_db(db_file).key
+        self.data_service = get_data_service()
+        self._tasks: Dict[int, TaskRecord] = {}
+        self.status_counts: Dict[str, int] = {}
+        self._pending: Dict[int, str] = {}  # 任务ID -> 事件，等待重新读取
+        self._pending_reset = False
+        self._flush_scheduled = False
+        self._loading = False
+        self._loaded = False  # 首次快照已载入
+
+        self._written.connect(self._on_written)
+        add_write_listener(self._on_db_write)
+        self.reload()
+
+    def close(self):
+        remove_write_listener(self._on_db_write)
+
+    # ---------- 载入 ----------
+    @staticmethod
+    def fetch_counts(db) -> Dict[str, int]:
+        query, params = kanban_counts_sql()
+        return dict(db.conn.execute(query, params).fetchall())
+
+    @staticmethod
+    def fetch_snapshot(db) -> tuple:
+        query, params = active_tasks_sql(ACTIVE_STATUSES)
+        tasks = {row[0]: task_record_from_row(row)
+                 for row in db.conn.execute(query, params)}
+        return tasks, TaskStore.fetch_counts(db)
+
+    @staticmethod
+    def fetch_records(db, task_ids) -> tuple:
+        query, params = task_records_sql(task_ids)
+        records = [task_record_from_row(row) for row in db.conn.execute(query, params)]
+        return records, TaskStore.fetch_counts(db)
+
+    def reload(self):
+        """在后台重新载入整个快照；除首次载入外，完成后发出 reset
+
+        各页面启动时自行载入数据，首次快照不需要再通知它们刷新。
+        """
+        self._loading = True
+        self._pending.clear()
+        self._pending_reset = False
+        self.data_service.cancel("task_store_rows")
+        self.data_service.submit("task_store", self.fetch_snapshot, self._apply_snapshot)
+
+    def _apply_snapshot(self, result):
+        self._loading = False
+        self._tasks, self.status_counts = result
+        if self._loaded:
+            self.reset.emit()
+        self._loaded = True
+        self.countsChanged.emit(self.status_counts)
+        if self._pending_reset:
+            self.reload()  # 载入期间又有写入，快照可能已过时
+
+    # ---------- 写入通知 ----------
+    def _on_db_write(self, db_key: str, event: str, ids):
+        # 可能在任意线程调用，只做转发
+        if db_key == self.db_key:
+            self._written.emit(event, ids)
+
+    def _on_written(self, event: str, ids):
+        if event == TAGS_CHANGED:
+            # 各连接的标签缓存已由数据库层在提交后作废
+            self.tagsChanged.emit(ids)
+            return
+
+        if (self._loading or ids is None
+                or len(self._pending) + len(ids) > STORE_DIFF_LIMIT):
+            self._pending_reset = True
+        else:
+            for task_id in ids:
+                # 同一任务先新建后修改，仍按新建通知
+                if self._pending.get(task_id) != TASKS_CREATED:
+                    self._pending[task_id] = event
+        # 同一轮事件循环内的多次写入合并为一次读取
+        if not self._flush_scheduled:
+            self._flush_scheduled = True
+            QTimer.singleShot(0, self._flush)
+
+    def _flush(self):
+        self._flush_scheduled = False
+        if self._loading:
+            return  # 快照载入完成后再处理
+        if self._pending_reset:
+            self.reload()
+            return
+        if not self._pending:
+            return
+        # 同一 key 的新请求会取代旧请求，因此每次都读取全部待处理的ID
+        snapshot = dict(self._pending)
+        self.data_service.submit(
+            "task_store_rows",
+            lambda db: self.fetch_records(db, sorted(snapshot)),
+            lambda result: self._apply_records(snapshot, *result))
+
+    def _apply_records(self, events: Dict[int, str], records, counts):
+        for task_id in events:
+            if self._pending.get(task_id) == events[task_id]:
+                del self._pending[task_id]
+        found = {record.task_id: record for record in records}
+        completed = False
+
+        for task_id, event in events.items():
+            old = self._tasks.get(task_id)
+            record = found.get(task_id)
+            # 快照只含未完成任务：旧记录为 None 说明任务原本可能是已完成的
+            if event == TASKS_CREATED and record is not None:
+                completed = completed or record.status == "已完成"
+            else:
+                completed = completed or old is None or (
+                    record is not None and record.status == "已完成")
+            if record is None:
+                self._tasks.pop(task_id, None)
+                self.taskRemoved.emit(task_id, old)
+                continue
+            if record.status in ACTIVE_STATUSES:
+                self._tasks[task_id] = record
+            else:
+                self._tasks.pop(task_id, None)
+            if event == TASKS_CREATED:
+                self.taskAdded.emit(record)
+            elif record != old:
+                self.taskChanged.emit(old, record)
+
+        self.status_counts = counts
+        self.countsChanged.emit(counts)
+        if completed:
+            self.completedTasksChanged.emit()
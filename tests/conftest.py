@@ -0,0 +1,17 @@
+import os
+import sys
+
+import pytest
+
+# 模块都在仓库根目录下（没有打包），测试直接导入
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import TaskManagerDB  # noqa: E402
+
+
+@pytest.fixture(scope="module")
+def db():
+    """迁移到最新表结构的内存数据库"""
+    database = TaskManagerDB(":memory:")
+    yield database
+    database.conn.close()
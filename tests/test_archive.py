@@ -0,0 +1,66 @@
+from datetime import date
+
+import pytest
+
+CUTOFF = date(2024, 6, 1)
+
+
+@pytest.fixture(scope="module")
+def archived(db):
+    """归档前后的任务：旧的已完成/已归档任务被移走，其余留在活动表"""
+    ids = db.create_tasks([
+        {"name": "旧的已完成", "due_date": date(2024, 1, 10), "status": "已完成",
+         "expected_income": 100, "tags": ["图文"]},
+        {"name": "旧的已归档", "due_date": date(2024, 2, 10), "status": "已归档",
+         "expected_income": 50, "expense": 5},
+        {"name": "旧的进行中", "due_date": date(2024, 1, 10), "status": "进行中",
+         "expected_income": 30, "tags": ["图文"]},
+        {"name": "新的已完成", "due_date": date(2024, 7, 1), "status": "已完成",
+         "expected_income": 20, "tags": ["图文"]},
+    ])
+    before = {status: db.get_rollup_totals(status) for status in ("已完成", "已归档", "进行中")}
+    tag_before = db.get_rollup_totals("已完成", tag_id=db.get_tag_id("图文"))
+    moved = db.archive_tasks(CUTOFF, batch_size=1)
+    return ids, moved, before, tag_before
+
+
+def test_archived_tasks_leave_active_tables(db, archived):
+    ids, moved, _, _ = archived
+    assert moved == 2
+    active = {row[0] for row in db.conn.execute("SELECT task_id FROM tasks")}
+    assert active == {ids[2], ids[3]}
+    assert {row[0] for row in db.conn.execute("SELECT task_id FROM tasks_archive")} \
+        == {ids[0], ids[1]}
+    assert db.conn.execute("SELECT task_id FROM task_tags_archive").fetchall() == [(ids[0],)]
+    assert db.conn.execute(
+        "SELECT COUNT(*) FROM task_tags WHERE task_id IN (?, ?)", ids[:2]).fetchone() == (0,)
+
+
+def test_archived_tasks_only_in_rollups_with_archive(db, archived):
+    _, _, before, tag_before = archived
+    tag_id = db.get_tag_id("图文")
+
+    completed = db.get_rollup_totals("已完成")
+    assert (completed["task_count"], completed["expected_income"]) == (1, 20)
+    assert db.get_rollup_totals("已完成", include_archive=True) == before["已完成"]
+    assert db.get_rollup_totals("已归档")["task_count"] == 0
+    assert db.get_rollup_totals("已归档", include_archive=True) == before["已归档"]
+    assert db.get_rollup_totals("进行中") == before["进行中"]
+
+    assert db.get_rollup_totals("已完成", tag_id=tag_id)["task_count"] == 1
+    assert db.get_rollup_totals("已完成", tag_id=tag_id, include_archive=True) == tag_before
+    assert "2024-01-10" not in db.get_daily_rollup("已完成")
+    assert db.get_daily_rollup("已完成", include_archive=True)["2024-01-10"]["task_count"] == 1
+
+
+def test_task_details_fall_back_to_archive(db, archived):
+    """历史页详情对话框通过 get_task_details 查看已归档任务"""
+    ids = archived[0]
+    task = db.get_task_details(ids[0])
+    assert (task["name"], task["status"], task["tags"]) == ("旧的已完成", "已完成", ["图文"])
+    assert task["archived_at"] is not None
+    assert db.get_task_details(ids[0], include_archive=False) is None
+
+    active = db.get_task_details(ids[2])
+    assert active["name"] == "旧的进行中" and "archived_at" not in active
+    assert db.get_task_details(-1) is None
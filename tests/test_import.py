@@ -0,0 +1,34 @@
+import pytest
+
+from importmodule import TaskImporter
+
+HEADER = "任务名称,截止时间,状态,预计收入,标签\n"
+
+
+def _import(db, tmp_path, rows):
+    path = tmp_path / "tasks.csv"
+    path.write_text(HEADER + "".join(rows), encoding="utf-8")
+    return TaskImporter(db).import_file(str(path))
+
+
+@pytest.mark.parametrize("amount", ["NaN", "nan", "sNaN", "Infinity", "inf", "-inf"])
+def test_non_finite_amount_rejects_row(db, tmp_path, amount):
+    report = _import(db, tmp_path, [
+        "正常任务,2025-05-01,已完成,100,导入\n",
+        f"坏金额,2025-05-02,已完成,{amount},导入\n",
+        "另一个任务,2025-05-03,未开始,,\n",
+    ])
+    assert report["imported"] == 2
+    assert report["rejected_count"] == 1
+    assert report["rejected"] == [(3, f"预计收入 不是有效金额: {amount!r}")]
+
+
+def test_negative_amount_rejects_row(db, tmp_path):
+    report = _import(db, tmp_path, [
+        "负数,2025-05-01,已完成,-5,\n",
+        "千位分隔,2025-05-02,已完成,\"1,200.50\",\n",
+    ])
+    assert report["imported"] == 1
+    assert report["rejected"] == [(2, "预计收入 不能为负数: '-5'")]
+    assert db.conn.execute(
+        "SELECT expected_income FROM tasks WHERE name = '千位分隔'").fetchone() == (1200.5,)
@@ -0,0 +1,109 @@
+import sqlite3
+
+import pytest
+
+import schema
+from schema import BASE_INDEXES, BASE_TABLES, SCHEMA_VERSION, TASKS_TABLE, migrate
+
+TASK_COUNT = 25
+
+
+def _create_v0(path) -> None:
+    """建立迁移机制引入之前的数据库：user_version 为 0，status 约束不含 '已归档'"""
+    conn = sqlite3.connect(path)
+    old_tasks = TASKS_TABLE.format(name="tasks").replace(", '已归档'", "")
+    assert old_tasks != TASKS_TABLE.format(name="tasks")
+    for sql in [old_tasks] + BASE_TABLES[1:] + BASE_INDEXES:
+        conn.execute(sql)
+    conn.executemany(
+        "INSERT INTO tasks (name, description, status, due_date, expected_income, expense) "
+        "VALUES (?, ?, ?, ?, ?, ?)",
+        [(f"任务{i}", f"描述{i}", ("未开始", "已完成")[i % 2],
+          f"2024-0{1 + i % 9}-1{i % 10}", i * 1.5, 0.25) for i in range(TASK_COUNT)])
+    conn.execute("DELETE FROM tasks WHERE task_id = ?", (TASK_COUNT,))  # 末尾ID已被删除
+    conn.execute("INSERT INTO tags (tag_name) VALUES ('图文')")
+    conn.executemany("INSERT INTO task_tags VALUES (?, 1)", [(i,) for i in range(1, 6)])
+    conn.commit()
+    conn.close()
+
+
+def _dump(conn):
+    return (conn.execute(f"SELECT {schema.TASK_COLUMNS} FROM tasks ORDER BY task_id").fetchall(),
+            conn.execute("SELECT * FROM tags ORDER BY tag_id").fetchall(),
+            conn.execute("SELECT * FROM task_tags ORDER BY task_id, tag_id").fetchall())
+
+
+def _assert_migrated(conn, before):
+    assert conn.execute("PRAGMA user_version").fetchone()[0] == SCHEMA_VERSION
+    assert _dump(conn) == before
+    assert conn.execute("SELECT name FROM sqlite_master WHERE name = 'tasks_migrating'"
+                        ).fetchone() is None
+    # 新约束生效，AUTOINCREMENT 不复用已删除的ID
+    conn.execute("INSERT INTO tasks (name, status, due_date) VALUES ('新任务', '已归档', '2024-01-01')")
+    assert conn.execute("SELECT MAX(task_id) FROM tasks").fetchone()[0] == TASK_COUNT + 1
+    # 汇总表已回填
+    assert conn.execute("SELECT SUM(task_count) FROM daily_rollup").fetchone()[0] == TASK_COUNT
+
+
+def test_migrate_v0_to_current(tmp_path):
+    path = str(tmp_path / "v0.db")
+    _create_v0(path)
+    conn = sqlite3.connect(path)
+    before = _dump(conn)
+
+    assert migrate(conn) is True
+    _assert_migrated(conn, before)
+    assert migrate(conn) is False  # 已是最新
+    conn.close()
+
+
+def test_migrate_resumes_after_failure(tmp_path, monkeypatch):
+    """分批重建 tasks 中途失败（如进程被终止）后，再次迁移从已复制的位置继续"""
+    monkeypatch.setattr(schema, "MIGRATION_BATCH_SIZE", 4)
+    path = str(tmp_path / "v0.db")
+    _create_v0(path)
+    conn = sqlite3.connect(path)
+    before = _dump(conn)
+
+    conn.execute(TASKS_TABLE.format(name="tasks_migrating"))
+    conn.execute("""
+        CREATE TEMP TRIGGER inject_failure BEFORE INSERT ON tasks_migrating
+        WHEN NEW.task_id = 10
+        BEGIN SELECT RAISE(ABORT, 'injected failure'); END
+    """)
+    conn.commit()
+    with pytest.raises(sqlite3.IntegrityError, match="injected failure"):
+        migrate(conn)
+    conn.close()  # 模拟进程退出：未提交的批次丢弃，临时触发器随连接消失
+
+    conn = sqlite3.connect(path)
+    assert conn.execute("PRAGMA user_version").fetchone()[0] == 1
+    copied = conn.execute("SELECT COUNT(*) FROM tasks_migrating").fetchone()[0]
+    assert 0 < copied < len(before[0])
+
+    assert migrate(conn) is True
+    _assert_migrated(conn, before)
+    conn.close()
+
+
+def test_fulltext_built_later_when_trigram_was_missing(tmp_path, monkeypatch):
+    """迁移时不支持 trigram：版本照常升级，之后启动时补建全文索引并收录已有任务"""
+    path = str(tmp_path / "v0.db")
+    _create_v0(path)
+    conn = sqlite3.connect(path)
+    if not schema.fulltext_supported(conn):
+        pytest.skip("SQLite 不支持 FTS5 trigram")
+
+    monkeypatch.setattr(schema, "fulltext_supported", lambda conn: False)
+    migrate(conn)
+    assert conn.execute("PRAGMA user_version").fetchone()[0] == SCHEMA_VERSION
+    assert not schema.has_fulltext(conn)
+    assert schema.ensure_fulltext(conn) is False  # 仍不支持时不重试
+
+    monkeypatch.undo()
+    assert schema.ensure_fulltext(conn) is True
+    assert schema.has_fulltext(conn)
+    assert conn.execute("SELECT rowid FROM tasks_fts WHERE tasks_fts MATCH '任务12'"
+                        ).fetchall() == [(13,)]
+    assert schema.ensure_fulltext(conn) is False
+    conn.close()
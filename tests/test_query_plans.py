@@ -0,0 +1,76 @@
+"""各页面查询的执行计划检查：索引被改动或查询被改写后，防止退化为全表扫描"""
+import re
+
+import pytest
+
+from querybuilder import (KanbanFilter, TagFilter, calendar_counts_sql,
+                          history_count_sql, history_search_sql, history_tasks_sql,
+                          kanban_counts_sql, kanban_page_sql)
+
+# 所有受检查询都带筛选条件，计划中出现对这些表的全表（或全索引）扫描即视为退化
+FULL_SCAN_PATTERN = re.compile(r"^SCAN (tasks|task_tags)(_archive)?\b")
+
+# 同时按日期和标签筛选时，视统计信息可从任一侧的索引出发，两种计划都可接受
+DATE_OR_TAG_INDEX = ("idx_tasks_status_due_date", "idx_task_tags_tag_task")
+
+MONTH_FILTER = KanbanFilter(tag_ids=(1, 2), window="month")
+MULTI_TAG = TagFilter(all_of=(1, 2), any_of=(3, 4), none_of=(5,))
+
+
+def _with(sql_and_params, *extra):
+    sql, params = sql_and_params
+    return sql, params + list(extra)
+
+
+# (名称, (SQL, 参数), 计划中必须出现的片段；元组表示其中之一即可)
+PLAN_CASES = [
+    ("history_month", _with(history_tasks_sql("2025-05", None), 10),
+     ["SEARCH tasks USING INDEX idx_tasks_status_due_date"]),
+    ("history_month_tag", _with(history_tasks_sql("2025-05", 1), 10),
+     [DATE_OR_TAG_INDEX, "task_tags"]),
+    ("history_keyset", _with(history_tasks_sql(None, None, after=("2025-05-01", 100)), 10),
+     ["SEARCH tasks USING INDEX idx_tasks_status_due_date (status=? AND due_date<?)"]),
+    ("history_count", history_count_sql("2025-05", None),
+     ["SEARCH daily_rollup USING PRIMARY KEY (status=? AND day>? AND day<?)"]),
+    ("history_tag_count", history_count_sql(None, 1),
+     ["SEARCH daily_tag_rollup USING PRIMARY KEY (tag_id=? AND status=?)"]),
+    ("history_archive", _with(history_tasks_sql("2025-05", 1, include_archive=True), 10),
+     [DATE_OR_TAG_INDEX, ("idx_tasks_archive_status_due_date",
+                          "idx_task_tags_archive_tag_task")]),
+    ("history_archive_count", history_count_sql("2025-05", 1, include_archive=True),
+     ["SEARCH daily_tag_rollup_archive USING PRIMARY KEY"]),
+    ("kanban_page", _with(kanban_page_sql("已完成", ("2025-05-01", 100)), 100),
+     ["SEARCH t USING INDEX idx_tasks_status_due_date (status=? AND due_date>?)"]),
+    ("kanban_filtered_page", _with(kanban_page_sql("进行中", None, MONTH_FILTER), 100),
+     [DATE_OR_TAG_INDEX]),
+    ("kanban_filtered_counts", kanban_counts_sql(MONTH_FILTER),
+     ["idx_task_tags_tag_task"]),
+    ("history_search", _with(history_search_sql("合作方12 推广", "2025-05", None,
+                                                include_archive=True), 10, 0),
+     ["tasks_fts VIRTUAL TABLE INDEX", "tasks_archive_fts VIRTUAL TABLE INDEX"]),
+    ("history_multi_tag", _with(history_tasks_sql(None, MULTI_TAG), 10),
+     ["USING COVERING INDEX idx_task_tags_tag_task (tag_id=?)", "COMPOUND QUERY"]),
+    ("history_multi_tag_count", history_count_sql("2025-05", MULTI_TAG),
+     ["idx_task_tags_tag_task"]),
+    ("calendar_month", calendar_counts_sql("2025-05-01", "2025-05-31"),
+     ["SEARCH tasks USING COVERING INDEX idx_tasks_due_date"]),
+]
+
+
+def explain(conn, sql, params):
+    """EXPLAIN QUERY PLAN 的明细行"""
+    return [row[-1] for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}", params)]
+
+
+@pytest.mark.parametrize("sql_and_params, required",
+                         [case[1:] for case in PLAN_CASES],
+                         ids=[case[0] for case in PLAN_CASES])
+def test_query_plan(db, sql_and_params, required):
+    if any("_fts" in str(fragment) for fragment in required) and not db.has_fulltext:
+        pytest.skip("SQLite 不支持 FTS5 trigram")
+    plan = explain(db.conn, *sql_and_params)
+    assert not [detail for detail in plan if FULL_SCAN_PATTERN.match(detail)], plan
+    for fragment in required:
+        options = fragment if isinstance(fragment, tuple) else (fragment,)
+        assert any(option in detail for option in options for detail in plan), \
+            f"计划中缺少 {fragment!r}: {plan}"
@@ -0,0 +1,86 @@
+import pytest
+
+from querybuilder import (TagFilter, TaskQuery, history_count_sql, history_tasks_sql,
+                          like_contains)
+
+# (任务名称, 筛选文字)：ASCII 字母不区分大小写，其他字符（含全角/带重音字母）区分
+LIKE_CASES = [
+    ("Summer Campaign", "campaign"),
+    ("小红书 VLOG 合作", "vlog"),
+    ("Ünïcode 测试", "ünï"),
+    ("ＡＢＣ 全角", "ａｂｃ"),
+    ("100% 完成_率", "0% 完成_"),
+    ("100 完成率", "0% 完成_"),
+    ("路径\\备份", "\\备"),
+    ("", "任意"),
+]
+
+
+@pytest.mark.parametrize("name, text", LIKE_CASES)
+def test_like_contains_matches_sql(db, name, text):
+    """看板乐观放置卡片时的判断必须与 SQL 筛选条件一致"""
+    query = TaskQuery("t").name_contains(text)
+    matched = db.conn.execute(
+        f"SELECT EXISTS (SELECT 1 FROM (SELECT ? AS name) AS t {query.where()})",
+        [name] + query.params).fetchone()[0]
+    assert like_contains(name, text) == bool(matched)
+
+
+# ---------- 多标签筛选 ----------
+# 任务 -> 标签：覆盖无标签、单标签和多标签组合
+TAGGED_TASKS = {
+    "无标签": (),
+    "A": ("A",), "B": ("B",), "C": ("C",),
+    "AB": ("A", "B"), "AC": ("A", "C"), "BC": ("B", "C"),
+    "ABC": ("A", "B", "C"), "AD": ("A", "D"), "D": ("D",),
+}
+
+TAG_FILTERS = [
+    {"all_of": ("A",)},
+    {"all_of": ("A", "B")},
+    {"all_of": ("A", "B", "C")},
+    {"any_of": ("B", "C")},
+    {"any_of": ("D",)},
+    {"none_of": ("A",)},
+    {"none_of": ("A", "B")},
+    {"all_of": ("A",), "any_of": ("B", "D")},
+    {"all_of": ("A",), "none_of": ("C",)},
+    {"any_of": ("B", "C"), "none_of": ("A",)},
+    {"all_of": ("A",), "any_of": ("B", "C"), "none_of": ("D",)},
+    {"all_of": ("A", "D"), "none_of": ("B",)},
+]
+
+
+def _brute_force(spec: dict) -> set:
+    all_of, any_of, none_of = (set(spec.get(key, ())) for key in ("all_of", "any_of", "none_of"))
+    return {name for name, tags in TAGGED_TASKS.items()
+            if all_of <= set(tags)
+            and (not any_of or any_of & set(tags))
+            and not none_of & set(tags)}
+
+
+@pytest.fixture(scope="module")
+def tagged_db(db):
+    db.create_tasks([{"name": name, "due_date": "2025-05-01", "status": "已完成",
+                      "expected_income": 1, "tags": list(tags)}
+                     for name, tags in TAGGED_TASKS.items()])
+    return db
+
+
+@pytest.mark.parametrize("spec", TAG_FILTERS, ids=lambda spec: repr(spec))
+def test_tag_filter_matches_brute_force(tagged_db, spec):
+    db = tagged_db
+    tag_filter = TagFilter(**{key: tuple(db.get_tag_id(name) for name in names)
+                              for key, names in spec.items()})
+    expected = _brute_force(spec)
+
+    query = TaskQuery().tag(tag_filter)
+    names = {row[0] for row in db.conn.execute(
+        f"SELECT name FROM tasks {query.where()}", query.params)}
+    assert names == expected
+
+    sql, params = history_tasks_sql(None, tag_filter)
+    assert {row[1] for row in db.conn.execute(sql, params + [-1])} == expected
+    sql, params = history_count_sql(None, tag_filter)
+    assert db.conn.execute(sql, params).fetchone()[0] == len(expected)
+    assert db.get_rollup_totals("已完成", tag_id=tag_filter)["task_count"] == len(expected)
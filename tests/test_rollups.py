@@ -0,0 +1,69 @@
+"""触发器维护的日汇总表必须与全量重算（rebuild_rollups）的结果一致"""
+from datetime import date
+
+STATUSES = (None, "未开始", "进行中", "已完成", "已中断", "已归档")
+
+
+def _rollup_state(db) -> dict:
+    """各状态 × 各标签（含不限）的累计汇总与按天汇总；忽略任务数为 0 的天"""
+    state = {}
+    for status in STATUSES:
+        for tag_id in [None] + [tag[0] for tag in db.get_all_tags()]:
+            daily = db.get_daily_rollup(status, tag_id=tag_id)
+            state[status, tag_id] = (
+                db.get_rollup_totals(status, tag_id=tag_id),
+                {day: sums for day, sums in daily.items() if sums["task_count"]})
+    return state
+
+
+def _mixed_writes(db):
+    ids = db.create_tasks([
+        {"name": f"任务{i}", "due_date": date(2024, 1 + i % 12, 1 + i % 28),
+         "status": STATUSES[1 + i % 5],
+         "expected_income": [None, 0.1, 0.2, 99.99, 1234.5][i % 5],
+         "actual_income": i * 0.3 if i % 3 else None,
+         "expense": [0.01, None, 7.77][i % 3],
+         "tags": [["图文"], ["视频", "图文"], [], ["广告"]][i % 4]}
+        for i in range(60)
+    ])
+    db.create_task("单个任务", date(2024, 3, 3), expected_income=0.15, tags=["视频"],
+                   actual_income=0.25, expense=0.35)
+    # 修改金额与日期
+    db.conn.execute("UPDATE tasks SET expected_income = expected_income + 0.05, "
+                    "due_date = '2024-06-15' WHERE task_id IN (?, ?, ?)", ids[:3])
+    db.conn.execute("UPDATE tasks SET actual_income = NULL, expense = 3.3 WHERE task_id = ?",
+                    (ids[4],))
+    db.conn.commit()
+    # 改状态
+    db.update_status_many(ids[5:20], "已完成")
+    db.update_status_many(ids[20:25], "进行中")
+    # 重新关联标签
+    db.conn.execute("DELETE FROM task_tags WHERE task_id IN (?, ?)", ids[1:3])
+    db.conn.commit()
+    db.link_tags_many([(ids[1], "广告"), (ids[2], "新标签"), (ids[30], "新标签")])
+    # 删除任务与标签
+    db.conn.execute("DELETE FROM tasks WHERE task_id IN (?, ?, ?)", ids[40:43])
+    db.conn.commit()
+    db.delete_tag(db.get_tag_id("广告"))
+    # 归档
+    db.archive_tasks(date(2024, 5, 1))
+
+
+def test_trigger_rollups_match_rebuild(db):
+    _mixed_writes(db)
+    assert db.conn.execute("SELECT COUNT(*) FROM tasks_archive").fetchone()[0] > 0
+
+    maintained = _rollup_state(db)
+    db.rebuild_rollups()
+    assert _rollup_state(db) == maintained
+
+
+def test_rollups_match_task_rows(db):
+    """汇总（分）与直接对任务行求和一致"""
+    for status in STATUSES[1:]:
+        count, expected = db.conn.execute(
+            "SELECT COUNT(*), SUM(CAST(ROUND(COALESCE(expected_income, 0) * 100) AS INTEGER)) "
+            "FROM tasks WHERE status = ?", (status,)).fetchone()
+        totals = db.get_rollup_totals(status)
+        assert totals["task_count"] == count
+        assert totals["expected_income"] == (expected or 0) / 100
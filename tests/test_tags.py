@@ -0,0 +1,45 @@
+from datetime import date
+
+from database import TaskManagerDB
+
+
+def _connect(path):
+    return TaskManagerDB(str(path))
+
+
+def test_tag_created_on_another_connection(tmp_path):
+    """一个连接新建标签后，另一个连接（如写线程）用该标签新建任务"""
+    path = tmp_path / "tags.db"
+    gui, writer = _connect(path), _connect(path)
+    try:
+        assert writer.get_all_tags() == []  # 写线程连接的缓存已载入
+        tag_id = gui.get_or_create_tag("新标签")
+
+        task_id = writer.create_task("任务", date(2025, 5, 1), tags=["新标签"])
+        assert task_id != -1
+        assert writer.get_tag_id("新标签") == tag_id
+        linked = writer.conn.execute(
+            "SELECT tag_id FROM task_tags WHERE task_id = ?", (task_id,)).fetchall()
+        assert linked == [(tag_id,)]
+    finally:
+        gui.close()
+        writer.close()
+
+
+def test_stale_tag_cache_does_not_break_writes(tmp_path):
+    """缓存未作废（标签由外部写入）时，get_or_create_tag 返回已有标签而不是插入失败"""
+    path = tmp_path / "tags.db"
+    db = _connect(path)
+    try:
+        assert db.get_tag_id("外部标签") is None
+        other = _connect(path)
+        other.conn.execute("INSERT INTO tags (tag_name) VALUES ('外部标签')")
+        other.conn.commit()
+        other.close()
+
+        tag_id = db.get_or_create_tag("外部标签")
+        assert db.conn.execute(
+            "SELECT tag_id FROM tags WHERE tag_name = '外部标签'").fetchone() == (tag_id,)
+        assert db.conn.execute("SELECT COUNT(*) FROM tags").fetchone() == (1,)
+    finally:
+        db.close()
@@ -0,0 +1,101 @@
+from collections import OrderedDict, defaultdict, namedtuple
+from typing import Any, Callable, Dict, List, Optional
+
+from PyQt5.QtCore import QObject, QTimer, pyqtSignal
+
+from database import TaskManagerDB
+from dataservice import get_data_service
+
+# 第一次修改后等待多久再写入（毫秒），窗口内对同一任务的修改合并为一次
+WRITE_DELAY_MS = 300
+
+# apply(db) 在写线程执行；rollback() 在写入失败时于 GUI 线程撤销界面上的乐观修改；
+# on_done(result) 在写入提交后于 GUI 线程回调
+PendingWrite = namedtuple("PendingWrite", "apply rollback on_done", defaults=(None, None))
+
+_queue: Optional["WriteQueue"] = None
+
+
+def get_write_queue() -> "WriteQueue":
+    """获取进程内共享的后写队列（须在 GUI 线程首次调用）"""
+    global _queue
+    if _queue is None:
+        _queue = WriteQueue()
+    return _queue
+
+
+class WriteQueue(QObject):
+    """界面修改的后写队列
+
+    界面先乐观地展示修改结果，再把写操作放入队列；第一次修改后 WRITE_DELAY_MS
+    内的修改攒成一批，在后台写线程的一个事务中按顺序提交：
+    - set_status：同一任务的状态修改只保留最后一次（来回切换三次只写一次），
+      同一目标状态的任务合并为一条 UPDATE ... IN (...)；
+    - enqueue：其他写操作（如新建任务）按入队顺序执行，不合并。
+    整批失败时事务回滚，并按相反顺序调用各修改的 rollback 恢复界面，同时发出 failed。
+    """
+
+    failed = pyqtSignal(object)
+
+    def __init__(self):
+        super().__init__()
+        self.data_service = get_data_service()
+        self._statuses: "OrderedDict[int, str]" = OrderedDict()
+        self._status_rollbacks: Dict[int, Callable[[], None]] = {}
+        self._writes: List[PendingWrite] = []
+
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.setInterval(WRITE_DELAY_MS)
+        self._timer.timeout.connect(self.flush)
+
+    def set_status(self, task_id: int, status: str,
+                   rollback: Callable[[], None] = None):
+        """修改任务状态；合并时保留第一次修改的 rollback（即修改前的界面状态）"""
+        self._statuses[task_id] = status
+        if rollback and task_id not in self._status_rollbacks:
+            self._status_rollbacks[task_id] = rollback
+        self._schedule()
+
+    def enqueue(self, apply: Callable[[TaskManagerDB], Any],
+                rollback: Callable[[], None] = None,
+                on_done: Callable[[Any], None] = None):
+        self._writes.append(PendingWrite(apply, rollback, on_done))
+        self._schedule()
+
+    def _schedule(self):
+        if not self._timer.isActive():
+            self._timer.start()
+
+    def flush(self):
+        """立即提交队列中的全部修改（程序退出前也会调用）"""
+        self._timer.stop()
+        if not self._statuses and not self._writes:
+            return
+        statuses, self._statuses = self._statuses, OrderedDict()
+        status_rollbacks, self._status_rollbacks = self._status_rollbacks, {}
+        writes, self._writes = self._writes, []
+
+        by_status = defaultdict(list)
+        for task_id, status in statuses.items():
+            by_status[status].append(task_id)
+
+        def run(db: TaskManagerDB) -> list:
+            with db.transaction():
+                for status, task_ids in by_status.items():
+                    db.update_status_many(task_ids, status)
+                return [write.apply(db) for write in writes]
+
+        def on_result(results):
+            for write, result in zip(writes, results):
+                if write.on_done:
+                    write.on_done(result)
+
+        def on_error(error):
+            rollbacks = list(status_rollbacks.values())
+            rollbacks += [write.rollback for write in writes if write.rollback]
+            for rollback in reversed(rollbacks):
+                rollback()
+            self.failed.emit(error)
+
+        self.data_service.submit_write(run, on_result, on_error)